@@ -0,0 +1,5 @@
+"""
+Throughput benchmarks for canalysis.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_deconvolution``.
+"""
@@ -0,0 +1,32 @@
+"""
+# _common.py
+
+Synthetic data and timing helpers shared by the benchmark scripts.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_traces(n_frames: int = 36000, n_cells: int = 50, g: float = 0.95, seed: int = 0) -> pd.DataFrame:
+    """AR(1) calcium traces with sparse spikes and Gaussian noise, frames x cells."""
+    rng = np.random.default_rng(seed)
+    spikes = (rng.random((n_frames, n_cells)) < 0.01) * rng.exponential(1.0, (n_frames, n_cells))
+    calcium = np.empty_like(spikes)
+    calcium[0] = spikes[0]
+    for t in range(1, n_frames):
+        calcium[t] = g * calcium[t - 1] + spikes[t]
+    traces = calcium + rng.normal(0, 0.2, calcium.shape)
+    return pd.DataFrame(traces, columns=[f"C{i:02d}" for i in range(n_cells)])
+
+
+@contextmanager
+def timer(results: dict, name: str):
+    """Store the wall time of the ``with`` block in ``results[name]``, in seconds."""
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
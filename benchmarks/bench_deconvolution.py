@@ -0,0 +1,43 @@
+"""
+# bench_deconvolution.py
+
+Throughput of the OASIS AR(1) deconvolution, in frames / second / core.
+"""
+from __future__ import annotations
+
+import argparse
+
+from canalysis.analysis import deconvolution
+from canalysis.helpers import parallel
+
+from benchmarks._common import synthetic_traces, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=36000)
+    parser.add_argument("--cells", type=int, default=50)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    traces = synthetic_traces(args.frames, args.cells)
+    n_frames = traces.size
+    results = {}
+    # Warm the worker pool so start-up isn't counted as solver time.
+    deconvolution.deconvolve(traces.iloc[:100], n_jobs=args.n_jobs)
+    with timer(results, "serial"):
+        deconvolution.deconvolve(traces, n_jobs=1)
+    with timer(results, "parallel"):
+        deconvolution.deconvolve(traces, n_jobs=args.n_jobs)
+
+    cores = parallel.effective_n_jobs(args.n_jobs)
+    print(f"{args.cells} cells x {args.frames} frames")
+    print(f"serial:   {results['serial']:.2f}s, {n_frames / results['serial']:,.0f} frames/s/core")
+    print(
+        f"parallel: {results['parallel']:.2f}s on {cores} cores, "
+        f"{n_frames / results['parallel'] / cores:,.0f} frames/s/core"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+# bench_heatmaps.py
+
+Draw-and-save time of EatingHeatmap, imshow raster path versus the seaborn QuadMesh.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from canalysis.graphs.heatmaps import EatingHeatmap
+
+from benchmarks._common import synthetic_traces, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cells", type=int, default=50)
+    parser.add_argument("--frames", type=int, nargs="+", default=[69, 600, 3000])
+    parser.add_argument("--formats", nargs="+", default=["png", "pdf"])
+    parser.add_argument("--dpi", type=int, default=400)
+    args = parser.parse_args()
+
+    methods = ("raster", "seaborn")
+    # Warm font and colormap caches so the first row isn't charged for them.
+    for method in methods:
+        EatingHeatmap(synthetic_traces(69, 2).T, save_dir=None).default_heatmap(maptype="taste", method=method)
+    print(f"{'frames':>8} {'format':>7} " + " ".join(f"{name:>10}" for name in methods))
+    for n_frames in args.frames:
+        data = synthetic_traces(n_frames, args.cells).T
+        maptype = "taste" if n_frames == 69 else "eating"
+        lines = (None, None, None) if maptype == "taste" else (10.0, 5.0, 20.0)
+        for fmt in args.formats:
+            results = {}
+            for method in methods:
+                with timer(results, method):
+                    heatmap = EatingHeatmap(data, save_dir=None)
+                    fig = heatmap.default_heatmap(*lines, maptype=maptype, method=method, rasterized=fmt != "png")
+                    fig.savefig(io.BytesIO(), format=fmt, dpi=args.dpi, bbox_inches="tight", pad_inches=0.01)
+            print(f"{n_frames:>8} {fmt:>7} " + " ".join(f"{results[name]:>9.2f}s" for name in methods))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+# bench_solvers.py
+
+Fit time versus sample count for each SupportVectorMachine solver engine.
+
+Run with the package directory on the path, as the neuralnetwork modules expect:
+``PYTHONPATH=canalysis python -m benchmarks.bench_solvers``.
+"""
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+from sklearn.datasets import make_classification
+
+from neuralnetwork.nn_utils import solvers
+
+from benchmarks._common import timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 10_000, 50_000, 200_000])
+    parser.add_argument("--features", type=int, default=50, help="cells")
+    parser.add_argument("--svc-max", type=int, default=20_000, help="largest size to try kernel SVC on")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    X_all, y_all = make_classification(
+        max(args.sizes), args.features, n_informative=10, n_classes=4, random_state=0
+    )
+    X_all = X_all.astype(np.float32)
+    print(f"{'samples':>10} " + " ".join(f"{name:>12}" for name in solvers.SOLVERS))
+    for n in args.sizes:
+        X, y = X_all[:n], y_all[:n]
+        results = {}
+        for name in solvers.SOLVERS:
+            if name == "svc" and n > args.svc_max:
+                continue
+            model = solvers.get_solver(name)
+            with timer(results, name):
+                if solvers.is_incremental(model):
+                    solvers.fit_in_batches(model, X, y, batch_size=args.batch_size, random_state=0)
+                else:
+                    model.fit(X, y)
+        row = " ".join(f"{results[name]:>11.2f}s" if name in results else f"{'-':>12}" for name in solvers.SOLVERS)
+        print(f"{n:>10} {row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# deconvolution.py
+
+Module (analysis): OASIS active-set AR(1) deconvolution of calcium traces into inferred spiking activity.
+
+Ref: Friedrich, Zhou & Paninski (2017), Fast online deconvolution of calcium imaging data.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from canalysis.helpers import parallel
+
+
+@dataclass
+class Deconvolved:
+    """
+    Deconvolution output for every cell.
+
+    Attributes
+    ----------
+    denoised : pd.DataFrame
+        Time x cells denoised calcium (baseline removed).
+    spikes : pd.DataFrame
+        Time x cells non-negative inferred spiking activity.
+    g : pd.Series
+        AR(1) decay coefficient used for each cell.
+    baseline : pd.Series
+        Baseline subtracted from each cell before deconvolution.
+    """
+
+    denoised: pd.DataFrame
+    spikes: pd.DataFrame
+    g: pd.Series
+    baseline: pd.Series
+
+
+def estimate_ar1(y: np.ndarray, lags: int = 5) -> float:
+    """
+    Estimate the AR(1) decay from the autocovariance at lags >= 1.
+
+    Lag 0 carries the measurement noise variance, so ``g`` is the least-squares fit of
+    ``acov[k] = g * acov[k - 1]`` for k = 2..lags + 1, which is noise-free.
+    """
+    y = np.asarray(y, dtype=float) - np.mean(y)
+    n = y.size
+    acov = np.array([np.dot(y[: n - k], y[k:]) / n for k in range(1, lags + 2)])
+    denom = np.dot(acov[:-1], acov[:-1])
+    g = np.dot(acov[1:], acov[:-1]) / denom if denom > 0 else 0.0
+    return float(np.clip(g, 0.0, 0.999))
+
+
+def oasis_ar1(y: np.ndarray, g: float, lam: float = 0.0, s_min: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Non-negative AR(1) deconvolution with the OASIS active-set (pool adjacent violators) solver.
+
+    Each sample opens a new pool; while the previous pool's decayed value violates the
+    spike constraint the two are merged in closed form. Every sample is merged at most
+    once, so the solve is linear in the trace length.
+
+    Parameters
+    ----------
+    y : np.ndarray
+        One cell's trace, baseline removed.
+    g : float
+        AR(1) decay coefficient, 0 < g < 1.
+    lam : float
+        Sparsity (L1) penalty on the spikes.
+    s_min : float
+        Minimum spike size; smaller jumps are merged away.
+
+    Returns
+    -------
+    c : np.ndarray
+        Denoised calcium.
+    s : np.ndarray
+        Inferred spikes, ``s[t] = c[t] - g * c[t - 1]``.
+    """
+    y = np.asarray(y, dtype=float)
+    n = y.size
+    # Shift so the L1 penalty is absorbed into the data term.
+    y = y - lam * (1 - g)
+    y[-1] -= lam * g
+    # Pools as parallel lists [value, weight, start, length]; lists beat numpy scalar indexing here.
+    v, w, t, ln = [y[0]], [1.0], [0], [1]
+    for k in range(1, n):
+        v.append(y[k])
+        w.append(1.0)
+        t.append(k)
+        ln.append(1)
+        while len(v) > 1 and v[-2] * g ** ln[-2] + s_min > v[-1]:
+            f = g ** ln[-2]
+            v_last, w_last, l_last = v.pop(), w.pop(), ln.pop()
+            t.pop()
+            v[-1] = (w[-1] * v[-1] + f * w_last * v_last) / (w[-1] + f * f * w_last)
+            w[-1] += f * f * w_last
+            ln[-1] += l_last
+
+    c = np.empty(n)
+    for value, start, length in zip(v, t, ln):
+        c[start : start + length] = max(value, 0.0) * g ** np.arange(length)
+    s = np.empty(n)
+    s[0] = c[0]
+    s[1:] = c[1:] - g * c[:-1]
+    s[s < 1e-12] = 0.0
+    return c, s
+
+
+def _deconvolve_cell(
+    y: np.ndarray,
+    g: Optional[float],
+    lam: float,
+    s_min: float,
+    baseline_percentile: float,
+) -> tuple[np.ndarray, np.ndarray, float, float]:
+    b = float(np.percentile(y, baseline_percentile))
+    y = y - b
+    g = estimate_ar1(y) if g is None else g
+    c, s = oasis_ar1(y, g, lam=lam, s_min=s_min)
+    return c, s, g, b
+
+
+def deconvolve(
+    signals: pd.DataFrame | np.ndarray,
+    g: Optional[float] = None,
+    lam: float = 0.0,
+    s_min: float = 0.0,
+    baseline_percentile: float = 15,
+    n_jobs: Optional[int] = -1,
+) -> Deconvolved:
+    """
+    Deconvolve every cell, in parallel across a process pool.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame | np.ndarray
+        Time x cells. A ``time`` column, if present, is ignored.
+    g : float, optional
+        AR(1) coefficient shared by all cells. Estimated per cell when None.
+    lam : float
+        Sparsity penalty passed to oasis_ar1.
+    s_min : float
+        Minimum spike size passed to oasis_ar1.
+    baseline_percentile : float
+        Percentile of each trace subtracted as its baseline.
+    n_jobs : int, optional
+        Worker processes, joblib semantics (-1 uses every core, 1 runs in-process).
+
+    Returns
+    -------
+    Deconvolved
+    """
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore")
+        cells = signals.columns
+        index = signals.index
+        data = signals.to_numpy(dtype=float).T
+    else:
+        data = np.asarray(signals, dtype=float).T
+        cells = pd.RangeIndex(data.shape[0])
+        index = pd.RangeIndex(data.shape[1])
+
+    results = parallel.map_cells(
+        _deconvolve_cell,
+        data,
+        n_jobs=n_jobs,
+        g=g,
+        lam=lam,
+        s_min=s_min,
+        baseline_percentile=baseline_percentile,
+    )
+    c, s, gs, bs = zip(*results)
+    return Deconvolved(
+        denoised=pd.DataFrame(np.column_stack(c), index=index, columns=cells),
+        spikes=pd.DataFrame(np.column_stack(s), index=index, columns=cells),
+        g=pd.Series(gs, index=cells),
+        baseline=pd.Series(bs, index=cells),
+    )
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# dff.py
+
+Module (analysis): Sliding-window baselines and DF/F for long recordings.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import minimum_filter1d, uniform_filter1d
+
+from canalysis.helpers import parallel
+
+
+def running_percentile(x: np.ndarray, window: int, q: float) -> np.ndarray:
+    """
+    Exact centered sliding-window percentile of one trace in O(T log W).
+
+    Two heaps split the current window: a max-heap with the lowest ``k + 1`` values and a
+    min-heap with the rest, where ``k`` is the rank of the requested percentile. Samples
+    leaving the window are deleted lazily, by index, only once they reach a heap top.
+    Windows are truncated at both ends of the trace.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        One cell's trace.
+    window : int
+        Window length, in samples.
+    q : float
+        Percentile in [0, 100]; the lower nearest-rank value is returned.
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.size
+    half = window // 2
+    lo: list = []  # (-value, index), max-heap
+    hi: list = []  # (value, index), min-heap
+    in_lo = np.zeros(n, dtype=bool)
+    n_lo = n_hi = 0
+    left = 0
+    out = np.empty(n)
+
+    def prune(heap):
+        while heap and heap[0][1] < left:
+            heapq.heappop(heap)
+
+    added = 0
+    for t in range(n):
+        # Grow the right edge up to t + half.
+        while added < min(n, t + half + 1):
+            value = x[added]
+            prune(lo)
+            if lo and value <= -lo[0][0]:
+                heapq.heappush(lo, (-value, added))
+                in_lo[added] = True
+                n_lo += 1
+            else:
+                heapq.heappush(hi, (value, added))
+                n_hi += 1
+            added += 1
+        # Shrink the left edge to t - half; entries stay in the heaps until they surface.
+        while left < t - half:
+            if in_lo[left]:
+                n_lo -= 1
+            else:
+                n_hi -= 1
+            left += 1
+
+        k = int(q / 100 * (n_lo + n_hi - 1))
+        while n_lo > k + 1:
+            prune(lo)
+            value, idx = heapq.heappop(lo)
+            heapq.heappush(hi, (-value, idx))
+            in_lo[idx] = False
+            n_lo -= 1
+            n_hi += 1
+        while n_lo < k + 1:
+            prune(hi)
+            value, idx = heapq.heappop(hi)
+            heapq.heappush(lo, (-value, idx))
+            in_lo[idx] = True
+            n_lo += 1
+            n_hi -= 1
+        prune(lo)
+        out[t] = -lo[0][0]
+    return out
+
+
+def approximate_percentile(data: np.ndarray, window: int, q: float, step: int, chunk: int = 2**24) -> np.ndarray:
+    """
+    Sliding percentile of every row evaluated every ``step`` samples, then linearly interpolated.
+
+    Works on all cells at once; windows are strided views over the reflect-padded trace and
+    are reduced ``chunk`` elements at a time, so memory is bounded for long sessions.
+    """
+    n_cells, n = data.shape
+    half = window // 2
+    padded = np.pad(data, ((0, 0), (half, half)), mode="reflect")
+    centers = np.arange(0, n, step)
+    if centers[-1] != n - 1:
+        centers = np.append(centers, n - 1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1, axis=1)
+    per_chunk = max(chunk // (n_cells * windows.shape[-1]), 1)
+    sampled = np.empty((n_cells, centers.size), dtype=data.dtype)
+    for start in range(0, centers.size, per_chunk):
+        idx = centers[start : start + per_chunk]
+        sampled[:, start : start + per_chunk] = np.percentile(windows[:, idx, :], q, axis=-1)
+    frames = np.arange(n)
+    return np.stack([np.interp(frames, centers, row) for row in sampled]).astype(data.dtype, copy=False)
+
+
+def get_baseline(
+    signals: pd.DataFrame | np.ndarray,
+    window: int,
+    percentile: float = 8,
+    method: str = "percentile",
+    smooth: Optional[int] = None,
+    step: Optional[int] = None,
+    n_jobs: Optional[int] = -1,
+    dtype: type = np.float64,
+) -> np.ndarray:
+    """
+    Slowly varying F0 baseline of every cell.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame | np.ndarray
+        Time x cells. A ``time`` column, if present, is ignored.
+    window : int
+        Baseline window, in samples.
+    percentile : float
+        Percentile used by the "percentile" and "approx" methods.
+    method : str
+        "percentile": exact two-heap running percentile, parallel across cells.
+        "approx": percentile every ``step`` samples, interpolated, vectorized across cells.
+        "minimum": running minimum of the trace smoothed over ``smooth`` samples, O(T).
+    smooth : int, optional
+        Smoothing width for "minimum". Defaults to ``window // 10``.
+    step : int, optional
+        Evaluation stride for "approx". Defaults to ``window // 20``.
+    n_jobs : int, optional
+        Worker processes for "percentile", joblib semantics.
+    dtype : type
+        Working and output dtype, np.float32 halves memory for long sessions.
+
+    Returns
+    -------
+    np.ndarray
+        Time x cells baseline.
+    """
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore").to_numpy()
+    data = np.ascontiguousarray(np.asarray(signals, dtype=dtype).T)
+    window = max(int(window), 1)
+    if method == "percentile":
+        rows = parallel.map_cells(running_percentile, data, n_jobs=n_jobs, window=window, q=percentile)
+        baseline = np.stack(rows).astype(dtype, copy=False)
+    elif method == "approx":
+        step = max(window // 20, 1) if step is None else step
+        baseline = approximate_percentile(data, window, percentile, step)
+    elif method == "minimum":
+        smooth = max(window // 10, 1) if smooth is None else smooth
+        smoothed = uniform_filter1d(data, smooth, axis=1, mode="nearest")
+        baseline = minimum_filter1d(smoothed, window, axis=1, mode="nearest")
+    else:
+        raise ValueError(f"Unknown baseline method: {method}")
+    return baseline.T
+
+
+def get_dff(
+    signals: pd.DataFrame,
+    fs: float,
+    window: float = 60.0,
+    percentile: float = 8,
+    method: str = "percentile",
+    dtype: type = np.float64,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    DF/F of every cell against a sliding-window baseline.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame
+        Time x cells raw fluorescence. A ``time`` column, if present, is ignored.
+    fs : float
+        Sampling rate, in Hz.
+    window : float
+        Baseline window, in seconds.
+    percentile, method, dtype, **kwargs
+        See get_baseline.
+
+    Returns
+    -------
+    pd.DataFrame
+        Time x cells (F - F0) / F0, in ``dtype``.
+    """
+    signals = signals.drop(columns=["time"], errors="ignore")
+    f = signals.to_numpy(dtype=dtype, copy=True)
+    f0 = get_baseline(f, int(round(window * fs)), percentile, method, dtype=dtype, **kwargs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f -= f0
+        f /= f0
+    return pd.DataFrame(f, index=signals.index, columns=signals.columns)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# pyramid.py
+
+Module (analysis): Multi-resolution min/max pyramid of every cell, for drawing any window in constant time.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def level_sizes(n_samples: int) -> list[int]:
+    """Bins in each level: level k (from 1) halves level k - 1, until a single bin is left."""
+    sizes = []
+    while n_samples > 1:
+        n_samples = -(-n_samples // 2)
+        sizes.append(n_samples)
+    return sizes
+
+
+def build_pyramid(signals: pd.DataFrame | np.ndarray, dtype: type = np.float32) -> np.ndarray:
+    """
+    Min/max of every cell over bins of 2, 4, 8, ... samples.
+
+    Each level is reduced from the one below it with ``np.fmin`` / ``np.fmax`` (NaN is
+    ignored unless a whole bin is NaN), so the build is a single O(T) pass per cell. An odd
+    level is padded with its last bin.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame | np.ndarray
+        Time x cells. A ``time`` column, if present, is ignored.
+    dtype : type
+        Storage type of the levels.
+
+    Returns
+    -------
+    np.ndarray
+        All levels stacked along the first axis, bins x 2 (min, max) x cells, finest first.
+        Level boundaries follow from the number of samples, see level_sizes.
+    """
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore").to_numpy()
+    lo = hi = np.asarray(signals, dtype=dtype).reshape(len(signals), -1)
+    levels = []
+    while lo.shape[0] > 1:
+        if lo.shape[0] % 2:
+            lo = np.concatenate([lo, lo[-1:]])
+            hi = np.concatenate([hi, hi[-1:]])
+        lo = np.fmin(lo[0::2], lo[1::2])
+        hi = np.fmax(hi[0::2], hi[1::2])
+        levels.append(np.stack([lo, hi], axis=1))
+    if not levels:
+        return np.empty((0, 2, lo.shape[1]), dtype=dtype)
+    return np.concatenate(levels)
+
+
+class TracePyramid:
+    def __init__(
+        self,
+        levels: np.ndarray,
+        time: np.ndarray,
+        signals: pd.DataFrame | np.ndarray,
+        cells: Optional[Iterable] = None,
+    ):
+        """
+        Query a min/max pyramid by time window and pixel width.
+
+        Drawing a window of S samples into P pixel columns only needs the level whose bins
+        hold about S / P samples, so ``query`` reads between P and 2P bins whatever the
+        session length or zoom. Windows short enough to need fewer than 2 samples per pixel
+        are read from the raw traces, which is equally small.
+
+        Parameters
+        ----------
+        levels : np.ndarray
+            Output of build_pyramid, usually memory-mapped from the session cache.
+        time : np.ndarray
+            Time of each sample.
+        signals : pd.DataFrame | np.ndarray
+            Raw traces (time x cells) the pyramid was built from, for the finest windows.
+        cells : Iterable, optional
+            Cell names, defaulting to the columns of ``signals``.
+        """
+        if isinstance(signals, pd.DataFrame):
+            cells = signals.columns.drop("time", errors="ignore") if cells is None else cells
+            signals = signals.drop(columns=["time"], errors="ignore").to_numpy()
+        self.levels = levels
+        self.time = np.asarray(time, dtype=float)
+        self.signals = np.asarray(signals)
+        self.cells = pd.Index(range(self.signals.shape[1]) if cells is None else cells)
+        sizes = level_sizes(self.time.size)
+        if sum(sizes) != len(levels):
+            raise ValueError(f"Pyramid has {len(levels)} bins, {self.time.size} samples need {sum(sizes)}")
+        self.sizes = [self.time.size] + sizes
+        self.offsets = np.concatenate([[0, 0], np.cumsum(sizes)[:-1]]).astype(int)
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {len(self.cells)} cells, {len(self.sizes)} levels"
+
+    @property
+    def n_levels(self) -> int:
+        return len(self.sizes)
+
+    def level(self, k: int) -> np.ndarray:
+        """Bins x 2 x cells of level ``k``; bins of level 0 are single samples (min == max)."""
+        if k == 0:
+            return np.stack([self.signals, self.signals], axis=1)
+        return self.levels[self.offsets[k] : self.offsets[k] + self.sizes[k]]
+
+    def select_level(self, n_samples: int, n_pixels: int) -> int:
+        """Coarsest level that still has at least one bin per pixel for ``n_samples``."""
+        if n_samples <= 2 * n_pixels:
+            return 0
+        return int(min(np.floor(np.log2(n_samples / n_pixels)), self.n_levels - 1))
+
+    def query(
+        self,
+        n_pixels: int,
+        window: Optional[tuple] = None,
+        cells: Optional[Iterable] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Min/max envelope of a time window at a pixel width.
+
+        Parameters
+        ----------
+        n_pixels : int
+            Horizontal resolution, usually graph_utils.decimate.pixel_bins(fig, dpi, ax).
+        window : tuple, optional
+            (start, stop) time range, the whole session by default. One bin of margin is
+            kept on each side so lines run to the axes edges.
+        cells : Iterable, optional
+            Cell names to return, in order. Defaults to every cell.
+
+        Returns
+        -------
+        x, y : np.ndarray
+            Cells x points time and value, as graph_utils.decimate.decimate returns them.
+            Each bin contributes its minimum then its maximum, both at the bin's center.
+        """
+        cols = slice(None) if cells is None else self.cells.get_indexer(list(cells))
+        if cells is not None and (cols < 0).any():
+            raise KeyError(f"Not in pyramid: {list(np.asarray(list(cells))[cols < 0])}")
+        n = self.time.size
+        if window is None:
+            start, stop = 0, n
+        else:
+            start = max(int(np.searchsorted(self.time, window[0])) - 1, 0)
+            stop = min(int(np.searchsorted(self.time, window[1], side="right")) + 1, n)
+        k = self.select_level(stop - start, n_pixels)
+        if k == 0:
+            y = self.signals[start:stop, cols].T
+            return np.broadcast_to(self.time[start:stop], y.shape), y
+
+        width = 2**k
+        first, last = start // width, -(-stop // width)
+        bins = np.asarray(self.levels[self.offsets[k] + first : self.offsets[k] + last, :, cols])
+        # Bins x 2 x cells -> cells x (2 * bins), min before max.
+        y = bins.transpose(2, 0, 1).reshape(bins.shape[2], -1)
+        centers = np.minimum(np.arange(first, last) * width + (width - 1) / 2, n - 1)
+        x = np.interp(centers, np.arange(n), self.time).repeat(2)
+        return np.broadcast_to(x, y.shape), y
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# spectral.py
+
+Module (analysis): Batched power spectral density and band power for every cell in a session.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.integrate import trapezoid
+from scipy.signal import get_window
+
+
+@dataclass
+class Spectrum:
+    """
+    Power spectral density for each cell, computed in one batched pass.
+
+    Attributes
+    ----------
+    freqs : np.ndarray
+        Frequency bins, in Hz.
+    power : np.ndarray
+        Cells x frequency array of power spectral density (units**2 / Hz).
+    cells : np.ndarray
+        Cell names matching the rows of ``power``.
+    fs : float
+        Sampling rate, in Hz, the spectrum was computed with.
+    """
+
+    freqs: np.ndarray
+    power: np.ndarray
+    cells: np.ndarray
+    fs: float
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.power.shape[0]} cells x {self.power.shape[1]} freqs"
+
+    def to_frame(self) -> pd.DataFrame:
+        """Cells x frequency DataFrame of the power spectral density."""
+        return pd.DataFrame(self.power, index=self.cells, columns=self.freqs)
+
+    def band_power(self, bands: dict) -> pd.DataFrame:
+        """
+        Integrated power within each frequency band.
+
+        Parameters
+        ----------
+        bands : dict
+            Band name : (low, high) pairs, in Hz. Both edges are inclusive.
+
+        Returns
+        -------
+        pd.DataFrame
+            Cells x bands.
+        """
+        out = {}
+        for name, (low, high) in bands.items():
+            mask = (self.freqs >= low) & (self.freqs <= high)
+            if mask.sum() < 2:
+                raise ValueError(f"Band {name} ({low}-{high} Hz) spans fewer than two frequency bins.")
+            out[name] = trapezoid(self.power[:, mask], self.freqs[mask], axis=1)
+        return pd.DataFrame(out, index=self.cells)
+
+
+def _as_cell_major(signals) -> tuple[np.ndarray, np.ndarray]:
+    """Return a (cells, time) float32 C-contiguous array and the matching cell names."""
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore")
+        cells = np.asarray(signals.columns)
+        arr = signals.to_numpy(dtype=np.float32)
+    else:
+        arr = np.asarray(signals, dtype=np.float32)
+        if arr.ndim == 1:
+            arr = arr[:, None]
+        cells = np.arange(arr.shape[1])
+    return np.ascontiguousarray(arr.T), cells
+
+
+def get_psd(
+    signals: pd.DataFrame | np.ndarray,
+    fs: float,
+    nperseg: Optional[int] = None,
+    noverlap: Optional[int] = None,
+    window: str = "hann",
+    chunk_size: int = 64,
+) -> Spectrum:
+    """
+    Welch power spectral density for all cells at once.
+
+    Segments are gathered as strided views of the (cells, time) float32 buffer and
+    transformed ``chunk_size`` segments at a time with a real FFT, so memory stays
+    bounded regardless of session length. Setting ``nperseg`` to the number of
+    samples gives a single whole-session periodogram.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame | np.ndarray
+        Time x cells. A ``time`` column, if present, is ignored.
+    fs : float
+        Sampling rate, in Hz. Use ``TraceData.sampling_rate``.
+    nperseg : int, optional
+        Samples per segment. Defaults to 60 seconds of data, capped at the session length.
+    noverlap : int, optional
+        Samples shared between neighbouring segments. Defaults to ``nperseg // 2``.
+    window : str
+        Window passed to ``scipy.signal.get_window``.
+    chunk_size : int
+        Number of segments transformed per batch.
+
+    Returns
+    -------
+    Spectrum
+        Cells x frequency power spectral density.
+    """
+    data, cells = _as_cell_major(signals)
+    n_cells, n_samples = data.shape
+    if nperseg is None:
+        nperseg = int(60 * fs)
+    nperseg = min(int(nperseg), n_samples)
+    if noverlap is None:
+        noverlap = nperseg // 2
+    step = nperseg - noverlap
+    if step <= 0:
+        raise ValueError("noverlap must be smaller than nperseg.")
+
+    win = get_window(window, nperseg).astype(np.float32)
+    scale = 1.0 / (fs * float(np.sum(win.astype(np.float64) ** 2)))
+    segments = np.lib.stride_tricks.sliding_window_view(data, nperseg, axis=1)[:, ::step, :]
+    n_segments = segments.shape[1]
+
+    power = np.zeros((n_cells, nperseg // 2 + 1), dtype=np.float64)
+    for start in range(0, n_segments, chunk_size):
+        chunk = segments[:, start : start + chunk_size, :]
+        work = chunk - chunk.mean(axis=-1, keepdims=True, dtype=np.float32)
+        work *= win
+        spec = np.fft.rfft(work, axis=-1)
+        power += (spec.real**2 + spec.imag**2).sum(axis=1, dtype=np.float64)
+
+    power *= scale / n_segments
+    # One-sided spectrum: double every bin but DC (and Nyquist, for even segments).
+    if nperseg % 2:
+        power[:, 1:] *= 2
+    else:
+        power[:, 1:-1] *= 2
+    freqs = np.fft.rfftfreq(nperseg, d=1.0 / fs)
+    return Spectrum(freqs=freqs, power=power, cells=cells, fs=fs)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# transients.py
+
+Module (analysis): Threshold-plus-hysteresis calcium transient detection for all cells at once.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# One row per transient. Frames index into TraceData.time.
+TRANSIENT_DTYPE = np.dtype(
+    [
+        ("cell", np.int32),
+        ("onset", np.int32),
+        ("peak", np.int32),
+        ("offset", np.int32),
+        ("amplitude", np.float32),
+        ("duration", np.float32),
+        ("auc", np.float32),
+    ]
+)
+
+
+def detect_transients(
+    signals: pd.DataFrame | np.ndarray,
+    binsize: float,
+    high: float = 2.5,
+    low: float = 0.5,
+    min_duration: float = 0.0,
+) -> np.ndarray:
+    """
+    Find calcium transients in every cell in one array pass.
+
+    A transient is a contiguous run of samples above ``low`` that reaches ``high`` at
+    least once (hysteresis thresholding). Runs of every cell are found together by
+    differencing the padded (cells, time) mask, and per-run peak and area are reduced
+    with ``np.maximum.reduceat`` / ``np.add.reduceat`` over the flattened trace.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame | np.ndarray
+        Time x cells, usually z-scores. A ``time`` column, if present, is ignored.
+    binsize : float
+        Seconds per frame.
+    high : float
+        Value a run must reach to count as a transient.
+    low : float
+        Value that delimits the onset and offset of a run.
+    min_duration : float
+        Shortest transient to keep, in seconds.
+
+    Returns
+    -------
+    np.ndarray
+        Structured array with ``TRANSIENT_DTYPE``, sorted by cell then onset.
+        ``offset`` is exclusive, ``duration`` is in seconds and ``auc`` in units x seconds.
+    """
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore").to_numpy()
+    data = np.ascontiguousarray(np.asarray(signals, dtype=np.float32).T)
+    n_cells, n_frames = data.shape
+
+    padded = np.zeros((n_cells, n_frames + 2), dtype=np.int8)
+    padded[:, 1:-1] = data > low
+    edges = np.diff(padded, axis=1)
+    cell, onset = np.nonzero(edges == 1)
+    offset = np.nonzero(edges == -1)[1]
+    if cell.size == 0:
+        return np.zeros(0, dtype=TRANSIENT_DTYPE)
+
+    # Reduce each [onset, offset) run of the flattened trace; a sentinel keeps the last
+    # offset a valid reduceat index.
+    flat = np.append(data.ravel(), np.float32(0))
+    bounds = np.empty(cell.size * 2, dtype=np.intp)
+    bounds[0::2] = cell * n_frames + onset
+    bounds[1::2] = cell * n_frames + offset
+    peak_value = np.maximum.reduceat(flat, bounds)[0::2]
+    area = np.add.reduceat(flat.astype(np.float64), bounds)[0::2]
+
+    duration = (offset - onset) * binsize
+    keep = (peak_value >= high) & (duration >= min_duration)
+    cell, onset, offset = cell[keep], onset[keep], offset[keep]
+    peak_value, area, duration = peak_value[keep], area[keep], duration[keep]
+
+    # First frame of each kept run that reaches its peak value.
+    lengths = offset - onset
+    run_id = np.repeat(np.arange(cell.size), lengths)
+    frames = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - onset, lengths)
+    hits = data[cell[run_id], frames] == peak_value[run_id]
+    _, first = np.unique(run_id[hits], return_index=True)
+    peak = frames[hits][first]
+
+    events = np.zeros(cell.size, dtype=TRANSIENT_DTYPE)
+    events["cell"] = cell
+    events["onset"] = onset
+    events["peak"] = peak
+    events["offset"] = offset
+    events["amplitude"] = peak_value
+    events["duration"] = duration
+    events["auc"] = area * binsize
+    return events
+
+
+def event_rates(
+    events: np.ndarray,
+    time: np.ndarray,
+    intervals: dict,
+    cells: Iterable | int | pd.DataFrame = None,
+) -> pd.DataFrame:
+    """
+    Transient rate of every cell within each set of intervals.
+
+    Onsets are already sorted by (cell, onset), so counts are two ``searchsorted`` calls
+    on a composite (cell, time) key instead of a rescan of the traces.
+
+    Parameters
+    ----------
+    events : np.ndarray
+        Output of detect_transients.
+    time : np.ndarray
+        Trace time, in seconds, that ``events`` frames index into.
+    intervals : dict
+        Name : list of [start, stop) pairs, in seconds, e.g. one entry per behavioral
+        state or per stimulus (post-delivery windows).
+    cells : Iterable | int | pd.DataFrame, optional
+        The cells, so ones without events get a rate of 0: their names, their number (for
+        integer indices), or the signals given to detect_transients, whose columns (but
+        ``time``) are used. Defaults to integer indices up to the last cell with an event.
+
+    Returns
+    -------
+    pd.DataFrame
+        Cells x interval names, in events per second.
+    """
+    time = np.asarray(time, dtype=float)
+    if isinstance(cells, pd.DataFrame):
+        cells = cells.columns.drop("time", errors="ignore")
+    elif isinstance(cells, (int, np.integer)):
+        cells = np.arange(cells)
+    elif cells is None:
+        cells = np.arange(int(events["cell"].max()) + 1 if events.size else 0)
+    n_cells = len(cells)
+    span = time[-1] - time[0] + 1
+    keys = events["cell"] * span + time[events["onset"]]
+    offsets = np.arange(n_cells)[:, None] * span
+
+    rates = {}
+    for name, bounds in intervals.items():
+        # Clipped to the recording so a query never reaches into the next cell's keys.
+        bounds = np.clip(np.asarray(bounds, dtype=float).reshape(-1, 2), time[0], time[-1] + 0.5)
+        lo = np.searchsorted(keys, offsets + bounds[:, 0])
+        hi = np.searchsorted(keys, offsets + bounds[:, 1])
+        total = np.sum(bounds[:, 1] - bounds[:, 0])
+        rates[name] = (hi - lo).sum(axis=1) / total if total > 0 else np.nan
+    return pd.DataFrame(rates, index=list(cells))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# triggered.py
+
+Module (analysis): Vectorized event-triggered (e.g. lick-triggered) averages across all cells.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TriggeredAverage:
+    """
+    Event-aligned average of every cell.
+
+    Attributes
+    ----------
+    lags : np.ndarray
+        Time relative to the event, in seconds, for each sample of the window.
+    mean : np.ndarray
+        Window x cells average across events.
+    sem : np.ndarray
+        Window x cells standard error of the mean.
+    ci_low, ci_high : np.ndarray | None
+        Window x cells bootstrap confidence bounds, None if no bootstrap was run.
+    cells : np.ndarray
+        Cell names matching the columns of each array.
+    n_events : int
+        Number of events that contributed to the average.
+    """
+
+    lags: np.ndarray
+    mean: np.ndarray
+    sem: np.ndarray
+    ci_low: Optional[np.ndarray]
+    ci_high: Optional[np.ndarray]
+    cells: np.ndarray
+    n_events: int
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.n_events} events, {len(self.cells)} cells"
+
+    def to_frame(self, stat: str = "mean") -> pd.DataFrame:
+        """Lags x cells DataFrame of the given statistic (mean, sem, ci_low, ci_high)."""
+        return pd.DataFrame(getattr(self, stat), index=self.lags, columns=self.cells)
+
+
+def exclude_near(events: Iterable, reference: Iterable, seconds: float) -> np.ndarray:
+    """
+    Drop events that fall within ``seconds`` (before or after) of any reference time.
+
+    Parameters
+    ----------
+    events : Iterable
+        Event times to filter, e.g. lick timestamps.
+    reference : Iterable
+        Times to keep clear of, e.g. every tastant delivery.
+    seconds : float
+        Exclusion radius, in seconds.
+
+    Returns
+    -------
+    np.ndarray
+        Sorted events farther than ``seconds`` from every reference time.
+    """
+    events = np.sort(np.asarray(events, dtype=float))
+    reference = np.sort(np.asarray(reference, dtype=float))
+    if reference.size == 0 or events.size == 0:
+        return events
+    pos = np.clip(np.searchsorted(reference, events), 1, reference.size - 1)
+    nearest = np.minimum(np.abs(events - reference[pos - 1]), np.abs(reference[pos] - events))
+    return events[nearest > seconds]
+
+
+def triggered_average(
+    signals: pd.DataFrame | np.ndarray,
+    time: np.ndarray,
+    events: Iterable,
+    pre: float = 1.0,
+    post: float = 2.0,
+    n_boot: int = 1000,
+    ci: float = 95,
+    chunk_size: int = 512,
+    seed: Optional[int] = None,
+) -> TriggeredAverage:
+    """
+    Average every cell around each event without materialising the events x window x cells tensor.
+
+    Windows are gathered from a strided ``sliding_window_view`` of the trace, which is a
+    zero-copy view; only ``chunk_size`` events are copied at a time while sums, squared sums
+    and bootstrap resample sums are accumulated. Events whose window runs past either end
+    of the recording are dropped.
+
+    Parameters
+    ----------
+    signals : pd.DataFrame | np.ndarray
+        Time x cells. A ``time`` column, if present, is ignored.
+    time : np.ndarray
+        Trace time, in seconds, matching the rows of ``signals``.
+    events : Iterable
+        Event times, in seconds.
+    pre, post : float
+        Seconds to include before and after each event.
+    n_boot : int
+        Number of bootstrap resamples for the confidence interval, 0 to skip.
+    ci : float
+        Confidence interval width, in percent.
+    chunk_size : int
+        Events gathered per batch.
+    seed : int, optional
+        Seed for the bootstrap resampling.
+
+    Returns
+    -------
+    TriggeredAverage
+    """
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore")
+        cells = np.asarray(signals.columns)
+        data = signals.to_numpy()
+    else:
+        data = np.asarray(signals)
+        cells = np.arange(data.shape[1])
+    time = np.asarray(time, dtype=float)
+    binsize = time[1] - time[0]
+    n_pre, n_post = int(round(pre / binsize)), int(round(post / binsize))
+    width = n_pre + n_post + 1
+    lags = np.arange(-n_pre, n_post + 1) * binsize
+
+    # Events are matched to trace time upstream, so the half-bin shift just guards rounding.
+    idx = np.searchsorted(time, np.asarray(events, dtype=float) - binsize / 2)
+    starts = idx - n_pre
+    fits = (starts >= 0) & (starts + width <= data.shape[0])
+    if not fits.all():
+        logger.info(f"Dropped {np.count_nonzero(~fits)} events with windows outside the recording.")
+    starts = starts[fits]
+    n = starts.size
+    if n == 0:
+        raise ValueError("No events with a full window inside the recording.")
+
+    # (time - width + 1, cells, width) view, no data is copied here.
+    windows = np.lib.stride_tricks.sliding_window_view(data, width, axis=0)
+    n_cells = data.shape[1]
+    total = np.zeros((n_cells, width))
+    total_sq = np.zeros((n_cells, width))
+    if n_boot:
+        rng = np.random.default_rng(seed)
+        counts = rng.multinomial(n, np.full(n, 1 / n), size=n_boot).astype(np.float32)
+        boot_total = np.zeros((n_boot, n_cells * width))
+
+    for start in range(0, n, chunk_size):
+        chunk = windows[starts[start : start + chunk_size]].astype(np.float64, copy=False)
+        total += chunk.sum(axis=0)
+        total_sq += np.einsum("ecw,ecw->cw", chunk, chunk)
+        if n_boot:
+            boot_total += counts[:, start : start + chunk_size] @ chunk.reshape(chunk.shape[0], -1)
+
+    mean = total / n
+    var = np.maximum(total_sq / n - mean**2, 0) * n / max(n - 1, 1)
+    sem = np.sqrt(var / n)
+    ci_low = ci_high = None
+    if n_boot:
+        boot_means = (boot_total / n).reshape(n_boot, n_cells, width)
+        tail = (100 - ci) / 2
+        ci_low, ci_high = np.percentile(boot_means, [tail, 100 - tail], axis=0)
+        ci_low, ci_high = ci_low.T, ci_high.T
+    return TriggeredAverage(
+        lags=lags,
+        mean=mean.T,
+        sem=sem.T,
+        ci_low=ci_low,
+        ci_high=ci_high,
+        cells=cells,
+        n_events=n,
+    )
@@ -11,6 +11,7 @@ import logging
 from dataclasses import dataclass, field, InitVar
 from typing import ClassVar, Optional
 import pandas as pd
+from canalysis.analysis import triggered
 from canalysis.data.containers.all_data import AllData
 from canalysis.data.containers.trace_data import TraceData
 from canalysis.data.containers.taste_data import TasteData
@@ -143,6 +144,34 @@ class CalciumData(Mixins.CalPlots):
         """return a list of signal values via cell integer indexing (0 through N cells"""
         return list(self.tracedata.signals.iloc[:, i])
 
+    def get_lick_triggered_average(
+        self,
+        pre: float = 1.0,
+        post: float = 2.0,
+        exclude_tastant: Optional[float] = None,
+        zscore: bool = True,
+        **kwargs,
+    ) -> triggered.TriggeredAverage:
+        """
+        Lick-triggered average of every cell.
+
+        Parameters
+        ----------
+        pre, post : float
+            Seconds to include before and after each lick.
+        exclude_tastant : float, optional
+            Drop licks within this many seconds of any tastant delivery.
+        zscore : bool
+            Average z-scored traces instead of raw signals.
+        **kwargs : dict
+            Passed to analysis.triggered.triggered_average (n_boot, ci, chunk_size, seed).
+        """
+        licks = self.eventdata.timestamps["Lick"]
+        if exclude_tastant is not None:
+            licks = triggered.exclude_near(licks, self.eventdata.alltastestim, exclude_tastant)
+        signals = self.tracedata.zscores if zscore else self.tracedata.signals
+        return triggered.triggered_average(signals, self.tracedata.time, licks, pre=pre, post=post, **kwargs)
+
     def combine(self, eatingevent: list = None, stimevent: list = None) -> tuple[pd.DataFrame, pd.Series]:
         eating, eatingcolors = self.eatingdata.get_signals_from_events(eatingevent)
         stim, stimcolors = self.tastedata.get_signals_from_events(stimevent)
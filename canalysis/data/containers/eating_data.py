@@ -10,13 +10,14 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
+import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 from typing import Optional, Generator, Iterable, Any
 from canalysis.helpers import funcs
 from canalysis.data.data_utils.file_handler import FileHandler
 from canalysis.data.containers.trace_data import TraceData
-from canalysis.graphs.heatmaps import EatingHeatmap
+from canalysis.graphs.heatmaps import EatingHeatmap, eating_lines, eating_template, save_figure
 
 logger = logging.getLogger(__name__)
 
@@ -182,14 +183,18 @@ class EatingData:
                     np.round(data[idx + 2][2], 2),
                 )  # eating end
 
-    def generate_eating_heatmap(
+    def eating_heatmap_data(
         self,
         premask: Optional[bool] = False,
-        save_dir: Optional[str] = "",
         interv_size: Optional[str | float] = -np.inf,
-        title: Optional[str] = "",
-        **figargs,
     ) -> Generator[Iterable, None, None]:
+        """
+        Heatmap input for each entry-eating interval longer than ``interv_size`` seconds.
+
+        Yields (data, premask, (eatingstart, entrystart, eatingend)), where data is cells x
+        time with negative values set to 0, padded with empty columns up to the longest
+        interval when ``premask`` is set.
+        """
         for signal, time, approachstart, entrystart, eatingstart, eatingend in self.generate_entry_eating_signals():
             tsize = len(signal.T.columns) / 10
             if tsize > interv_size:
@@ -198,18 +203,44 @@ class EatingData:
                 signal = signal.T
                 signal.columns = np.round(np.arange(0, len(signal.columns) / 10, 0.1), 1)
                 if premask:
-                    premask = signal.columns
+                    mask = signal.columns
                     newcols = np.round(np.arange(signal.columns[-1] + 0.1, self.get_largest_interv() / 10, 0.1), 1)
-                    finalsig = pd.concat([signal, pd.DataFrame(columns=newcols, index=signal.index)], axis=1)
-                    data = finalsig
+                    data = pd.concat([signal, pd.DataFrame(columns=newcols, index=signal.index)], axis=1)
                 else:
-                    premask = None
+                    mask = None
                     data = signal
-                heatmap = EatingHeatmap(
-                    data, premask=premask, title=title, save_dir=save_dir, save_name=str(data.shape[1]), **figargs
-                )
-                fig = heatmap.default_heatmap(eatingstart, entrystart, eatingend)
+                yield data, mask, (eatingstart, entrystart, eatingend)
+
+    def generate_eating_heatmap(
+        self,
+        premask: Optional[bool] = False,
+        save_dir: Optional[str] = "",
+        interv_size: Optional[str | float] = -np.inf,
+        title: Optional[str] = "",
+        queue=None,
+        **figargs,
+    ) -> Generator[Iterable, None, None]:
+        """
+        Eating heatmap of every entry-eating interval, saved to ``save_dir`` when given.
+
+        One figure is built per heatmap shape and updated in place (graphs.heatmaps.eating_template);
+        with ``premask`` every interval is padded to the same shape and shares one figure.
+        Each yielded figure is only valid until the next one. Figures are closed when the
+        loop finishes. A SaveQueue (graphs.graph_utils.save_queue) moves the saves to
+        background threads.
+        """
+        templates = {}
+        try:
+            for data, mask, lines in self.eating_heatmap_data(premask, interv_size):
+                if data.shape not in templates:
+                    templates[data.shape] = eating_template(data.shape, **figargs)
+                fig = templates[data.shape].update(data, title=title, lines=eating_lines(*lines))
+                if save_dir:
+                    save_figure(fig, save_dir, str(data.shape[1]), queue=queue)
                 yield fig
+        finally:
+            for template in templates.values():
+                plt.close(template.fig)
 
     def store_eating_heatmaps(
         self,
@@ -86,16 +86,83 @@ class TasteData:
                 signal = signals.iloc[data_ind, :]
                 yield stim, iteration, signal
 
-    def loop_taste(self, save_dir: Optional[str] = "", **kwargs) -> Generator[Iterable, None, None]:
-        from graphs.heatmaps import EatingHeatmap
-
-        for stim, iteration, signal in self.get_taste_df():
-            heatmap = EatingHeatmap(
-                signal.T,
-                title=f"{stim}, Trial: {iteration + 1}",
-                save_dir=save_dir,
-                save_name=f"{stim}_{iteration}",
-                **kwargs,
-            )
-            fig = heatmap.default_heatmap(maptype="taste")
-            yield fig
+    def get_trial_tensor(
+        self,
+        pre: float = 2.0,
+        post: float = 5.0,
+        events: Optional[Iterable] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Peri-stimulus signals of every trial stacked into one array.
+
+        Each trial is aligned to the frame nearest its delivery time, so every trial has the
+        same number of frames. Trials whose window runs past either end of the recording are
+        dropped.
+
+        Parameters
+        ----------
+        pre : float
+            Seconds before delivery.
+        post : float
+            Seconds after delivery.
+        events : Iterable, optional
+            Tastants to include. Defaults to every key of trial_times.
+
+        Returns
+        -------
+        tensor : np.ndarray
+            Trials x frames x cells, float32.
+        labels : np.ndarray
+            Tastant of each trial.
+        lags : np.ndarray
+            Seconds relative to delivery of each frame.
+        """
+        time = np.asarray(self.__time, dtype=float)
+        data = self.__signals.drop(columns=["time"]).to_numpy(dtype=np.float32)
+        binsize = float(np.median(np.diff(time)))
+        offsets = np.arange(-int(round(pre / binsize)), int(round(post / binsize)) + 1)
+
+        events = self.trial_times.keys() if events is None else events
+        labels = [stim for stim in events for _ in self.trial_times[stim]]
+        starts = [trial for stim in events for trial in self.trial_times[stim]]
+        # Nearest frame: the first frame at or after delivery, or the one before if closer.
+        after = np.clip(np.searchsorted(time, starts), 1, time.size - 1)
+        centers = after - (np.asarray(starts) - time[after - 1] < time[after] - np.asarray(starts))
+        frames = centers[:, None] + offsets
+        keep = (frames[:, 0] >= 0) & (frames[:, -1] < time.size)
+        return data[frames[keep]], np.asarray(labels)[keep], offsets * binsize
+
+    def loop_taste(self, save_dir: Optional[str] = "", queue=None, **kwargs) -> Generator[Iterable, None, None]:
+        """
+        Taste heatmap of every trial, saved to ``save_dir`` when given.
+
+        One figure is built per trial shape and updated in place (graphs.heatmaps.taste_template),
+        so each yielded figure is only valid until the next one; save or copy it before
+        advancing. Figures are closed when the loop finishes.
+
+        Parameters
+        ----------
+        save_dir : str, optional
+            Directory to save ``{stim}_{trial}.png`` to.
+        queue : SaveQueue, optional
+            Hand the saves to background threads (graphs.graph_utils.save_queue); the
+            figure is rendered before the next trial updates it.
+        **kwargs : dict
+            Passed to HeatmapTemplate (cmap, colorbar, imshow arguments).
+        """
+        import matplotlib.pyplot as plt
+        from canalysis.graphs.heatmaps import TASTE_ONSET, save_figure, taste_template
+
+        templates = {}
+        try:
+            for stim, iteration, signal in self.get_taste_df():
+                data = signal.T
+                if data.shape not in templates:
+                    templates[data.shape] = taste_template(data.shape, **kwargs)
+                fig = templates[data.shape].update(data, title=f"{stim}, Trial: {iteration + 1}", lines=(TASTE_ONSET,))
+                if save_dir:
+                    save_figure(fig, save_dir, f"{stim}_{iteration}", queue=queue)
+                yield fig
+        finally:
+            for template in templates.values():
+                plt.close(template.fig)
@@ -12,7 +12,10 @@ import numpy as np
 import pandas as pd
 import scipy.stats as stats
 
+from canalysis.analysis import deconvolution, dff, pyramid, spectral, transients
 from canalysis.data.data_utils.file_handler import FileHandler
+from canalysis.data.data_utils.session_cache import SessionCache
+from canalysis.helpers import funcs
 
 
 # %%
@@ -32,6 +35,12 @@ class TraceData:
         self.time = np.arange(0, self.tracedata.shape[0] / 10, 0.1)
         self.binsize = self.time[2] - self.time[1]
         self.zscores = self._get_zscores()
+        self._transients: dict = {}
+        self._pyramids: dict = {}
+        self.denoised: pd.DataFrame | None = None
+        self.spikes: pd.DataFrame | None = None
+        self.dff: pd.DataFrame | None = None
+        self.ar_coefs: pd.Series | None = None
 
     def __repr__(self):
         return type(self).__name__
@@ -40,6 +49,11 @@ class TraceData:
     def shape(self):
         return self.signals.shape
 
+    @property
+    def sampling_rate(self) -> float:
+        """Frames per second of the trace recording, from its recorded timestamps."""
+        return float(1 / np.median(np.diff(self.tracedata["time"])))
+
     def __hash__(self):
         return hash(repr(self))
 
@@ -82,6 +96,115 @@ class TraceData:
         self.tracedata = _df
         return None
 
+    def get_spectrum(self, **kwargs) -> spectral.Spectrum:
+        """Power spectral density of every cell, see analysis.spectral.get_psd for kwargs."""
+        return spectral.get_psd(self.signals, self.sampling_rate, **kwargs)
+
+    @property
+    def cache(self) -> SessionCache:
+        return SessionCache(self.filehandler.cachedir)
+
+    def detect_transients(
+        self,
+        high: float = 2.5,
+        low: float = 0.5,
+        min_duration: float = 0.0,
+        use_cache: bool = True,
+    ) -> np.ndarray:
+        """
+        Threshold-plus-hysteresis transients of every cell, from z-scores.
+
+        Results are kept in memory and in the session cache, keyed by a hash of the
+        z-scores and thresholds, so repeated calls (and later sessions) skip detection.
+        See analysis.transients.detect_transients for the parameters and output fields.
+        """
+        signals = self.zscores.drop(columns=["time"])
+        key = funcs.fingerprint(signals.to_numpy(), high=high, low=low, min_duration=min_duration)
+        if key in self._transients:
+            return self._transients[key]
+        events = self.cache.load("transients", key) if use_cache else None
+        if events is None:
+            events = transients.detect_transients(signals, self.binsize, high, low, min_duration)
+            if use_cache:
+                self.cache.save(events, "transients", key)
+        self._transients[key] = events
+        return events
+
+    def get_pyramid(self, use_cache: bool = True) -> pyramid.TracePyramid:
+        """
+        Min/max pyramid of every cell's signal, for drawing any window at any zoom.
+
+        Built once (analysis.pyramid.build_pyramid) and stored as float32 in the session
+        cache, keyed by a hash of the signals; later calls and sessions memory-map it, so
+        only the bins a query touches are read from disk.
+        """
+        signals = self.signals.to_numpy()
+        key = funcs.fingerprint(signals, name="pyramid", dtype="float32")
+        if key in self._pyramids:
+            return self._pyramids[key]
+        levels = self.cache.load("pyramid", key, mmap_mode="r") if use_cache else None
+        if levels is None:
+            levels = pyramid.build_pyramid(signals)
+            if use_cache:
+                self.cache.save(levels, "pyramid", key)
+                levels = self.cache.load("pyramid", key, mmap_mode="r")
+        self._pyramids[key] = pyramid.TracePyramid(levels, self.time, self.signals)
+        return self._pyramids[key]
+
+    def get_event_rates(self, intervals: dict, **detectargs) -> pd.DataFrame:
+        """Transient rate (events / s) of every cell within each named set of [start, stop) intervals."""
+        events = self.detect_transients(**detectargs)
+        return transients.event_rates(events, self.time, intervals, cells=self.cells)
+
+    def get_dff(
+        self,
+        window: float = 60.0,
+        percentile: float = 8,
+        method: str = "percentile",
+        dtype: type = np.float64,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """
+        DF/F against a sliding-window baseline, which tracks drift that whole-session z-scores can't.
+
+        Sets and returns ``dff`` (time x cells, with a ``time`` column like ``zscores``).
+
+        Parameters
+        ----------
+        window : float
+            Baseline window, in seconds.
+        percentile : float
+            Baseline percentile within each window.
+        method : str
+            "percentile" (exact, O(T log W) per cell, parallel across cells), "approx"
+            (strided percentile + interpolation) or "minimum" (running minimum of the smoothed trace).
+        dtype : type
+            np.float32 halves memory for hour-long sessions.
+        **kwargs : dict
+            Passed to analysis.dff.get_baseline (n_jobs, smooth, step).
+        """
+        self.dff = dff.get_dff(self.signals, self.sampling_rate, window, percentile, method, dtype, **kwargs)
+        self.dff["time"] = self.time
+        return self.dff
+
+    def deconvolve(self, source: str = "signals", **kwargs) -> pd.DataFrame:
+        """
+        Infer spiking activity of every cell with the OASIS AR(1) solver.
+
+        Sets ``denoised`` and ``spikes`` (time x cells, with a ``time`` column like ``zscores``)
+        and ``ar_coefs``. See analysis.deconvolution.deconvolve for kwargs (g, lam, s_min, n_jobs).
+
+        Parameters
+        ----------
+        source : str
+            Attribute to deconvolve, "signals", "zscores" or "dff".
+        """
+        result = deconvolution.deconvolve(getattr(self, source), **kwargs)
+        self.denoised = result.denoised.assign(time=self.time)
+        self.spikes = result.spikes.assign(time=self.time)
+        self.ar_coefs = result.g
+        return self.spikes
+
     def reorder(self, cols) -> None:
         self.zscores = self.zscores[cols]
         self.zscores["time"] = self.time
@@ -1,4 +1,5 @@
 
 from .displayable_path import DisplayablePath
 from .file_handler import FileHandler
-__all__ = ["FileHandler", "DisplayablePath"]
\ No newline at end of file
+from .session_cache import SessionCache
+__all__ = ["FileHandler", "DisplayablePath", "SessionCache"]
\ No newline at end of file
@@ -107,6 +107,11 @@ class FileHandler:
     def directory(self, new_dir: str) -> None:
         self._directory: str = new_dir
 
+    @property
+    def cachedir(self) -> Path:
+        """Directory for derived arrays cached alongside this session's data."""
+        return self.sessiondir / "cache"
+
     @property
     def tracename(self) -> str:
         return self._tracename
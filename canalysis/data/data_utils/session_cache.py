@@ -0,0 +1,66 @@
+"""
+#session_cache.py
+
+Module(data/data_utils): On-disk cache of derived per-session arrays, keyed by content hash.
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """
+    Store derived arrays (event tables, pyramids, ...) next to a session's data.
+
+    Each entry is a single ``.npy`` file named ``<name>_<key>.npy``, where ``key`` is a
+    content hash of the inputs and parameters (see helpers.funcs.fingerprint), so stale
+    entries are never returned for changed data.
+
+    Parameters:
+    ___________
+    directory: str | Path
+        - Cache directory, created on first write.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory: Path = Path(directory)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.directory})"
+
+    def path(self, name: str, key: str) -> Path:
+        return self.directory / f"{name}_{key}.npy"
+
+    def __contains__(self, item: tuple[str, str]) -> bool:
+        return self.path(*item).is_file()
+
+    def load(self, name: str, key: str, mmap_mode: Optional[str] = None) -> Optional[np.ndarray]:
+        """Return the cached array, or None if it has not been stored yet."""
+        path = self.path(name, key)
+        if not path.is_file():
+            return None
+        logger.info(f"Loaded {path.name} from session cache.")
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    def save(self, arr: np.ndarray, name: str, key: str) -> Path:
+        """Write ``arr`` atomically so a half-written file is never picked up by load."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(name, key)
+        tmp = path.with_suffix(".tmp.npy")
+        np.save(tmp, arr, allow_pickle=False)
+        tmp.replace(path)
+        return path
+
+    def clear(self, name: Optional[str] = None) -> None:
+        """Delete every cached entry, or only those stored under ``name``."""
+        if not self.directory.is_dir():
+            return None
+        for path in self.directory.glob(f"{name}_*.npy" if name else "*.npy"):
+            path.unlink()
+        return None
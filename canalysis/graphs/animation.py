@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# animation.py
+
+Module (graph): Blitted animations of PCA trajectories and trace playback, streamed to a video file.
+"""
+from __future__ import annotations
+
+import logging
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def ffmpeg_path() -> Optional[str]:
+    """The ffmpeg executable from rcParams["animation.ffmpeg_path"], else from PATH, else None."""
+    return shutil.which(rcParams["animation.ffmpeg_path"]) or shutil.which("ffmpeg")
+
+
+class FFmpegWriter:
+    def __init__(self, path: str | Path, size: tuple, fps: float, ffmpeg: str, codec: Optional[str] = None):
+        """
+        Pipe raw RGBA frames to an ffmpeg subprocess, which encodes them as they arrive.
+
+        Parameters
+        ----------
+        path : str | Path
+            Output file; ffmpeg picks the container from the extension.
+        size : tuple
+            (width, height) of every frame, in pixels.
+        fps : float
+            Frames per second.
+        ffmpeg : str
+            ffmpeg executable.
+        codec : str, optional
+            Video codec, h264 by default (none for .gif).
+        """
+        self.path = str(path)
+        self.output = self.path
+        self.size = size
+        args = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgba"]
+        args += ["-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-"]
+        if not self.path.lower().endswith(".gif"):
+            # yuv420p (what players expect) needs even dimensions.
+            args += ["-vcodec", codec or "h264", "-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        elif codec:
+            args += ["-vcodec", codec]
+        self.proc = subprocess.Popen(args + [self.path], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, rgba: np.ndarray) -> None:
+        self.proc.stdin.write(rgba.tobytes())
+
+    def close(self) -> None:
+        _, err = self.proc.communicate()
+        if self.proc.returncode:
+            raise RuntimeError(f"ffmpeg failed writing {self.path}: {err.decode(errors='replace').strip()}")
+
+
+class PillowWriter:
+    def __init__(self, path: str | Path, fps: float):
+        """
+        Fallback when ffmpeg is not installed.
+
+        A ``.gif`` is reduced to a 256-color palette frame by frame and written by Pillow on
+        ``close``, which needs every frame at once, so the paletted frames (a quarter of
+        the RGBA size) are kept until then. Any other extension writes a numbered PNG
+        sequence to ``<stem>_frames/``, one file per frame, so nothing is kept.
+
+        Parameters
+        ----------
+        path : str | Path
+            Output file.
+        fps : float
+            Frames per second, for the GIF frame duration.
+        """
+        self.path = Path(path)
+        self.output = str(self.path)
+        self.fps = fps
+        self.n_frames = 0
+        if self.path.suffix.lower() == ".gif":
+            self._frames: list = []
+        else:
+            self._frames = None
+            self.directory = self.path.with_name(f"{self.path.stem}_frames")
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.output = str(self.directory)
+            logger.warning(f"ffmpeg not found, writing a PNG sequence to {self.directory}")
+
+    def write(self, rgba: np.ndarray) -> None:
+        image = Image.fromarray(rgba, "RGBA")
+        if self._frames is None:
+            image.save(self.directory / f"{self.n_frames:06d}.png", compress_level=1)
+        else:
+            self._frames.append(image.convert("RGB").quantize(256))
+        self.n_frames += 1
+
+    def close(self) -> None:
+        if self._frames:
+            first, *rest = self._frames
+            first.save(self.path, save_all=True, append_images=rest, duration=1000 / self.fps, loop=0)
+            self._frames.clear()
+
+
+def open_writer(path: str | Path, size: tuple, fps: float, codec: Optional[str] = None):
+    """FFmpegWriter when ffmpeg is available (see ffmpeg_path), PillowWriter otherwise."""
+    ffmpeg = ffmpeg_path()
+    if ffmpeg is not None:
+        return FFmpegWriter(path, size, fps, ffmpeg, codec=codec)
+    return PillowWriter(path, fps)
+
+
+class _Animation:
+    fig: plt.Figure
+    n_frames: int
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.n_frames} frames"
+
+    @property
+    def artists(self) -> list:
+        """Artists ``update`` changes; everything else is drawn once as the background."""
+        raise NotImplementedError
+
+    def update(self, frame: int) -> None:
+        raise NotImplementedError
+
+    def save(
+        self,
+        path: str | Path,
+        fps: float = 10,
+        dpi: Optional[float] = None,
+        frames: Optional[Iterable[int]] = None,
+        codec: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Render every frame and stream it to ``path``.
+
+        The figure is drawn once without the animated artists and that background is
+        kept. Each frame restores the background, updates the artists in place, draws only
+        them and hands the Agg buffer to the writer (open_writer), so neither the figure
+        nor the frames are rebuilt or accumulated.
+
+        Parameters
+        ----------
+        path : str | Path
+            Output file, e.g. ``.mp4`` or ``.gif``.
+        fps : float
+            Frames per second.
+        dpi : float, optional
+            Render resolution, the figure's dpi by default.
+        frames : Iterable[int], optional
+            Frames to render, all of them by default.
+        codec : str, optional
+            ffmpeg video codec.
+
+        Returns
+        -------
+        pd.DataFrame
+            Seconds spent per frame updating artists, drawing and writing.
+        """
+        fig = self.fig
+        frames = range(self.n_frames) if frames is None else frames
+        old_dpi, old_canvas = fig.dpi, fig.canvas
+        canvas = FigureCanvasAgg(fig)
+        for artist in self.artists:
+            artist.set_animated(True)
+        times = []
+        writer = None
+        output = path
+        try:
+            fig.dpi = old_dpi if dpi is None else dpi
+            canvas.draw()
+            background = canvas.copy_from_bbox(fig.bbox)
+            height, width = np.asarray(canvas.buffer_rgba()).shape[:2]
+            writer = open_writer(path, (width, height), fps, codec=codec)
+            output = writer.output
+            for frame in frames:
+                t0 = time.perf_counter()
+                self.update(frame)
+                t1 = time.perf_counter()
+                canvas.restore_region(background)
+                for artist in self.artists:
+                    (artist.axes or fig).draw_artist(artist)
+                rgba = np.asarray(canvas.buffer_rgba())
+                t2 = time.perf_counter()
+                writer.write(rgba)
+                times.append((frame, t1 - t0, t2 - t1, time.perf_counter() - t2))
+        finally:
+            if writer is not None:
+                writer.close()
+            fig.dpi = old_dpi
+            fig.set_canvas(old_canvas)
+            for artist in self.artists:
+                artist.set_animated(False)
+        times = pd.DataFrame(times, columns=["frame", "update", "draw", "write"]).set_index("frame")
+        total = times.sum(axis=1)
+        logger.info(
+            f"Wrote {len(times)} frames to {output}: {1e3 * total.mean():.1f} ms/frame "
+            f"(update {1e3 * times['update'].mean():.1f}, draw {1e3 * times['draw'].mean():.1f}, "
+            f"write {1e3 * times['write'].mean():.1f})"
+        )
+        return times
+
+
+class PCATrajectory(_Animation):
+    def __init__(
+        self,
+        pca_df: pd.DataFrame,
+        dims: int = 3,
+        trail: int = 50,
+        color: str = "k",
+        figsize: tuple = (6, 6),
+        elev: float = 30,
+        azim: float = -60,
+    ):
+        """
+        A point moving along the PCA trajectory of a session, with a fading tail.
+
+        The axes, limits and labels are fixed for the whole animation, so the view never
+        needs a full redraw; each frame only moves the tail and the head.
+
+        Parameters
+        ----------
+        pca_df : pd.DataFrame
+            Frames x components, e.g. _PrincipalComponents.pca_df. Column names label the axes.
+        dims : int
+            2 or 3 components to show.
+        trail : int
+            Frames of history drawn behind the head.
+        color : str
+            Trajectory color.
+        figsize : tuple
+            Figure size, in inches.
+        elev, azim : float
+            3-D view angles.
+        """
+        if dims not in (2, 3) or pca_df.shape[1] < dims:
+            raise ValueError(f"Need 2 or 3 of the {pca_df.shape[1]} components, got dims={dims}")
+        self.coords = pca_df.iloc[:, :dims].to_numpy(dtype=float)
+        self.n_frames = len(self.coords)
+        self.trail = trail
+        self.fig = plt.figure(figsize=figsize)
+        if dims == 3:
+            self.ax = self.fig.add_subplot(111, projection="3d")
+            self.ax.view_init(elev=elev, azim=azim)
+            self.ax.set_zlabel(pca_df.columns[2])
+        else:
+            self.ax = self.fig.add_subplot(111)
+        self.ax.set_xlabel(pca_df.columns[0])
+        self.ax.set_ylabel(pca_df.columns[1])
+
+        lo, hi = self.coords.min(axis=0), self.coords.max(axis=0)
+        pad = 0.05 * np.where(hi > lo, hi - lo, 1.0)
+        limits = [self.ax.set_xlim, self.ax.set_ylim] + ([self.ax.set_zlim] if dims == 3 else [])
+        for i, set_lim in enumerate(limits):
+            set_lim(lo[i] - pad[i], hi[i] + pad[i])
+
+        empty = [[]] * dims
+        (self.tail,) = self.ax.plot(*empty, color=color, linewidth=1, alpha=0.6)
+        (self.head,) = self.ax.plot(*empty, "o", color=color, markersize=6)
+        self.title = self.ax.set_title("")
+
+    @property
+    def artists(self) -> list:
+        return [self.tail, self.head, self.title]
+
+    def update(self, frame: int) -> None:
+        tail = self.coords[max(frame - self.trail, 0) : frame + 1]
+        head = self.coords[frame : frame + 1]
+        if self.coords.shape[1] == 3:
+            self.tail.set_data_3d(*tail.T)
+            self.head.set_data_3d(*head.T)
+        else:
+            self.tail.set_data(*tail.T)
+            self.head.set_data(*head.T)
+        self.title.set_text(f"Frame {frame}")
+
+
+class TracePlayback(_Animation):
+    def __init__(
+        self,
+        time: np.ndarray,
+        signals: pd.DataFrame,
+        window: float = 30.0,
+        step: int = 1,
+        spacing: float = 1.2,
+        figsize: Optional[tuple] = None,
+    ):
+        """
+        Every cell scrolling past a fixed playhead, stacked as in CalPlots.plot_stacked.
+
+        The x-axis is time relative to the playhead, so ticks and labels stay put and the
+        background is drawn once; each frame replaces the segments of one LineCollection
+        and the clock text.
+
+        Parameters
+        ----------
+        time : np.ndarray
+            Time of each sample.
+        signals : pd.DataFrame
+            Time x cells. A ``time`` column, if present, is ignored.
+        window : float
+            Seconds of history shown.
+        step : int
+            Samples the playhead advances per frame.
+        spacing : float
+            Distance between baselines; each trace is scaled to a range of 1.
+        figsize : tuple, optional
+            Defaults to a height that grows with the number of cells.
+        """
+        signals = signals.drop(columns=["time"], errors="ignore")
+        self.time = np.asarray(time, dtype=float)
+        data = signals.to_numpy(dtype=float).T
+        lo, hi = data.min(axis=1, keepdims=True), data.max(axis=1, keepdims=True)
+        n_cells = data.shape[0]
+        self.offsets = spacing * np.arange(n_cells)[::-1]
+        self.data = (data - lo) / np.where(hi > lo, hi - lo, 1.0) + self.offsets[:, None]
+        self.step = step
+        self.span = max(int(round(window / np.median(np.diff(self.time)))), 1)
+        self.n_frames = -(-len(self.time) // step)
+
+        if figsize is None:
+            figsize = (8, min(max(3.0, 0.25 * n_cells), 20.0))
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        self.lines = self.ax.add_collection(LineCollection([], colors="k", linewidths=0.8), autolim=False)
+        self.ax.axvline(0, color="r", linewidth=1)
+        self.ax.set_xlim(-window, 0)
+        self.ax.set_ylim(-0.5 * spacing, self.offsets[0] + spacing)
+        self.ax.set_yticks(self.offsets + 0.5)
+        self.ax.set_yticklabels(signals.columns.tolist(), fontsize=8)
+        self.ax.set_xlabel("Time from playhead (s)")
+        for side in ("top", "right"):
+            self.ax.spines[side].set_visible(False)
+        self.clock = self.ax.text(0.99, 1.01, "", transform=self.ax.transAxes, ha="right", va="bottom")
+        self.fig.tight_layout()
+
+    @property
+    def artists(self) -> list:
+        return [self.lines, self.clock]
+
+    def update(self, frame: int) -> None:
+        stop = min(frame * self.step + 1, len(self.time))
+        start = max(stop - self.span - 1, 0)
+        now = self.time[stop - 1]
+        x = np.broadcast_to(self.time[start:stop] - now, self.data[:, start:stop].shape)
+        self.lines.set_segments(np.stack([x, self.data[:, start:stop]], axis=-1))
+        self.clock.set_text(f"{now:.1f} s")
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# batch.py
+
+Module (graph): Headless, parallel rendering of per-trial and per-cell figure sweeps.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from canalysis.graphs.graph_utils import ax_helpers
+from canalysis.graphs.graph_utils.figure_cache import FigureCache, content_key
+from canalysis.graphs.graph_utils.Mixins import cell_figure
+from canalysis.graphs.graph_utils.save_queue import SaveQueue
+from canalysis.graphs.graph_utils.templates import TraceTemplate
+from canalysis.graphs.heatmaps import TASTE_ONSET, eating_lines, eating_template, taste_template
+from canalysis.helpers.parallel import effective_n_jobs
+
+logger = logging.getLogger(__name__)
+
+# savefig arguments of the interactive methods each sweep replaces.
+STIM_SAVEFIG = {"bbox_inches": "tight", "dpi": 600, "facecolor": "white"}
+HEATMAP_SAVEFIG = {"bbox_inches": "tight", "dpi": 400, "pad_inches": 0.01}
+
+
+@dataclass
+class FigureJob:
+    """
+    One figure to render: ``func(*args, **kwargs)`` must return a Figure.
+
+    ``func`` is a module-level function and ``args`` hold only the slice of data the figure
+    draws, so a job pickles small and a worker never sees the whole session.
+
+    With ``layout``, ``func`` is a template factory instead (graph_utils.templates):
+    ``func(**layout)`` builds the figure and ``.update(*args, **kwargs)`` draws this job into
+    it. Jobs with the same func and layout share one template per worker batch.
+    """
+
+    name: str
+    func: Callable
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    savefig: dict = field(default_factory=dict)
+    layout: Optional[dict] = None
+
+    def __call__(self, templates: Optional[dict] = None):
+        if self.layout is None:
+            return self.func(*self.args, **self.kwargs)
+        templates = {} if templates is None else templates
+        key = (self.func, repr(sorted(self.layout.items())))
+        if key not in templates:
+            templates[key] = self.func(**self.layout)
+        return templates[key].update(*self.args, **self.kwargs)
+
+
+def stim_jobs(data, pre: float = 2.0, post: float = 5.0, shade: float = 0.15, width: float = 4) -> list[FigureJob]:
+    """A TraceTemplate figure per trial of a CalciumData, named ``{stim}_{trial}``."""
+    time_ = data.tracedata.time
+    signals = data.tracedata.signals.drop(columns=["time"], errors="ignore")
+    layout = {"cells": signals.columns.tolist(), "width": width}
+    values = signals.to_numpy()
+    timestamps = data.eventdata.timestamps
+    jobs = []
+    for stim, times in data.eventdata.trial_times.items():
+        for trial in times:
+            idx = np.where((time_ > trial - pre) & (time_ < trial + post))[0]
+            shading = {
+                stimmy: (
+                    ax_helpers.span_verts(timestamps[stimmy], shade, window=(trial - 1, trial + 3)),
+                    data.color_dict[stimmy],
+                )
+                for stimmy in ["Lick", "Rinse", stim]
+            }
+            jobs.append(
+                FigureJob(
+                    f"{stim}_{trial:g}",
+                    TraceTemplate,
+                    (time_[idx], values[idx], shading),
+                    savefig=STIM_SAVEFIG,
+                    layout=layout,
+                )
+            )
+    return jobs
+
+
+def cell_jobs(data, pre: float = 2.0, post: float = 4.0, shade: float = 0.15) -> list[FigureJob]:
+    """A cell_figure per cell and stimulus of a CalciumData, named ``{cell}_{stim}``."""
+    time_ = data.tracedata.time
+    signals = data.tracedata.signals
+    timestamps = data.eventdata.timestamps
+    jobs = []
+    for cell in data.tracedata.cells:
+        trace = signals[cell].to_numpy()
+        for stim, times in data.eventdata.trial_times.items():
+            # Shared minimum over a slightly longer window, to standardize the trials.
+            stim_min = min(trace[(time_ > t - pre) & (time_ < t + post + 1)].min() for t in times)
+            trials = []
+            for trial in times:
+                idx = np.where((time_ > trial - pre) & (time_ < trial + post))[0]
+                shading = {
+                    stimmy: ax_helpers.span_verts(timestamps[stimmy], shade, window=(trial - 1.5, trial + 5))
+                    for stimmy in ["Lick", "Rinse", stim]
+                }
+                trials.append((time_[idx], trace[idx] - stim_min, shading))
+            colors = {s: data.color_dict[s] for s in ["Lick", "Rinse", stim]}
+            title = "Calcium Traces: {}\n{}: {}".format(cell, data.session, stim)
+            jobs.append(FigureJob(f"{cell}_{stim}", cell_figure, (trials, colors, title), savefig=STIM_SAVEFIG))
+    return jobs
+
+
+def taste_jobs(tastedata, **heatmapargs) -> list[FigureJob]:
+    """A taste heatmap per trial of a TasteData (see TasteData.loop_taste), named ``{stim}_{trial}``."""
+    return [
+        FigureJob(
+            f"{stim}_{iteration}",
+            taste_template,
+            (signal.T,),
+            {"title": f"{stim}, Trial: {iteration + 1}", "lines": (TASTE_ONSET,)},
+            savefig=HEATMAP_SAVEFIG,
+            layout={"shape": signal.T.shape, **heatmapargs},
+        )
+        for stim, iteration, signal in tastedata.get_taste_df()
+    ]
+
+
+def eating_jobs(
+    eatingdata, premask: bool = False, interv_size: float = -np.inf, title: str = "", **heatmapargs
+) -> list[FigureJob]:
+    """An eating heatmap per entry-eating interval of an EatingData, named by its length in frames."""
+    return [
+        FigureJob(
+            f"{data.shape[1]}_{i}",
+            eating_template,
+            (data,),
+            {"title": title, "lines": eating_lines(*lines)},
+            savefig=HEATMAP_SAVEFIG,
+            layout={"shape": data.shape, **heatmapargs},
+        )
+        for i, (data, mask, lines) in enumerate(eatingdata.eating_heatmap_data(premask, interv_size))
+    ]
+
+
+@contextmanager
+def _agg():
+    # In-process rendering hands the caller's backend back afterwards.
+    previous = matplotlib.get_backend()
+    if previous.lower() != "agg":
+        plt.switch_backend("agg")
+    try:
+        yield
+    finally:
+        if previous.lower() != "agg":
+            plt.switch_backend(previous)
+
+
+def _render_job(job: FigureJob, path: Path, savefig: dict, templates: dict, queue: SaveQueue) -> dict:
+    before = set(plt.get_fignums())
+    start = time.perf_counter()
+    error = None
+    savefig = {**job.savefig, **savefig}
+    try:
+        fig = job(templates)
+        if queue.supports(path, savefig):
+            # Encoding overlaps with drawing the next figure.
+            queue.submit(fig, path, **savefig)
+        else:
+            fig.savefig(path, **savefig)
+    except Exception as err:
+        error = repr(err)
+        logger.warning(f"{job.name}: {error}")
+    finally:
+        # Close everything the job opened, whether or not it finished, except templates.
+        keep = {template.fig.number for template in templates.values()}
+        for num in set(plt.get_fignums()) - before - keep:
+            plt.close(num)
+    return {
+        "name": job.name,
+        "path": path.as_posix(),
+        "seconds": time.perf_counter() - start,
+        "worker": os.getpid(),
+        "error": error,
+    }
+
+
+def _render_batch(jobs: list[FigureJob], paths: list[Path], savefig: dict) -> list[dict]:
+    # Workers switch to Agg once and keep it for every later batch.
+    if matplotlib.get_backend().lower() != "agg":
+        plt.switch_backend("agg")
+    templates = {}
+    queue = SaveQueue(n_workers=1, unique=False)
+    try:
+        records = [_render_job(job, path, savefig, templates, queue) for job, path in zip(jobs, paths)]
+    finally:
+        queue.close(raise_errors=False)
+        for template in templates.values():
+            plt.close(template.fig)
+    for record, path in zip(records, paths):
+        if str(path) in queue.errors:
+            record["error"] = repr(queue.errors[str(path)])
+    return records
+
+
+def render(
+    jobs: list[FigureJob],
+    out_dir: str | Path,
+    n_jobs: Optional[int] = -1,
+    fmt: str = "png",
+    manifest: str = "manifest.json",
+    cache: bool = True,
+    **savefig,
+) -> pd.DataFrame:
+    """
+    Render and save every job with the Agg backend, in a joblib process pool.
+
+    Each worker gets a contiguous share of the jobs, draws each figure, saves it to
+    ``out_dir/{name}.{fmt}`` and closes it before the next one, so memory stays flat however
+    many figures a sweep has. Template jobs reuse one figure per layout for the whole
+    share. PNG files are encoded (and PDFs written) by a SaveQueue thread while the worker
+    draws the next figure, so ``seconds`` in the manifest is drawing time. A job that raises is
+    recorded and skipped. The manifest lists every job with its file, render time and
+    error, and is written to ``out_dir/manifest``.
+
+    With ``cache``, each job is keyed by the content of its data, parameters and savefig
+    arguments (graph_utils.figure_cache), and jobs whose file in ``out_dir`` was rendered
+    from the same key are skipped and listed as ``cached``.
+
+    Parameters
+    ----------
+    jobs : list[FigureJob]
+        From stim_jobs, cell_jobs, taste_jobs, eating_jobs, or built by hand.
+    out_dir : str | Path
+        Target directory, created if needed. Existing files of the same name are replaced.
+    n_jobs : int, optional
+        Worker processes, joblib semantics. 1 renders in-process.
+    fmt : str
+        File extension, which sets the format.
+    manifest : str
+        Manifest file name.
+    cache : bool
+        Skip unchanged figures, tracked by a FigureCache index in ``out_dir``.
+    **savefig : dict
+        Override each job's savefig arguments.
+
+    Returns
+    -------
+    pd.DataFrame
+        The manifest.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = [out_dir / f"{job.name}.{fmt}" for job in jobs]
+    records = [None] * len(jobs)
+    todo = list(range(len(jobs)))
+    if cache:
+        figures = FigureCache(out_dir)
+        keys = [
+            content_key(job.func, job.args, job.kwargs, job.layout, savefig={**job.savefig, **savefig})
+            for job in jobs
+        ]
+        todo = []
+        for i, job in enumerate(jobs):
+            if figures.lookup(job.name, keys[i], fmt) is None:
+                todo.append(i)
+            else:
+                records[i] = {
+                    "name": job.name,
+                    "path": paths[i].as_posix(),
+                    "seconds": 0.0,
+                    "worker": None,
+                    "error": None,
+                }
+
+    n_workers = min(effective_n_jobs(n_jobs), max(len(todo), 1))
+    # A few batches per worker balances uneven figures without paying per-job dispatch.
+    chunks = np.array_split(np.array(todo, dtype=int), n_workers * 4) if todo else []
+    batches = [[int(i) for i in chunk] for chunk in chunks if len(chunk)]
+    if n_workers == 1:
+        with _agg():
+            results = [_render_batch([jobs[i] for i in batch], [paths[i] for i in batch], savefig) for batch in batches]
+    else:
+        results = Parallel(n_jobs=n_workers)(
+            delayed(_render_batch)([jobs[i] for i in batch], [paths[i] for i in batch], savefig) for batch in batches
+        )
+    for batch, batch_records in zip(batches, results):
+        for i, record in zip(batch, batch_records):
+            records[i] = record
+            if cache and record["error"] is None:
+                figures.record(jobs[i].name, keys[i], fmt)
+    if cache:
+        figures.save()
+    rendered = set(todo)
+    for i, record in enumerate(records):
+        record["path"] = Path(record["path"]).relative_to(out_dir).as_posix()
+        record["cached"] = i not in rendered
+
+    tmp = out_dir / f".{manifest}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(records, f, indent=1)
+    os.replace(tmp, out_dir / manifest)
+    failed = sum(record["error"] is not None for record in records)
+    logger.info(
+        f"Rendered {len(todo) - failed} / {len(records)} figures to {out_dir}, {len(records) - len(todo)} unchanged"
+    )
+    return pd.DataFrame(records)
+
+
+def render_session(
+    data,
+    out_dir: str | Path,
+    kinds: tuple = ("stim", "cells", "taste", "eating"),
+    n_jobs: Optional[int] = -1,
+    **savefig,
+) -> pd.DataFrame:
+    """
+    Export every per-trial and per-cell figure of a CalciumData in one pool.
+
+    Each kind goes to its own subdirectory of ``out_dir`` and one manifest covers them all.
+    Kinds whose data the session does not have (no events, no eating) are skipped.
+    """
+    builders = {}
+    if data.doevents:
+        builders.update(
+            stim=lambda: stim_jobs(data),
+            cells=lambda: cell_jobs(data),
+            taste=lambda: taste_jobs(data.tastedata),
+        )
+    if data.doeating and hasattr(data, "eatingdata"):
+        builders["eating"] = lambda: eating_jobs(data.eatingdata)
+    jobs = []
+    for kind in kinds:
+        if kind in builders:
+            jobs.extend(
+                FigureJob(f"{kind}/{job.name}", job.func, job.args, job.kwargs, job.savefig, job.layout)
+                for job in builders[kind]()
+            )
+    for kind in {job.name.split("/")[0] for job in jobs}:
+        (Path(out_dir) / kind).mkdir(parents=True, exist_ok=True)
+    return render(jobs, out_dir, n_jobs=n_jobs, **savefig)
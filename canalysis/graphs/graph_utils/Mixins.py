@@ -12,14 +12,77 @@ import logging
 from typing import Optional, Iterable, Any
 
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import numpy as np
 import pandas as pd
-from canalysis.graphs.graph_utils import ax_helpers
+from canalysis.graphs.graph_utils import ax_helpers, decimate
 import seaborn as sns
 
 logger = logging.getLogger(__name__)
 
 
+def _save(fig, path, queue=None, **savefig) -> None:
+    # Through a SaveQueue when given (graph_utils.save_queue), else synchronously.
+    if queue is not None:
+        queue.submit(fig, path, **savefig)
+    else:
+        fig.savefig(path, **savefig)
+
+
+def cell_figure(trials: list, colors: dict, title: str = ""):
+    """
+    Every trial of one stimulus for one cell, on a shared scale.
+
+    Parameters
+    ----------
+    trials : list
+        (time, signal, shading) per trial, where signal is already offset by the minimum
+        across trials and shading is label : span vertices.
+    colors : dict
+        Label : color, for shading and the legend.
+    title : str
+        Figure title.
+    """
+    stim_max = max(signal.max() for _, signal, _ in trials)
+    fig, xaxs = plt.subplots(len(trials), 1, sharex=False, squeeze=False)
+    for i, (this_time, signal, shading) in enumerate(trials):
+        l_bound = signal.min()
+        u_bound = signal.max()
+        center = 0
+        xaxs[i, 0].plot(this_time, signal, "k", linewidth=0.8)
+        xaxs[i, 0].tick_params(axis="both", which="minor", labelsize=6)
+        xaxs[i, 0].get_xaxis().set_visible(False)
+        xaxs[i, 0].spines["top"].set_visible(False)
+        xaxs[i, 0].spines["bottom"].set_visible(False)
+        xaxs[i, 0].spines["right"].set_visible(False)
+        xaxs[i, 0].spines["left"].set_bounds((l_bound, stim_max))
+        xaxs[i, 0].set_yticks((0, center, u_bound))
+        xaxs[i, 0].set_ylabel(
+            " Trial {}     ".format(i + 1),
+            rotation="horizontal",
+            labelpad=15,
+            y=0.3,
+        )
+        xaxs[i, 0].set_ylim(bottom=0, top=u_bound)
+        xaxs[i, 0].axhspan(0, 0, color="k", ls=":")
+        # Add shading for licks, rinses  tastant delivery
+        for stimmy, verts in shading.items():
+            ax_helpers.shade_spans(xaxs[i, 0], verts, colors[stimmy])
+    xaxs[-1, 0].set_xlabel("Time (s)")
+    fig.suptitle(title, y=1.0)
+    fig.set_figwidth(6)
+    fig.text(
+        0,
+        -0.03,
+        "Note: Each trace has" "been normalized over the graph window",
+        fontstyle="italic",
+        fontsize="small",
+    )
+    xaxs[-1, 0].spines["bottom"].set_bounds(False)
+    xaxs[-1, 0].legend(handles=ax_helpers.shade_handles(colors), loc=(1.02, 3))
+    return fig
+
+
 class CalPlots:
     tracedata: Any
     doevents: Any
@@ -34,83 +97,52 @@ class CalPlots:
     timestamps: dict
     color_dict: dict
 
-    def plot_stim(self, save_dir: str = None) -> None:
+    def plot_stim(self, save_dir: str = None, n_jobs: Optional[int] = 1) -> Optional[pd.DataFrame]:
+        """
+        One figure per trial of every cell's peri-stimulus trace (see graph_utils.templates.TraceTemplate).
+
+        With ``save_dir`` the figures are rendered headless by graphs.batch, ``n_jobs`` at a
+        time, and closed once saved; the batch manifest is returned. Without it each figure
+        is shown and then closed.
+        """
+        from canalysis.graphs import batch
+
+        jobs = batch.stim_jobs(self)
         if save_dir:
-            save_dir = save_dir
-        nplot = len(self.signals.columns)
-        for stim, times in self.trial_times.items():
-            trialno = 0
-            for trial in times:
-                trialno += 1
-                # get only the data within the analysis window
-                data_ind = np.where((self.time > trial - 2) & (self.time < trial + 5))[0]
-                # index to analysis data
-                this_time = self.time[data_ind]
-
-                fig, ax = plt.subplots(nplot, 1, sharex=True)
-                for i in range(0, nplot):
-                    # Get calcium trace for this analysis window
-                    signal = list(self.signals.iloc[data_ind, i])
-                    # plot signal
-                    ax[i].plot(this_time, signal, "k", linewidth=1)
-                    ax[i].get_xaxis().set_visible(False)
-                    ax[i].spines["top"].set_visible(False)
-                    ax[i].spines["bottom"].set_visible(False)
-                    ax[i].spines["right"].set_visible(False)
-                    ax[i].set_yticks([])
-                    ax[i].set_ylabel(
-                        self.signals.columns[i],
-                        rotation="horizontal",
-                        labelpad=15,
-                        y=0.1,
-                    )
-                    # Add shading.
-                    for stimmy in ["Lick", "Rinse", stim]:
-                        done = 0
-                        timey = self.timestamps[stimmy]
-                        for ts in timey:
-                            if trial - 1 < ts < trial + 3:
-                                if done == 0:
-                                    label = stimmy
-                                    done = 1
-                                else:
-                                    label = "_"
-                                ax[i].axvspan(
-                                    ts,
-                                    ts + 0.15,
-                                    color=self.color_dict[stimmy],
-                                    label=label,
-                                    lw=0,
-                                )
-
-                # Make the plots act like they know each other.
-                fig.subplots_adjust(hspace=0)
-                plt.xlabel("Time (s)")
-                ax[-1].get_xaxis().set_visible(True)
-                ax[-1].spines["bottom"].set_visible(True)
-                fig.set_figwidth(4)
-                if save_dir:
-                    fig.savefig(
-                        save_dir + f"/{stim}_{trial}.png",
-                        bbox_inches="tight",
-                        dpi=600,
-                        facecolor="white",
-                    )
+            return batch.render(jobs, save_dir, n_jobs=n_jobs)
+        for job in jobs:
+            fig = job()
+            plt.show()
+            # Shown one at a time and closed, so a long session doesn't keep every figure open.
+            plt.close(fig)
         return None
 
-    def plot_session(self, lickshade: int = 1, save: bool = False, eatingdata=None) -> None:
+    def plot_session(
+        self, lickshade: int = 1, save: bool = False, eatingdata=None, method: str = "minmax", queue=None
+    ) -> None:
         # Set Seaborn style
         sns.set(style="darkgrid")
 
+        # Shading, built once and shared by every cell's axes.
+        shading = {}
+        if self.doevents:
+            shading["Licking"] = (ax_helpers.span_verts(self.eventdata.timestamps["Lick"], lickshade), "lightgray")
+        if self.doeating:
+            intervals = self.eatingdata.raw_eatingdata.reset_index(drop=True).to_numpy()
+            for behavior, color in [("Grooming", "cyan"), ("EATING", "blue")]:
+                rows = intervals[intervals[:, 0] == behavior]
+                shading[behavior] = (ax_helpers.span_verts(rows[:, 1], rows[:, 2]), color)
+
         # Create a series of plots with a shared x-axis
         fig, ax = plt.subplots(len(self.tracedata.cells), 1, sharex=True)
 
-        for i in range(len(self.tracedata.cells)):
-            # Get calcium trace (y axis data)
-            signal = list(self.tracedata.signals.iloc[:, i])
+        # Decimate every cell to the pixel columns of the output (see graph_utils.decimate).
+        n_bins = decimate.pixel_bins(fig, dpi=1000 if save else None, ax=ax[0])
+        x, y = decimate.decimate(self.tracedata.time, self.tracedata.signals, n_bins, method=method)
 
+        for i in range(len(self.tracedata.cells)):
             # Plot signal with a contrasting color
-            sns.lineplot(x=self.tracedata.time, y=signal, ax=ax[i], color="lime", linewidth=0.5)
+            ax[i].plot(x[i], y[i], color="lime", linewidth=0.5)
 
             # Set axis and label colors
             ax[i].tick_params(colors="white")
@@ -135,24 +167,15 @@ class CalPlots:
                 color="white",
             )
 
-            # Shade in licks
-            if self.doevents:
-                for lick in self.eventdata.timestamps["Lick"]:
-                    label = "_yarp"
-                    if lick == self.eventdata.timestamps["Lick"][0]:
-                        label = "Licking"
-                    ax[i].axvspan(lick, lick + lickshade, color="lightgray", lw=0, label=label)
-
-            if self.doeating:
-                for interv in self.eatingdata.raw_eatingdata.reset_index(drop=True).to_numpy():
-                    if interv[0] == "Grooming":
-                        ax[i].axvspan(interv[1], interv[2], color="cyan", lw=0, label=interv[0])
-                    if interv[0] == "EATING":
-                        ax[i].axvspan(interv[1], interv[2], color="blue", lw=0, label=interv[0])
+            # Shade in licks and eating intervals, unlabelled: the legend is built once below
+            for verts, color in shading.values():
+                ax_helpers.shade_spans(ax[i], verts, color)
 
             ax[i].yaxis.label.set_fontsize(10)
 
         fig.subplots_adjust(hspace=0)
+        if shading:
+            fig.legend(handles=ax_helpers.shade_handles({label: color for label, (_, color) in shading.items()}))
 
         ax[-1].xaxis.label.set_color("white")
         ax[-1].tick_params(colors="white")
@@ -161,8 +184,10 @@ class CalPlots:
         plt.show()
 
         if save:
-            fig.savefig(
+            _save(
+                fig,
                 f"/Users/flynnoconnell/Dropbox/Lab/{self.session}_session.png",
+                queue,
                 bbox_inches="tight",
                 dpi=1000,
                 facecolor="none",
@@ -178,6 +203,8 @@ class CalPlots:
         save: Optional[bool] = True,
         zoombounding=None,
         savename=None,
+        method: str = "minmax",
+        queue=None,
     ) -> None:
         # Set Seaborn style
         sns.set(style="darkgrid")
@@ -186,6 +213,14 @@ class CalPlots:
         else:
             cells_to_plot = [cell for cell in cells if cell in self.tracedata.signals.columns]
 
+        shading = {}
+        if self.doevents:
+            shading = {
+                stim: ax_helpers.span_verts(times, zoomshade)
+                for stim, times in self.eventdata.timestamps.items()
+                if stim != "Rinse"
+            }
+
         fig, ax = plt.subplots(len(cells_to_plot), 1, sharex=True, facecolor="black")
         if len(cells_to_plot) == 1:
             ax = [ax]
@@ -193,10 +228,18 @@ class CalPlots:
         if not zoombounding:
             zoombounding = [0, 40]
 
+        # Only the visible window is read, at the resolution it is saved at: min/max from the
+        # session's trace pyramid (analysis.pyramid), so cost doesn't grow with session length.
+        n_bins = decimate.pixel_bins(fig, dpi=1200 if save else None, ax=ax[0])
+        if method == "minmax":
+            x, y = self.tracedata.get_pyramid().query(n_bins, window=zoombounding, cells=cells_to_plot)
+        else:
+            x, y = decimate.decimate(
+                self.tracedata.time, self.tracedata.signals[cells_to_plot], n_bins, method=method, window=zoombounding
+            )
+
         for i, cell in enumerate(cells_to_plot):
-            signal = self.tracedata.signals[cell]
-            # Seaborn lineplot
-            sns.lineplot(x=self.tracedata.time, y=signal, ax=ax[i], color="lime", linewidth=0.5)
+            ax[i].plot(x[i], y[i], color="lime", linewidth=0.5)
 
             # Styling adjustments
             ax[i].tick_params(colors="white")
@@ -217,17 +260,13 @@ class CalPlots:
                 color="white",
             )
 
-            # Shade in timestamps
-            if self.doevents:
-                for stim, times in self.eventdata.timestamps.items():
-                    if stim != "Rinse":
-                        for ts in times:
-                            label = "_"  # Keeps label from showing.
-                            if ts == times[0]:
-                                label = stim
-                            ax[i].axvspan(ts, ts + zoomshade, color=self.color_dict[stim], label=label, lw=0)
+            # Shade in timestamps, unlabelled: the legend is built once below
+            for stim, verts in shading.items():
+                ax_helpers.shade_spans(ax[i], verts, self.color_dict[stim])
 
         fig.subplots_adjust(hspace=0)
+        if shading:
+            fig.legend(handles=ax_helpers.shade_handles({stim: self.color_dict[stim] for stim in shading}))
         plt.xlabel("Time (s)", color="white")
         ax[-1].xaxis.label.set_color("white")
         ax[-1].tick_params(colors="white")
@@ -237,8 +276,10 @@ class CalPlots:
         plt.show()
 
         if save:
-            fig.savefig(
+            _save(
+                fig,
                 savename,
+                queue,
                 bbox_inches="tight",
                 dpi=1200,
                 facecolor="none",
@@ -246,87 +287,110 @@ class CalPlots:
             )
         return None
 
-    def plot_cells(self, save_dir: Optional[bool] = True) -> None:
-        cells = self.cells
-        if cells is None:
-            cells = self.cells
-
-        for cell in cells:
-            # Create int used to index a column in tracedata.
-            cell_index = {x: 0 for x in cells}
-            cell_index.update((key, value) for value, key in enumerate(cell_index))
-            currcell = cell_index[cell]
-            for stim, times in self.trial_times.items():
-                ntrial = len(times)
-                minmax = []
-                # Max/mins to standardize plots
-                for it, tri in enumerate(times):
-                    temp_data_ind = np.where((self.time > tri - 2) & (self.time < tri + 5))[0]
-                    temp_signal = self.tracedata.iloc[temp_data_ind, currcell + 1]
-                    norm_min = min(temp_signal)
-                    norm_max = max(temp_signal)
-                    minmax.append(norm_min)
-                    minmax.append(norm_max)
-                stim_min = min(minmax)
-                stim_max = max(minmax)
-                fig, xaxs = plt.subplots(ntrial, 1, sharex=False, squeeze=False)
-                if ntrial < 2:
-                    xaxs.flatten()
-                for iteration, trial in enumerate(times):
-                    i = int(iteration)
-                    data_ind = np.where((self.time > trial - 2) & (self.time < trial + 4))[0]
-                    this_time = self.time[data_ind]
-                    signal = list(self.tracedata.iloc[data_ind, currcell + 1])
-                    signal[:] = [number - stim_min for number in signal]
-                    l_bound = min(signal)
-                    u_bound = max(signal)
-                    center = 0
-                    xaxs[i, 0].plot(this_time, signal, "k", linewidth=0.8)
-                    xaxs[i, 0].tick_params(axis="both", which="minor", labelsize=6)
-                    xaxs[i, 0].get_xaxis().set_visible(False)
-                    xaxs[i, 0].spines["top"].set_visible(False)
-                    xaxs[i, 0].spines["bottom"].set_visible(False)
-                    xaxs[i, 0].spines["right"].set_visible(False)
-                    xaxs[i, 0].spines["left"].set_bounds((l_bound, stim_max))
-                    xaxs[i, 0].set_yticks((0, center, u_bound))
-                    xaxs[i, 0].set_ylabel(
-                        " Trial {}     ".format(i + 1),
-                        rotation="horizontal",
-                        labelpad=15,
-                        y=0.3,
-                    )
-                    xaxs[i, 0].set_ylim(bottom=0, top=max(signal))
-                    xaxs[i, 0].axhspan(0, 0, color="k", ls=":")
-                    # Add shading for licks, rinses  tastant delivery
-                    for stimmy in ["Lick", "Rinse", stim]:
-                        done = 0
-                        timey = self.timestamps[stimmy]
-                        for ts in timey:
-                            if trial - 1.5 < ts < trial + 5:
-                                if done == 0:
-                                    label = stimmy
-                                    done = 1
-                                else:
-                                    label = "_"
-                                xaxs[i, 0].axvspan(
-                                    ts,
-                                    ts + 0.15,
-                                    color=self.color_dict[stimmy],
-                                    label=label,
-                                    lw=0,
-                                )
-                plt.xlabel("Time (s)")
-                fig.suptitle("Calcium Traces: {}\n{}: {}".format(cell, self.session, stim), y=1.0)
-                fig.set_figwidth(6)
-                fig.text(
-                    0,
-                    -0.03,
-                    "Note: Each trace has" "been normalized over the graph window",
-                    fontstyle="italic",
-                    fontsize="small",
-                )
-                xaxs[-1, 0].spines["bottom"].set_bounds(False)
-                plt.legend(loc=(1.02, 3))
+    def plot_stacked(
+        self,
+        cells="all",
+        window: Optional[tuple] = None,
+        spacing: float = 1.2,
+        shade: float = 0.4,
+        method: str = "minmax",
+        figsize: Optional[tuple] = None,
+        max_labels: int = 60,
+        savename: Optional[str] = None,
+        dpi: int = 600,
+        queue=None,
+    ):
+        """
+        Every cell in a single Axes, as vertically offset traces.
+
+        A grid of one Axes per cell (plot_session, plot_zoom) pays for spines, ticks and
+        layout per cell. Here all traces are one LineCollection, decimated to the output's
+        pixel columns, each event type is one shading collection, and the cells are named by
+        y ticks at their offsets, so render time barely depends on the number of cells.
+
+        Parameters
+        ----------
+        cells : str | list
+            "all" or the cells to draw, top to bottom.
+        window : tuple, optional
+            (start, stop) time range. Defaults to the whole session.
+        spacing : float
+            Distance between baselines; each trace is scaled to a range of 1.
+        shade : float
+            Width of event shading, in seconds.
+        method : str
+            Decimation method, see graph_utils.decimate.
+        figsize : tuple, optional
+            Defaults to a height that grows with the number of cells, up to 40 in.
+        max_labels : int
+            Name at most this many cells; with more, only every k-th cell is named, since
+            ticks are what layout time scales with.
+        savename : str, optional
+            Save the figure here at ``dpi``.
+        dpi : int
+            Resolution used for saving and for the decimation target.
+        queue : SaveQueue, optional
+            Save through a SaveQueue instead of blocking on encoding.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
+        """
+        sns.set(style="darkgrid")
+        signals = self.tracedata.signals
+        cells_to_plot = signals.columns.tolist() if cells == "all" else [c for c in cells if c in signals.columns]
+        n_cells = len(cells_to_plot)
+        if figsize is None:
+            figsize = (10, min(max(4.0, 0.15 * n_cells), 40.0))
+
+        fig, ax = plt.subplots(figsize=figsize, facecolor="black")
+        n_bins = decimate.pixel_bins(fig, dpi=dpi if savename else None, ax=ax)
+        x, y = decimate.decimate(self.tracedata.time, signals[cells_to_plot], n_bins, method=method, window=window)
+
+        # Scale every trace to a unit range and stack them, first cell on top.
+        lo, hi = y.min(axis=1, keepdims=True), y.max(axis=1, keepdims=True)
+        span = np.where(hi > lo, hi - lo, 1.0)
+        offsets = spacing * np.arange(n_cells)[::-1]
+        segments = np.stack([x, (y - lo) / span + offsets[:, None]], axis=-1)
+        ax.add_collection(LineCollection(segments, colors="lime", linewidths=0.5), autolim=False)
+
+        if self.doevents:
+            for stim, times in self.eventdata.timestamps.items():
+                if stim != "Rinse":
+                    verts = ax_helpers.span_verts(times, shade, window=window)
+                    ax_helpers.shade_spans(ax, verts, self.color_dict[stim])
+
+        ax.set_xlim(window if window is not None else (x.min(), x.max()))
+        ax.set_ylim(-0.5 * spacing, offsets[0] + spacing)
+        step = -(-n_cells // max_labels)
+        ax.set_yticks(offsets[::step] + 0.5)
+        ax.set_yticklabels(cells_to_plot[::step], fontsize=8)
+        ax.grid(False, which="both", axis="both")
+        ax.tick_params(colors="white")
+        ax.set_xlabel("Time (s)", color="white")
+        for side in ("top", "right"):
+            ax.spines[side].set_visible(False)
+
+        if savename:
+            _save(fig, savename, queue, bbox_inches="tight", dpi=dpi, facecolor="none", transparent=True)
+        return fig
+
+    def plot_cells(self, save_dir: Optional[str] = None, n_jobs: Optional[int] = 1) -> Optional[pd.DataFrame]:
+        """
+        One figure per cell and stimulus with every trial on its own row (see cell_figure).
+
+        With ``save_dir`` the figures are rendered headless by graphs.batch, ``n_jobs`` at a
+        time, and closed once saved; the batch manifest is returned. Without it each figure
+        is shown and then closed.
+        """
+        from canalysis.graphs import batch
+
+        jobs = batch.cell_jobs(self)
         if save_dir:
-            plt.savefig(str(save_dir) + ".png", bbox_inches="tight", dpi=600)
+            return batch.render(jobs, save_dir, n_jobs=n_jobs)
+        for job in jobs:
+            fig = job()
+            plt.show()
+            # Shown one at a time and closed, so a long session doesn't keep every figure open.
+            plt.close(fig)
         return None
@@ -9,8 +9,10 @@ Module (graphs.graph_utils): Functions for manipulating axes objects.
 from __future__ import annotations
 
 import logging
-from typing import Optional, Any
+from typing import Iterable, Optional, Any
 import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Patch
 from canalysis.graphs.graph_utils import helpers
 
 logger = logging.getLogger(__name__)
@@ -43,6 +45,64 @@ def get_legend(ax, color_dict, colors, markersize):
     return ax
 
 
+def span_verts(
+    starts: Iterable[float],
+    stops: Iterable[float] | float,
+    window: Optional[tuple[float, float]] = None,
+) -> np.ndarray:
+    """
+    Rectangles for vertical shading, as one (n, 4, 2) vertex array.
+
+    x is in data coordinates and y spans the full axes height (0 to 1), to be drawn with
+    the axes' blended x-axis transform (see shade_spans).
+
+    Parameters
+    ----------
+    starts : Iterable[float]
+        Left edge of each span.
+    stops : Iterable[float] | float
+        Right edge of each span, or a single width added to every start.
+    window : tuple[float, float], optional
+        Keep only spans that start inside [window[0], window[1]].
+    """
+    starts = np.asarray(starts, dtype=float).ravel()
+    stops = starts + stops if np.isscalar(stops) else np.asarray(stops, dtype=float).ravel()
+    if window is not None:
+        keep = (starts >= window[0]) & (starts <= window[1])
+        starts, stops = starts[keep], stops[keep]
+    verts = np.empty((starts.size, 4, 2))
+    verts[:, :, 0] = np.column_stack([starts, starts, stops, stops])
+    verts[:, :, 1] = [0, 1, 1, 0]
+    return verts
+
+
+def shade_spans(ax, verts: np.ndarray, color, label: Optional[str] = None, **kwargs) -> PolyCollection:
+    """
+    Add every span in ``verts`` to ``ax`` as a single PolyCollection.
+
+    One artist per event type replaces one axvspan Patch per event, so draw time no longer
+    grows with the number of events. The vertex array can be shared by every axes.
+    """
+    kwargs.setdefault("zorder", 0)
+    coll = PolyCollection(
+        verts,
+        facecolors=color,
+        edgecolors="none",
+        linewidths=0,
+        label=label if label is not None else "_nolegend_",
+        transform=ax.get_xaxis_transform(),
+        **kwargs,
+    )
+    # autolim=False: y is in axes coordinates and must not stretch the data limits.
+    ax.add_collection(coll, autolim=False)
+    return coll
+
+
+def shade_handles(colors: dict) -> list[Patch]:
+    """Legend handles for shading, label : color."""
+    return [Patch(facecolor=color, edgecolor="none", label=label) for label, color in colors.items()]
+
+
 def make_legend(
     mydict: dict,
     marker: Optional[str] = "o",
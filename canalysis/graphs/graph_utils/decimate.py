@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# decimate.py
+
+Module (graphs.graph_utils): Reduce long traces to what a figure can show, for all cells at once.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def pixel_bins(fig, dpi: Optional[float] = None, ax=None, oversample: float = 1.0) -> int:
+    """
+    Horizontal pixels available to ``ax`` (or the whole figure) at ``dpi``.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+    dpi : float, optional
+        Render resolution, e.g. the savefig dpi. Defaults to the figure's dpi.
+    ax : matplotlib.axes.Axes, optional
+        Only count the axes' share of the figure width.
+    oversample : float
+        Bins per pixel.
+    """
+    dpi = fig.dpi if dpi is None else dpi
+    width = fig.get_figwidth() * (ax.get_position().width if ax is not None else 1.0)
+    return max(int(width * dpi * oversample), 1)
+
+
+def _as_cell_major(time, signals) -> tuple[np.ndarray, np.ndarray]:
+    if isinstance(signals, pd.DataFrame):
+        signals = signals.drop(columns=["time"], errors="ignore").to_numpy()
+    data = np.asarray(signals, dtype=float)
+    data = data[:, None] if data.ndim == 1 else data
+    return np.asarray(time, dtype=float), np.ascontiguousarray(data.T)
+
+
+def _window(time: np.ndarray, window: Optional[tuple]) -> slice:
+    if window is None:
+        return slice(None)
+    # One sample of margin so lines run to the axes edges.
+    start = max(np.searchsorted(time, window[0]) - 1, 0)
+    stop = min(np.searchsorted(time, window[1], side="right") + 1, time.size)
+    return slice(start, stop)
+
+
+def minmax(time: np.ndarray, data: np.ndarray, n_bins: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Min/max envelope: the minimum and maximum of each bin, in time order.
+
+    Every local extreme that would land on a pixel column is kept, so a decimated trace
+    renders identically to the full one at the target width. The trace is cut into
+    ``n_bins`` equal runs of samples (the last run absorbs the remainder) and reduced for
+    every cell at once.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Shared time axis, T samples.
+    data : np.ndarray
+        Cells x T.
+    n_bins : int
+        Output bins; the result has 2 * n_bins points per cell.
+
+    Returns
+    -------
+    x, y : np.ndarray
+        Cells x 2 * n_bins time and value.
+    """
+    n_cells, n = data.shape
+    per = n // n_bins
+    head = per * n_bins
+    blocks = data[:, :head].reshape(n_cells, n_bins, per)
+    lo = blocks.argmin(axis=2)
+    hi = blocks.argmax(axis=2)
+    if head < n:
+        # Fold the remainder into the last bin.
+        tail = data[:, head - per :]
+        lo[:, -1] = tail.argmin(axis=1)
+        hi[:, -1] = tail.argmax(axis=1)
+    offsets = np.arange(n_bins) * per
+    first = np.minimum(lo, hi) + offsets
+    second = np.maximum(lo, hi) + offsets
+    idx = np.empty((n_cells, 2 * n_bins), dtype=np.intp)
+    idx[:, 0::2] = first
+    idx[:, 1::2] = second
+    return time[idx], np.take_along_axis(data, idx, axis=1)
+
+
+def lttb(time: np.ndarray, data: np.ndarray, n_out: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling to ``n_out`` points per cell.
+
+    Keeps the point of each bucket that forms the largest triangle with the previously
+    kept point and the mean of the next bucket, which preserves the visual shape with
+    fewer points than min/max. Buckets are processed in order, vectorized over cells.
+
+    Returns
+    -------
+    x, y : np.ndarray
+        Cells x n_out time and value.
+    """
+    n_cells, n = data.shape
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    idx = np.empty((n_cells, n_out), dtype=np.intp)
+    idx[:, 0] = 0
+    idx[:, -1] = n - 1
+    rows = np.arange(n_cells)
+    for b in range(n_out - 2):
+        start, stop = edges[b], max(edges[b + 1], edges[b] + 1)
+        nxt_stop = edges[b + 2] if b + 2 < n_out - 1 else n
+        nxt_start = min(stop, nxt_stop - 1)
+        avg_t = time[nxt_start:nxt_stop].mean()
+        avg_y = data[:, nxt_start:nxt_stop].mean(axis=1)
+        prev = idx[:, b]
+        pt, py = time[prev], data[rows, prev]
+        t, y = time[start:stop], data[:, start:stop]
+        area = np.abs((pt[:, None] - avg_t) * (y - py[:, None]) - (pt[:, None] - t) * (avg_y - py)[:, None])
+        idx[:, b + 1] = start + area.argmax(axis=1)
+    return time[idx], np.take_along_axis(data, idx, axis=1)
+
+
+def decimate(
+    time: np.ndarray,
+    signals: pd.DataFrame | np.ndarray,
+    n_bins: int,
+    method: str = "minmax",
+    window: Optional[tuple] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decimate every cell for drawing.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Time of each sample.
+    signals : pd.DataFrame | np.ndarray
+        Time x cells. A ``time`` column, if present, is ignored.
+    n_bins : int
+        Target horizontal resolution, usually pixel_bins(fig, dpi).
+    method : str
+        "minmax" (exact per-pixel envelope) or "lttb".
+    window : tuple, optional
+        (start, stop) time range to keep, so a zoom only decimates what is visible.
+
+    Returns
+    -------
+    x, y : np.ndarray
+        Cells x points time and value. Traces already shorter than the target are returned
+        as-is.
+    """
+    time, data = _as_cell_major(time, signals)
+    sl = _window(time, window)
+    time, data = time[sl], data[:, sl]
+    n = time.size
+    if method == "minmax":
+        if n <= 2 * n_bins:
+            return np.broadcast_to(time, data.shape), data
+        return minmax(time, data, n_bins)
+    if method == "lttb":
+        if n <= n_bins or n_bins < 3:
+            return np.broadcast_to(time, data.shape), data
+        return lttb(time, data, n_bins)
+    raise ValueError(f"Unknown decimation method: {method}")
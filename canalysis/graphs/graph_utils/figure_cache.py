@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# figure_cache.py
+
+Module (graph): Skip re-rendering figures whose data and parameters have not changed.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from canalysis.helpers.funcs import fingerprint
+
+logger = logging.getLogger(__name__)
+
+INDEX = ".figure_cache.json"
+
+
+def _flatten(obj: Any, arrays: list) -> Any:
+    # Arrays go to ``arrays`` (hashed by content), everything else stays as JSON-able structure.
+    if isinstance(obj, np.ndarray):
+        arrays.append(obj)
+        return f"<array {len(arrays) - 1}>"
+    if isinstance(obj, pd.DataFrame):
+        arrays.append(obj.to_numpy())
+        return {
+            "frame": len(arrays) - 1,
+            "index": _flatten(obj.index.to_numpy(), arrays),
+            "columns": list(map(str, obj.columns)),
+        }
+    if isinstance(obj, pd.Series):
+        return _flatten(obj.to_frame(), arrays)
+    if isinstance(obj, dict):
+        return {str(k): _flatten(v, arrays) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_flatten(v, arrays) for v in obj]
+    if callable(obj):
+        return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def content_key(*inputs, **params) -> str:
+    """
+    Content hash of arbitrarily nested figure inputs.
+
+    Arrays and DataFrames anywhere in ``inputs`` or ``params`` (including inside dicts,
+    lists and tuples) hash by value, functions by their qualified name, and everything
+    else by its JSON form; see funcs.fingerprint.
+    """
+    arrays = []
+    structure = _flatten([list(inputs), params], arrays)
+    return fingerprint(*arrays, structure=structure)
+
+
+class FigureCache:
+    def __init__(self, directory: str | Path):
+        """
+        Incremental output for one directory of figures.
+
+        Every figure is stored under a fixed name with the content key of everything it
+        was drawn from, in an index file (``.figure_cache.json``) in the directory. A
+        figure whose key and file are unchanged is not drawn again. Files are overwritten
+        in place when their inputs change, instead of accumulating ``name1.png``,
+        ``name2.png``, ... copies.
+
+        Names looked up through this instance are remembered; ``clean`` removes the indexed
+        outputs that were not, i.e. figures a report no longer produces.
+
+        Parameters
+        ----------
+        directory : str | Path
+            Output directory, created if needed.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / INDEX
+        self.index: dict = {}
+        if self.index_path.is_file():
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        self.touched: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.directory}, {len(self.index)} figures"
+
+    def path(self, name: str, ext: str = "png") -> Path:
+        return self.directory / f"{name}.{ext}"
+
+    def lookup(self, name: str, key: str, ext: str = "png") -> Optional[Path]:
+        """The cached file for ``name`` if it was drawn from ``key`` and still exists."""
+        self.touched.add(name)
+        entry = self.index.get(name)
+        path = self.path(name, ext)
+        if entry is not None and entry["key"] == key and entry["path"] == path.name and path.is_file():
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def record(self, name: str, key: str, ext: str = "png") -> Path:
+        """Register ``name`` as rendered from ``key``; call ``save`` to write the index."""
+        self.touched.add(name)
+        path = self.path(name, ext)
+        self.index[name] = {"key": key, "path": path.name, "created": time.time()}
+        return path
+
+    def save(self) -> None:
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def render(
+        self,
+        name: str,
+        draw: Callable,
+        *inputs,
+        ext: str = "png",
+        savefig: Optional[dict] = None,
+        queue=None,
+        **params,
+    ) -> Path:
+        """
+        Return the cached figure for these inputs, drawing and saving it only on a miss.
+
+        Parameters
+        ----------
+        name : str
+            File name within the directory, without extension.
+        draw : Callable
+            ``draw(*inputs, **params)`` returns the Figure.
+        *inputs
+            Data the figure is drawn from, hashed by content.
+        ext : str
+            File extension.
+        savefig : dict, optional
+            savefig arguments, part of the key.
+        queue : SaveQueue, optional
+            Save in the background (graph_utils.save_queue). The file is replaced in place
+            whatever the queue's ``unique`` setting, so it matches the index.
+        **params : dict
+            Passed to ``draw``, part of the key.
+
+        Returns
+        -------
+        Path
+        """
+        import matplotlib.pyplot as plt
+
+        savefig = savefig or {}
+        key = content_key(draw, *inputs, savefig=savefig, **params)
+        path = self.lookup(name, key, ext)
+        if path is not None:
+            return path
+        fig = draw(*inputs, **params)
+        path = self.record(name, key, ext)
+        if queue is not None:
+            queue.submit(fig, path, unique=False, **savefig)
+        else:
+            fig.savefig(path, **savefig)
+        plt.close(fig)
+        self.save()
+        return path
+
+    def clean(self, dry_run: bool = False) -> list[Path]:
+        """
+        Delete indexed figures not looked up or rendered through this instance.
+
+        Files that are not in the index are never touched. Returns the removed (or, with
+        ``dry_run``, the stale) paths.
+        """
+        stale = [name for name in self.index if name not in self.touched]
+        paths = [self.directory / self.index[name]["path"] for name in stale]
+        if not dry_run:
+            for name, path in zip(stale, paths):
+                path.unlink(missing_ok=True)
+                del self.index[name]
+            self.save()
+            logger.info(f"Removed {len(stale)} stale figure(s) from {self.directory}")
+        return paths
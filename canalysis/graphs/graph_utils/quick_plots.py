@@ -13,6 +13,8 @@ import pandas as pd
 import seaborn as sns
 from matplotlib import rcParams
 
+from canalysis.analysis import spectral
+
 
 def set_pub():
     rcParams.update(
@@ -71,26 +73,21 @@ class QuickPlot:
         plt.show()
 
 
-    def line_fourier(self):
-        for col in self.data.columns:
-            plt.figure()
-            Y = self.data.loc[:, col]
-            # X = self.time
-
-            FFT = np.fft.fft(Y)
-            new_N = int(len(FFT) / 2)
-            f_nat = 1
-            new_X = np.linspace(10 ** -12, f_nat / 2, new_N, endpoint=True)
-            new_Xph = 1.0 / new_X
-            FFT_abs = np.abs(FFT)
-            plt.plot(
-                new_Xph,
-                2 * FFT_abs[0 : int(len(FFT) / 2.0)] / len(new_Xph),
-                color="black",
-            )
-            plt.xlabel("Period ($h$)", fontsize=20)
-            plt.ylabel("Amplitude", fontsize=20)
-            plt.title("Fourier Transform", fontsize=15)
-            plt.grid(True)
-            plt.xlim(0, 200)
-            plt.show()
+    def line_fourier(self, fmax: float = None, **psdargs):
+        """
+        Plot the power spectral density of every cell on one axis.
+
+        The spectrum is computed once for all cells by analysis.spectral.get_psd, using the
+        sampling rate of ``self.time``; this method only draws the result.
+        """
+        fs = 1 / np.median(np.diff(np.asarray(self.time, dtype=float)))
+        spectrum = spectral.get_psd(self.data, fs, **psdargs)
+        fig, ax = plt.subplots(1, 1)
+        ax.semilogy(spectrum.freqs[1:], spectrum.power[:, 1:].T, color="black", alpha=0.3)
+        ax.set_xlabel("Frequency (Hz)", fontsize=20)
+        ax.set_ylabel("Power", fontsize=20)
+        ax.set_title("Power Spectral Density", fontsize=15)
+        ax.grid(True)
+        ax.set_xlim(0, fmax if fmax is not None else fs / 2)
+        plt.show()
+        return spectrum
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# save_queue.py
+
+Module (graph): Encode and write figures in background threads while the caller keeps plotting.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+from canalysis.helpers import funcs
+
+logger = logging.getLogger(__name__)
+
+# Encoded from Agg pixels by the workers.
+RASTER = {".png": "PNG"}
+# Drawn by matplotlib's own vector backend in the calling thread; the workers only write the bytes.
+VECTOR = {".pdf": "pdf"}
+FORMATS = {**RASTER, **VECTOR}
+# savefig arguments SaveQueue.submit understands.
+SAVEFIG_ARGS = {"dpi", "bbox_inches", "pad_inches", "facecolor", "transparent"}
+
+
+class _PixelCanvas(FigureCanvasAgg):
+    # savefig target that keeps the Agg pixels instead of writing them anywhere.
+    rgba: Optional[np.ndarray] = None
+
+    def print_rgba(self, filename_or_obj, **kwargs) -> None:
+        FigureCanvasAgg.draw(self)
+        # The Agg buffer is reused by the next draw; keep a copy.
+        self.rgba = np.array(self.get_renderer().buffer_rgba())
+
+
+def _savefig(fig, canvas_class, buffer, **savefig):
+    # fig.savefig on a fresh ``canvas_class``, leaving the figure's own canvas in place afterwards.
+    old_canvas = fig.canvas
+    try:
+        # The new canvas attaches itself to the figure.
+        canvas = canvas_class(fig)
+        fig.savefig(buffer, **savefig)
+        return canvas
+    finally:
+        fig.set_canvas(old_canvas)
+
+
+def render_rgba(fig, dpi: Optional[float] = None, **savefig) -> np.ndarray:
+    """
+    Draw ``fig`` with Agg at ``dpi`` and return the pixels as an (h, w, 4) uint8 array.
+
+    Goes through fig.savefig, so ``bbox_inches``, ``pad_inches``, ``facecolor`` and
+    ``transparent`` behave exactly as they do there; in particular ``bbox_inches="tight"``
+    grows the canvas to fit artists outside the figure, like tick labels of an axes that
+    fills it. The figure's canvas, dpi and colors are unchanged afterwards, so it can be
+    updated and submitted again right away.
+    """
+    canvas = _savefig(fig, _PixelCanvas, io.BytesIO(), format="rgba", dpi=fig.dpi if dpi is None else dpi, **savefig)
+    return canvas.rgba
+
+
+def render_vector(fig, fmt: str, dpi: Optional[float] = None, **savefig) -> bytes:
+    """``fig`` saved as ``fmt`` (e.g. "pdf") by matplotlib, as bytes."""
+    buffer = io.BytesIO()
+    _savefig(fig, FigureCanvasAgg, buffer, format=fmt, dpi=fig.dpi if dpi is None else dpi, **savefig)
+    return buffer.getvalue()
+
+
+def _encode(data: np.ndarray | bytes, path: str, dpi: float) -> None:
+    tmp = f"{path}.part"
+    if isinstance(data, bytes):
+        with open(tmp, "wb") as f:
+            f.write(data)
+    else:
+        Image.fromarray(data, "RGBA").save(tmp, format=RASTER[Path(path).suffix.lower()], dpi=(dpi, dpi))
+    os.replace(tmp, path)
+
+
+class SaveQueue:
+    def __init__(self, n_workers: int = 2, max_pending: int = 8, unique: bool = True):
+        """
+        Save figures without waiting for PNG encoding.
+
+        ``submit`` renders the figure to an Agg buffer in the calling thread (matplotlib
+        is not thread-safe), then hands the pixels to a worker thread that encodes and
+        writes them with Pillow, whose compressors release the GIL. PDFs stay vector: they
+        are drawn by matplotlib in the calling thread and the worker only writes the
+        bytes. The queue holds at most ``max_pending`` figures; when it is full ``submit``
+        blocks until a worker frees a slot, which caps memory at roughly
+        (max_pending + n_workers) images.
+
+        Use as a context manager, or call ``flush`` to wait for everything submitted so
+        far and ``close`` to stop the workers.
+
+        Parameters
+        ----------
+        n_workers : int
+            Encoding threads.
+        max_pending : int
+            Rendered figures waiting to be encoded.
+        unique : bool
+            Never overwrite: each path is reserved atomically when submitted, with a number
+            appended on collision (funcs.reserve_unique_path).
+        """
+        self.unique = unique
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.errors: dict[str, BaseException] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(n_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.pending} pending"
+
+    def __enter__(self) -> SaveQueue:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close(raise_errors=exc[0] is None)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    @staticmethod
+    def supports(path: str | Path, savefig: dict) -> bool:
+        """Whether ``submit`` can handle this file type and these savefig arguments."""
+        return Path(path).suffix.lower() in FORMATS and set(savefig) <= SAVEFIG_ARGS
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                data, path, dpi = item
+                _encode(data, path, dpi)
+            except Exception as err:
+                logger.warning(f"Saving {path} failed: {err!r}")
+                with self._lock:
+                    self.errors[path] = err
+                Path(path).unlink(missing_ok=True)
+            finally:
+                self._queue.task_done()
+
+    def submit(
+        self, fig, path: str | Path, dpi: Optional[float] = None, unique: Optional[bool] = None, **savefig
+    ) -> str:
+        """
+        Render ``fig`` now and queue it to be written to ``path``.
+
+        Parameters
+        ----------
+        fig : matplotlib.figure.Figure
+            Free to be changed or closed once this returns.
+        path : str | Path
+            Destination, ``.png`` or ``.pdf``.
+        dpi : float, optional
+            Defaults to the figure's dpi.
+        unique : bool, optional
+            Overrides the queue's ``unique`` for this figure, e.g. False for a file that
+            is meant to be replaced in place.
+        **savefig : dict
+            bbox_inches, pad_inches, facecolor, transparent, as for savefig.
+
+        Returns
+        -------
+        str
+            The path the figure will be written to, numbered if ``unique`` and taken.
+        """
+        if not self.supports(path, savefig):
+            raise ValueError(f"SaveQueue writes {sorted(FORMATS)} with {sorted(SAVEFIG_ARGS)}, got {path}, {savefig}")
+        dpi = fig.dpi if dpi is None else dpi
+        suffix = Path(path).suffix.lower()
+        if suffix in VECTOR:
+            data = render_vector(fig, VECTOR[suffix], dpi=dpi, **savefig)
+        else:
+            data = render_rgba(fig, dpi=dpi, **savefig)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        unique = self.unique if unique is None else unique
+        path = funcs.reserve_unique_path(path) if unique else str(path)
+        # Blocks while the queue is full.
+        self._queue.put((data, path, dpi))
+        return path
+
+    def flush(self, raise_errors: bool = True) -> None:
+        """Wait until everything submitted so far is on disk."""
+        self._queue.join()
+        if raise_errors and self.errors:
+            path, err = next(iter(self.errors.items()))
+            raise RuntimeError(f"{len(self.errors)} figure(s) failed to save, first: {path}") from err
+
+    def close(self, raise_errors: bool = True) -> None:
+        """Flush and stop the workers."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self.flush(raise_errors=raise_errors)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# templates.py
+
+Module (graph): Figures built once per layout and updated in place for every trial.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from canalysis.graphs.base._base_figure import CalFigure
+from canalysis.graphs.graph_utils import ax_helpers
+
+
+def _padded(values: np.ndarray, margin: float = 0.05) -> tuple[float, float]:
+    # The limits autoscaling would pick (rcParams axes.[xy]margin), without a relim pass.
+    lo, hi = float(np.nanmin(values)), float(np.nanmax(values))
+    span = hi - lo if hi > lo else 1.0
+    return lo - margin * span, hi + margin * span
+
+
+class TraceTemplate:
+    def __init__(self, cells: list, width: float = 4):
+        """
+        One row per cell with a shared x-axis, as drawn by CalPlots.plot_stim.
+
+        Axes, spines, labels and layout are set up once; ``update`` only replaces line
+        data, axis limits and the vertices of the shading collections, so the per-figure
+        cost of a sweep over trials is drawing and saving.
+
+        Parameters
+        ----------
+        cells : list
+            Cell names, one row each.
+        width : float
+            Figure width, in inches.
+        """
+        self.cells = list(cells)
+        self.fig, ax = plt.subplots(len(self.cells), 1, sharex=True, squeeze=False)
+        self.ax = ax[:, 0]
+        self.lines = []
+        for i, cell in enumerate(self.cells):
+            (line,) = self.ax[i].plot([], [], "k", linewidth=1)
+            self.lines.append(line)
+            self.ax[i].get_xaxis().set_visible(False)
+            self.ax[i].spines["top"].set_visible(False)
+            self.ax[i].spines["bottom"].set_visible(False)
+            self.ax[i].spines["right"].set_visible(False)
+            self.ax[i].set_yticks([])
+            self.ax[i].set_ylabel(cell, rotation="horizontal", labelpad=15, y=0.1)
+        # One list of per-axes collections for each shading slot, added as needed.
+        self.shades: list[list] = []
+
+        # Make the plots act like they know each other.
+        self.fig.subplots_adjust(hspace=0)
+        self.ax[-1].set_xlabel("Time (s)")
+        self.ax[-1].get_xaxis().set_visible(True)
+        self.ax[-1].spines["bottom"].set_visible(True)
+        self.fig.set_figwidth(width)
+
+    def _add_slot(self) -> None:
+        empty = np.empty((0, 4, 2))
+        self.shades.append([ax_helpers.shade_spans(ax, empty, "none") for ax in self.ax])
+
+    def update(self, time: np.ndarray, signals: np.ndarray, shading: dict):
+        """
+        Parameters
+        ----------
+        time : np.ndarray
+            Time of each frame.
+        signals : np.ndarray
+            Frames x cells.
+        shading : dict
+            Label : (span vertices, color), see ax_helpers.span_verts.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
+            The template's figure, redrawn on the next save.
+        """
+        signals = np.asarray(signals)
+        for i, line in enumerate(self.lines):
+            line.set_data(time, signals[:, i])
+            self.ax[i].set_ylim(_padded(signals[:, i]))
+        self.ax[0].set_xlim(_padded(time))
+
+        while len(self.shades) < len(shading):
+            self._add_slot()
+        # Slots this trial does not use are emptied rather than removed.
+        unused = [("_nolegend_", (np.empty((0, 4, 2)), "none"))] * (len(self.shades) - len(shading))
+        for slot, (label, (verts, color)) in zip(self.shades, list(shading.items()) + unused):
+            for coll in slot:
+                coll.set_verts(verts)
+                coll.set_facecolor(color)
+                coll.set_label(label)
+        return self.fig
+
+
+class HeatmapTemplate:
+    def __init__(
+        self,
+        shape: tuple,
+        cmap: str = "plasma",
+        colorbar: bool = False,
+        n_lines: int = 0,
+        xticks: Optional[tuple] = None,
+        frame: float = 0.1,
+        ax=None,
+        rasterized: bool = False,
+        **kwargs,
+    ):
+        """
+        A cells x time heatmap drawn with one AxesImage, as EatingHeatmap lays it out.
+
+        Cell ``(i, j)`` covers [j, j + 1] x [i, i + 1], so row labels and vertical markers use
+        the same coordinates as the seaborn heatmaps. ``update`` swaps the image data,
+        color limits, title, marker positions and row labels. NaN cells (the padding of
+        premasked eating heatmaps) are masked and left unpainted, as seaborn does.
+
+        Parameters
+        ----------
+        shape : tuple
+            (cells, frames) of every heatmap drawn with the template.
+        cmap : str
+            Colormap.
+        colorbar : bool
+            Draw a colorbar.
+        n_lines : int
+            Vertical markers, placed by ``update``.
+        xticks : tuple, optional
+            Fixed (positions, labels). By default ticks are placed by a locator and labeled
+            in seconds.
+        frame : float
+            Seconds per column, for the default tick labels.
+        ax : matplotlib.axes.Axes, optional
+            Draw into an existing Axes instead of a new figure.
+        rasterized : bool
+            Rasterize the markers too, for vector output. The image is always raster.
+        **kwargs : dict
+            Passed to imshow.
+        """
+        self.shape = tuple(shape)
+        n_rows, n_cols = self.shape
+        if ax is None:
+            self.fig = plt.figure(FigureClass=CalFigure)
+            self.ax = self.fig.add_subplot(111)
+        else:
+            self.fig, self.ax = ax.figure, ax
+        cmap = plt.get_cmap(cmap).with_extremes(bad=(0, 0, 0, 0))
+        self.image = self.ax.imshow(
+            np.ma.masked_all(self.shape),
+            cmap=cmap,
+            aspect="auto",
+            interpolation="nearest",
+            extent=(0, n_cols, n_rows, 0),
+            rasterized=rasterized,
+            **kwargs,
+        )
+        if colorbar:
+            self.fig.colorbar(self.image, ax=self.ax)
+        self.title = self.ax.set_title("", fontweight="bold")
+        self.lines = [
+            self.ax.axvline(0, color="w", linewidth=3, visible=False, rasterized=rasterized) for _ in range(n_lines)
+        ]
+
+        self.rows = None
+        self.ax.set_yticks(np.arange(n_rows) + 0.5)
+        if xticks is not None:
+            self.ax.set_xticks(*xticks)
+        else:
+            self.ax.xaxis.set_major_locator(MaxNLocator(nbins=10, steps=[1, 2, 5, 10], integer=True))
+            self.ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{x * frame:g}"))
+        self.ax.tick_params(axis="x", bottom=True, top=False, labelbottom=True, labeltop=False, labelrotation=45)
+
+    def update(self, data: pd.DataFrame | np.ndarray, title: str = "", lines: tuple = (), rows=None):
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame | np.ndarray
+            Cells x frames, of the template's shape. A DataFrame's index labels the rows.
+        title : str
+            Axes title.
+        lines : tuple
+            x position of each vertical marker, in columns.
+        rows : Iterable, optional
+            Row labels, if ``data`` has no index.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
+            The template's figure, redrawn on the next save.
+        """
+        if isinstance(data, pd.DataFrame):
+            rows = data.index if rows is None else rows
+            # A view for float frames; only padded (object) frames are converted.
+            data = data.to_numpy(dtype=float)
+        values = np.ma.masked_invalid(np.asarray(data, dtype=float), copy=False)
+        if values.shape != self.shape:
+            raise ValueError(f"Template is {self.shape}, got {values.shape}")
+        self.image.set_data(values)
+        if values.count():
+            self.image.set_clim(values.min(), values.max())
+        self.title.set_text(title)
+        for i, line in enumerate(self.lines):
+            line.set_visible(i < len(lines))
+            if i < len(lines):
+                line.set_xdata([lines[i], lines[i]])
+        # Relabeling rows is the one text change worth skipping when nothing changed.
+        if rows is not None and (self.rows is None or list(rows) != self.rows):
+            self.rows = list(rows)
+            self.ax.set_yticklabels(self.rows)
+        return self.fig
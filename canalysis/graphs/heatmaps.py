@@ -6,8 +6,12 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 from . import graph_utils
 from .base import _base_heatmap
+from .graph_utils.save_queue import SaveQueue
+from .graph_utils.templates import HeatmapTemplate
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
@@ -18,6 +22,10 @@ logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 graph_utils.helpers.update_rcparams()
 
+# Taste trials run from 2 s before to 5 s after delivery, at 10 frames per second.
+TASTE_ONSET = 20
+TASTE_TICKS = ([0, 20, 69], ["-2", "0", "7"])
+
 
 def add_slash(path):
     """
@@ -30,6 +38,40 @@ def add_slash(path):
     return path
 
 
+def save_figure(fig, save_dir: str, save_name: str, queue: Optional[SaveQueue] = None) -> str:
+    """
+    Save a heatmap figure to ``save_dir/save_name.png`` without overwriting, returning the path.
+
+    With a SaveQueue the figure is rendered now and written in the background.
+    """
+    filename = add_slash(save_dir) + save_name + ".png"
+    if queue is not None:
+        return queue.submit(fig, filename, dpi=400, bbox_inches="tight", pad_inches=0.01)
+    savefile = funcs.check_unique_path(filename)
+    fig.savefig(
+        f"{savefile}",
+        dpi=400,
+        bbox_inches="tight",
+        pad_inches=0.01,
+    )
+    return savefile
+
+
+def eating_lines(eatingstart, entrystart, eatingend) -> tuple:
+    """Column positions of the eating-start and eating-end markers."""
+    return (eatingstart - entrystart) * 10, (eatingend - eatingstart) * 10
+
+
+def taste_template(shape: tuple, **kwargs) -> HeatmapTemplate:
+    """HeatmapTemplate laid out like a taste heatmap: onset marker and -2, 0, 7 s ticks."""
+    return HeatmapTemplate(shape, n_lines=1, xticks=TASTE_TICKS, **kwargs)
+
+
+def eating_template(shape: tuple, **kwargs) -> HeatmapTemplate:
+    """HeatmapTemplate laid out like an eating heatmap: eating start and end markers."""
+    return HeatmapTemplate(shape, n_lines=2, **kwargs)
+
+
 class EatingHeatmap(_base_heatmap.BaseHeatmap):
     def __init__(
         self,
@@ -40,15 +82,17 @@ class EatingHeatmap(_base_heatmap.BaseHeatmap):
         save_dir: str | None = "",
         save_name: str = "",
         title: str | None = "",
+        queue: Optional[SaveQueue] = None,
         **figargs,
     ):
         super().__init__(cmap, colorbar, **figargs)
+        # Columns are frames at 10 Hz; the caller's frame is left as given.
         self.data = data
-        self.data.columns = np.round(np.arange(0, len(self.data.columns) / 10, 0.1), 1)
         self.premask = premask
         self.title = title
         self.save_dir = save_dir
         self.save_name = save_name
+        self.queue = queue
         if self.save_dir is not None and self.save_name is None:
             import random
 
@@ -76,6 +120,8 @@ class EatingHeatmap(_base_heatmap.BaseHeatmap):
                 -e.g. _id = 'heatmaps' -> .../heatmaps.png
         title: str = ''
             If parameter passed, set this string as the plot title.
+        queue: SaveQueue = None
+            If set, saving renders the figure and leaves encoding to the queue's threads.
         sigma : scalar or sequence of scalars = 0
             Standard deviation for Gaussian kernal. This smooths out the heatmap to give a more
             uniform distribution. Set to 0 for no smoothing.
@@ -111,42 +157,82 @@ class EatingHeatmap(_base_heatmap.BaseHeatmap):
     ) -> None:
         if self.save_dir is None:
             raise AttributeError("Attempted save without save directory arg.")
-        save_dir = add_slash(self.save_dir)  # make sure we start in new dir
-        filename = f"{save_dir}" + self.save_name + ".png"
-        savefile = funcs.check_unique_path(filename)
-        self.fig.savefig(
-            f"{savefile}",
-            dpi=400,
-            bbox_inches="tight",
-            pad_inches=0.01,
-        )
+        save_figure(self.fig, self.save_dir, self.save_name, queue=self.queue)
         return None
 
-    def default_heatmap(self, line1=None, line2=None, line3=None, maptype: str = "eating", **kwargs):
+    def default_heatmap(
+        self,
+        line1=None,
+        line2=None,
+        line3=None,
+        maptype: str = "eating",
+        method: str = "raster",
+        rasterized: bool = False,
+        **kwargs,
+    ):
+        """
+        Plot a single heatmap, eating (``line1-3`` = eating start, entry start, eating end)
+        or taste.
+
+        The "raster" method draws one AxesImage (see graph_utils.templates.HeatmapTemplate):
+        nearest-neighbour pixels placed by extent, NaN padding masked, and ticks from a
+        locator. "seaborn" draws the original sns.heatmap QuadMesh, one patch per sample,
+        which is several times slower to draw and save (benchmarks/bench_heatmaps.py).
+
+        Parameters
+        ----------
+        method : str
+            "raster" or "seaborn".
+        rasterized : bool
+            Rasterize the plot for vector output (PDF, SVG).
+        **kwargs : dict
+            Passed to imshow or sns.heatmap.
+        """
+        if method == "raster":
+            self.raster_heatmap(line1, line2, line3, maptype, rasterized=rasterized, **kwargs)
+        elif method == "seaborn":
+            self.seaborn_heatmap(line1, line2, line3, maptype, rasterized=rasterized, **kwargs)
+        else:
+            raise ValueError(f"Unknown heatmap method: {method}")
+        if self.save_dir:
+            self.save()
+        self.fig.close()
+        return self.fig
+
+    def raster_heatmap(self, line1=None, line2=None, line3=None, maptype: str = "eating", **kwargs):
+        make = taste_template if maptype == "taste" else eating_template
+        template = make(self.data.shape, cmap=self.cmap, colorbar=self.colorbar, ax=self.ax, **kwargs)
+        lines = (TASTE_ONSET,) if maptype == "taste" else eating_lines(line1, line2, line3)
+        template.update(self.data, title=self.title, lines=lines)
+        return None
+
+    def seaborn_heatmap(self, line1=None, line2=None, line3=None, maptype: str = "eating", **kwargs):
         """Plot single heatmap with seaborn library."""
         self.ax.set_title(self.title, fontweight="bold")
-        self.data = self.data[self.data.columns].astype(float)
-        self.ax = sns.heatmap(self.data, cbar=self.colorbar, cmap=self.cmap, **kwargs)
+        n_rows, n_cols = self.data.shape
+        self.ax = sns.heatmap(
+            self.data.to_numpy(dtype=float),
+            cbar=self.colorbar,
+            cmap=self.cmap,
+            ax=self.ax,
+            xticklabels=np.round(np.arange(n_cols) / 10, 1),
+            **kwargs,
+        )
         if maptype == "eating":
             self.set_eatingmap_lines(line1, line2, line3)
         if maptype == "taste":
             self.set_tastemap_lines()
-            self.set_taste_axislabel()
-        self.ax.tick_params(axis="x", bottom=True, top=False, labelbottom=True, labeltop=False)
-        self.ax.xaxis.set_ticklabels(ticklabels=self.ax.get_xticklabels(), rotation=45)
-        self.ax.set_yticks(list(i + 0.5 for i in range(0, self.data.shape[0])))
+            self.ax.set_xticks(*TASTE_TICKS)
+        self.ax.tick_params(axis="x", bottom=True, top=False, labelbottom=True, labeltop=False, labelrotation=45)
+        self.ax.set_yticks(np.arange(n_rows) + 0.5)
         self.ax.set_yticklabels(list(self.data.index.values))
         if maptype == "eating":
             n = 2
             [l.set_visible(False) for (i, l) in enumerate(self.ax.xaxis.get_ticklabels()) if i % n != 0]
-        if self.save_dir:
-            self.save()
-        self.fig.close()
-        return self.fig
+        return None
 
     def set_eatingmap_lines(self, eatingstart, entrystart, eatingend):
-        line_loc1 = (eatingstart - entrystart) * 10
-        line_loc2 = (eatingend - eatingstart) * 10
+        line_loc1, line_loc2 = eating_lines(eatingstart, entrystart, eatingend)
         self.ax.axvline(
             line_loc1,
             color="w",
@@ -161,7 +247,7 @@ class EatingHeatmap(_base_heatmap.BaseHeatmap):
 
     def set_tastemap_lines(self):
         self.ax.axvline(
-            20,
+            TASTE_ONSET,
             color="w",
             linewidth=3,
         )
@@ -169,4 +255,4 @@ class EatingHeatmap(_base_heatmap.BaseHeatmap):
 
     @staticmethod
     def set_taste_axislabel():
-        plt.xticks([0, 20, 69], ["-2", "0", "7"])
+        plt.xticks(*TASTE_TICKS)
@@ -17,7 +17,6 @@ import numpy as np
 
 from graphs.graph_utils import helpers, ax_helpers
 from graphs.base._base_figure import CalFigure
-import matplotlib
 helpers.update_rcparams()
 
 
@@ -41,7 +40,6 @@ def pca_scatter(data,
                 color_dict=None,
                 s: int = 10,
                 angles: tuple = None):
-    matplotlib.use("Qt5Agg")
     proj = '3d' if data.shape[1] > 2 else 'rectilinear'
     ax = plt.axes(projection=proj)
     ax = ax_helpers.get_axis_labels(ax, data)
@@ -99,40 +97,48 @@ def pca_skree(variance: Sized, title: str = "") -> plt.figure:
 
 
 def confusion_matrix(
-        y_pred,
-        y_true,
-        labels: list,
+        y_pred=None,
+        y_true=None,
+        labels: list = None,
         xaxislabel: Optional[str] = None,
         yaxislabel: Optional[str] = None,
         caption: Optional[str] = "",
+        mat: Optional[np.ndarray] = None,
+        show: bool = True,
 ) -> np.array:
     """
+    Heatmap of a confusion matrix.
 
     Parameters
     ----------
-    y_pred : TYPE
-        DESCRIPTION.
-    y_true : TYPE
-        DESCRIPTION.
+    y_pred : array-like, optional
+        Predicted labels, when ``mat`` isn't given.
+    y_true : array-like, optional
+        True labels, when ``mat`` isn't given.
     labels : list
-        DESCRIPTION.
+        Class labels, in matrix order.
     xaxislabel : Optional[str], optional
-        DESCRIPTION. The default is None.
+        The default is "predicted label".
     yaxislabel : Optional[str], optional
-        DESCRIPTION. The default is None.
+        The default is "true label".
     caption : Optional[str], optional
-        DESCRIPTION. The default is ''.
+        Text drawn under the axes. The default is ''.
+    mat : np.ndarray, optional
+        Precomputed true x predicted counts, e.g. from nn_utils.scores.
+    show : bool
+        Call plt.show(); pass False to keep batch runs headless.
 
     Returns
     -------
-    mat : TYPE
-        DESCRIPTION.
+    mat : np.ndarray
+        True x predicted counts.
 
     """
-    from sklearn.metrics import confusion_matrix
-    mat = confusion_matrix(y_pred, y_true)
+    if mat is None:
+        from sklearn.metrics import confusion_matrix
+        mat = confusion_matrix(y_true, y_pred, labels=labels)
     sns.heatmap(
-        mat.T,
+        mat,
         square=True,
         annot=True,
         fmt="d",
@@ -140,15 +146,10 @@ def confusion_matrix(
         xticklabels=labels,
         yticklabels=labels,
     )
-    if xaxislabel:
-        plt.xlabel(xaxislabel)
-    else:
-        plt.xlabel("true label")
-    if yaxislabel:
-        plt.ylabel(yaxislabel)
-    else:
-        plt.ylabel("predicted label")
+    plt.xlabel(xaxislabel if xaxislabel else "predicted label")
+    plt.ylabel(yaxislabel if yaxislabel else "true label")
     if caption:
         plt.text(0, -0.03, caption, fontsize="small")
-    plt.show()
+    if show:
+        plt.show()
     return mat
@@ -5,7 +5,7 @@ Created on Wed Jan 19 20:39:48 2022
 
 @author: flynnoconnell
 """
-from . import funcs, excepts, wrappers
-__all__ = ['funcs', 'excepts', 'wrappers']
+from . import funcs, excepts, wrappers, parallel
+__all__ = ['funcs', 'excepts', 'wrappers', 'parallel']
 
 
@@ -5,6 +5,8 @@
 Module(util): General getter/setter/checker functions.
 """
 from __future__ import annotations
+import hashlib
+import json
 import os
 import logging
 from pathlib import Path
@@ -78,6 +80,45 @@ def check_unique_path(path) -> str:
     return path
 
 
+def reserve_unique_path(path) -> str:
+    """
+    Claim a file name like check_unique_path does, atomically.
+
+    Each candidate (``name.png``, ``name1.png``, ...) is created with O_CREAT | O_EXCL, so
+    two writers racing for the same name always end up with different files. The
+    returned path exists as an empty placeholder, to be replaced by the real file.
+    """
+    path = str(path)
+    filename, extension = os.path.splitext(path)
+    counter = 0
+    while True:
+        candidate = path if counter == 0 else filename + str(counter) + extension
+        try:
+            fd = os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            counter += 1
+            continue
+        os.close(fd)
+        return candidate
+
+
+def fingerprint(*arrays, **params) -> str:
+    """
+    Content hash of any number of arrays and keyword parameters.
+
+    Arrays hash their dtype, shape and raw bytes, so two equal arrays always give the
+    same key regardless of where they came from. Parameters must be JSON-serializable
+    (non-serializable values fall back to their ``repr``).
+    """
+    digest = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        digest.update(f"{arr.dtype.str}{arr.shape}".encode())
+        digest.update(arr.view(np.uint8).data if arr.dtype != object else repr(arr.tolist()).encode())
+    digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    return digest.hexdigest()[:16]
+
+
 @typecheck(Iterable, int)
 def interval(
         lst: Iterable[any], gap: Optional[int] = 1, outer: bool = False
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+#parallel.py
+
+Module (utils): Process-pool helpers shared by the per-cell analysis stages.
+"""
+from __future__ import annotations
+
+import os
+from typing import Callable
+
+import numpy as np
+from joblib import Parallel, delayed
+
+
+def effective_n_jobs(n_jobs: int | None) -> int:
+    """Resolve joblib-style n_jobs (None -> 1, negative -> counted back from the CPU count)."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def map_cells(func: Callable, data: np.ndarray, n_jobs: int | None = -1, **kwargs) -> list:
+    """
+    Apply ``func(trace, **kwargs)`` to every row of a (cells, time) array.
+
+    Rows are dispatched to a joblib process pool; with ``n_jobs == 1`` the loop runs
+    in-process so small sessions don't pay pool start-up.
+    """
+    if effective_n_jobs(n_jobs) == 1:
+        return [func(row, **kwargs) for row in data]
+    return Parallel(n_jobs=n_jobs)(delayed(func)(row, **kwargs) for row in data)
@@ -10,22 +10,27 @@ Module (neuralnetwork): Classes/functions for NeuralNetwork module training.
 from __future__ import division
 
 import logging
+import warnings
 from enum import Enum, auto
 
 import numpy as np
 import pandas as pd
 from sklearn import preprocessing
 from sklearn.model_selection import (
+    StratifiedGroupKFold,
     StratifiedShuffleSplit,
     RepeatedStratifiedKFold,
-    GridSearchCV,
 )
 from sklearn.svm import SVC
 
 from graphs.graph_utils.helpers import plot_learning_curve
 from neuralnetwork.nn_utils._properties import _validate, _props
-from neuralnetwork.nn_utils.datahandler import DataHandler
+from neuralnetwork.nn_utils.datahandler import CHUNK_ROWS, DataHandler
+from neuralnetwork.nn_utils.features import TrialFeatures
 from neuralnetwork.nn_utils.scores import Scoring
+from neuralnetwork.nn_utils.nested import NestedCV
+from neuralnetwork.nn_utils.search import KernelSearch
+from neuralnetwork.nn_utils import permutation, solvers
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +44,14 @@ class Stage(Enum):
     SCALE = auto(int)
 
 
+def _check_key(key: dict) -> None:
+    # ScoreStore entries get their stage ("train" / "eval") from the method that scores them.
+    if "stage" in key:
+        raise ValueError("'stage' is set by predict_clf / evaluate_clf and can't be part of the ScoreStore key.")
+
+
 class SupportVectorMachine(_validate, _props):
-    def __init__(self, data, target, stage, cv=None):
+    def __init__(self, data, target, stage, cv=None, solver="auto", features=None, memmap=None):
         """
         Base class for svc.SVM neural network model to handle:
              a binary classification to [-1, 1] values, or 
@@ -69,6 +80,17 @@ class SupportVectorMachine(_validate, _props):
             Labels for data input.
         stage: str
             Stage of network: train, test, or eval.
+        solver: str
+            Classifier engine used by fit_clf when no model is set, see nn_utils.solvers.
+            "svc" (kernel SVC), "linear_svc", "sgd_hinge", "logistic", or "auto" to pick
+            from the number of training samples.
+        features: transformer, optional
+            Fit on the training split and applied to both splits before scaling, e.g.
+            nn_utils.features.TrialFeatures to turn a trials x frames x cells tensor into
+            one row per trial.
+        memmap: str | Path, optional
+            ``.npy`` file to hold the features memory-mapped, for frame-level data that
+            shouldn't sit in RAM next to the rest of the session.
 
         Returns
         -------
@@ -76,18 +98,22 @@ class SupportVectorMachine(_validate, _props):
 
         """
         self.stage = stage
-        self.traindata = DataHandler(data=data, target=target)
+        self.traindata = DataHandler(data=data, target=target, memmap=memmap)
         self.scaler = preprocessing.StandardScaler()
+        self.solver = solver
+        self.features = features
         self.model = None
         self.grid = None
-        # default CV if no other is given
+        # default CV if no other is given, seeded so checkpointed searches can resume
         if not cv:
-            self._cv = RepeatedStratifiedKFold()
+            self._cv = RepeatedStratifiedKFold(random_state=0)
         else:
             self._cv = cv
         self.trainset = {}
         self.scores_train = None
         self.scores_eval = None
+        self.null = None
+        self.nested = None
 
     @staticmethod
     def to_numpy(arg):
@@ -98,13 +124,32 @@ class SupportVectorMachine(_validate, _props):
         else:
             return np.array(arg)
 
-    def split(self, train_size: float = 0.9, n_splits=1, **params) -> None:
+    @classmethod
+    def from_trials(cls, tastedata, stage, pre=2.0, post=5.0, events=None, features=None, **kwargs):
+        """
+        Build a model with one sample per trial from TasteData.get_trial_tensor.
+
+        Args:
+            tastedata (TasteData): session taste data.
+            pre, post (float): seconds before / after delivery.
+            events (list): optional, tastants to include.
+            features (TrialFeatures): optional, defaults to TrialFeatures with default windows.
+            **kwargs (dict): passed to SupportVectorMachine (cv, solver).
+        """
+        tensor, labels, lags = tastedata.get_trial_tensor(pre=pre, post=post, events=events)
+        features = TrialFeatures(lags) if features is None else features
+        return cls(tensor, labels, stage, features=features, **kwargs)
+
+    def split(self, train_size: float = 0.9, n_splits=1, groups=None, **params) -> None:
         """
         Split training dataset into train/test data.
 
         Args:
             train_size (float, optional): Proportion used for training. Defaults to 0.9.
             n_splits (int, optional): Number of iterations to split. Defaults to 1.
+            groups (np.ndarray, optional): Trial of each sample, for frame-level data. All
+                samples of a group land on the same side of the split, using
+                StratifiedGroupKFold in place of the model's cv.
             **params (dict): Optional ShuffleSplit estimator params or custom labels/data.
 
         Returns:
@@ -113,19 +158,37 @@ class SupportVectorMachine(_validate, _props):
             Y_train (Iterable[Any]): Training labels.
             y_test (Iterable[Any]): Testing labels.
         """
-        data = params.pop("data", self.traindata.data)
-        target = params.pop("target", self.traindata.target)
-        if self.cv is None:
+        handler = self.traindata
+        if "data" in params or "target" in params:
+            handler = DataHandler(
+                data=params.pop("data", self.traindata.data),
+                target=params.pop("target", self.traindata.target),
+            )
+        data, target = handler.data, handler.target
+        if groups is not None:
+            # Closest grouped equivalent of a train_size shuffle split: one fold of k held out.
+            cv = StratifiedGroupKFold(
+                n_splits=max(round(1 / (1 - train_size)), 2), shuffle=True, **params
+            )
+        elif self.cv is not None:
+            cv = self.cv
+        else:
             cv = StratifiedShuffleSplit(
                 n_splits=n_splits, train_size=train_size, **params
             )
-        else:
-            cv = self.cv
 
-        train_index, test_index = next(cv.split(data, target))
-        X_train, x_test = data[train_index], data[test_index]
+        train_index, test_index = next(cv.split(data, target, groups))
         Y_train, y_test = target[train_index], target[test_index]
+        if self.features is not None:
+            X_train = self.features.fit_transform(data[train_index], Y_train)
+            x_test = self.features.transform(data[test_index])
+        else:
+            # One buffer holding the train rows then the test rows; both splits are views
+            # of it and are scaled in place, so the split costs one copy of the features.
+            X_train, x_test = handler.gather(train_index, test_index)
 
+        self.trainset["train_index"] = train_index
+        self.trainset["test_index"] = test_index
         self.trainset["X_train"] = X_train
         self.trainset["x_test"] = x_test
         self.trainset["Y_train"] = Y_train
@@ -138,6 +201,8 @@ class SupportVectorMachine(_validate, _props):
         """
         Scale to mean = 0 and st.dev = 1 a train/split dataset.
 
+        The stored split is scaled in place; custom data is left untouched.
+
         Parameters
         ----------
         **kwargs : dict
@@ -148,17 +213,20 @@ class SupportVectorMachine(_validate, _props):
         -------
         None.
         """
-        assert hasattr(self.trainset, "x_test")
+        assert "x_test" in self.trainset
         if not kwargs:
             X_train = self.trainset["X_train"]
             x_test = self.trainset["x_test"]
         else:
             X_train = kwargs["X_train"]
             x_test = kwargs["x_test"]
-        # Get scaler for only training data, apply to training and test data
-        self.scaler.fit(X_train)
-        X_train_scaled = self.scaler.transform(X_train)
-        x_test_scaled = self.scaler.transform(x_test)
+        # Get scaler for only training data, apply to training and test data.
+        # Fit over row chunks: a single fit() upcasts the whole float32 split to float64.
+        self.scaler = preprocessing.StandardScaler(**self.scaler.get_params())
+        for start in range(0, X_train.shape[0], CHUNK_ROWS):
+            self.scaler.partial_fit(X_train[start : start + CHUNK_ROWS])
+        X_train_scaled = self.scaler.transform(X_train, copy=bool(kwargs))
+        x_test_scaled = self.scaler.transform(x_test, copy=bool(kwargs))
         self.trainset["X_train"] = self.to_numpy(X_train_scaled)
         self.trainset["x_test"] = self.to_numpy(x_test_scaled)
         return None
@@ -169,78 +237,162 @@ class SupportVectorMachine(_validate, _props):
         Y_train=None,
         param_grid=None,
         verbose=True,
-        refit=True,
+        search="grid",
+        n_iter=10,
+        n_jobs=None,
+        checkpoint=None,
+        refit=None,
         **svcparams,
     ):
-        assert hasattr(self.trainset, "x_test")
-        if param_grid:
-            param_grid = param_grid
-        else:
-            param_grid = {
-                "C": [0.1, 1, 10, 100, 150, 200, 500, 1000],
-                "gamma": ["scale", "auto"],
-                "kernel": ["linear", "rbf", "poly"],
-            }
-        if not X_train:
+        """
+        Tune SVC hyperparameters with nn_utils.search.KernelSearch.
+
+        Args:
+            param_grid (dict, optional): Candidate C / gamma / kernel values. Defaults to search.DEFAULT_GRID.
+            search (str, optional): "grid", "random" or "halving" (successive halving over folds).
+            n_iter (int, optional): Candidates sampled when search="random".
+            n_jobs (int, optional): Folds fitted in parallel, joblib semantics.
+            checkpoint (str | Path, optional): File that stores finished fold scores so an
+                interrupted search resumes where it stopped.
+            refit (bool, optional): Deprecated and ignored; the best parameters are always set
+                on self.model, which fit_clf fits.
+            **svcparams (dict): Fixed SVC parameters.
+        """
+        if refit is not None:
+            warnings.warn(
+                "optimize_clf(refit=...) is deprecated and ignored; self.model always gets the best parameters.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        assert "x_test" in self.trainset
+        if X_train is None:
             X_train = self.trainset["X_train"]
             Y_train = self.trainset["Y_train"]
-        else:
-            X_train = X_train
-            Y_train = Y_train
-
-        svc = SVC(class_weight="balanced", **svcparams)
-        self.grid = GridSearchCV(
-            svc, param_grid=param_grid, cv=self.cv, refit=refit, verbose=verbose
+        svcparams.setdefault("class_weight", "balanced")
+        self.grid = KernelSearch(
+            param_grid=param_grid,
+            cv=self.cv,
+            search=search,
+            n_iter=n_iter,
+            n_jobs=n_jobs,
+            checkpoint=checkpoint,
+            verbose=verbose,
+            **svcparams,
         )
-        self.grid.fit(X_train, Y_train.ravel())
+        self.grid.fit(X_train, Y_train)
         print("**", "-" * 20, "*", "-" * 20, "**")
         print(f"Best params: {self.grid.best_params_}")
         print("**", "-" * 5)
         print(f"Score: {self.grid.best_score_}")
-        # Use optimized parameters for SVC model
-        kernel_best = self.grid.best_params_["kernel"]
-        c_best = self.grid.best_params_["C"]
-        gamma_best = self.grid.best_params_["gamma"]
-        self.model = SVC(C=c_best, kernel=kernel_best, gamma=gamma_best, verbose=False)
+        # Use optimized parameters, with the fixed ones the search scored them with
+        self.model = SVC(**{**svcparams, **self.grid.best_params_}, verbose=False)
         print("Model optimized")
         return None
 
-    def fit_clf(self, model=None) -> object:
+    def fit_clf(self, model=None, batch_size=None, n_epochs=5, registry=None, session=None) -> object:
         """
         Fit classifier to training data.
 
         Args:
             model (model): optional, input custom model.
+            batch_size (int): optional, train incremental solvers (sgd_hinge, logistic) with
+                partial_fit over mini-batches of this many rows.
+            n_epochs (int): passes over the data when batch_size is set.
+            registry (ModelRegistry): optional, reuse a model already fit with the same
+                params on the same training data, or store the newly fit one.
+            session (str): optional, session recorded with the registry entry.
         """
-        assert hasattr(self.trainset, "x_test")
+        assert "x_test" in self.trainset
         X_train = self.trainset["X_train"]
         Y_train = self.trainset["Y_train"]
         if model:
             self.model = model  # If model proveed, override current model
             logging.info(f"Model provided has been fit: {model}")
-        self.model.fit(X_train, np.ravel(Y_train))
+        if self.model is None:
+            self.model = solvers.get_solver(self.solver, n_samples=X_train.shape[0])
+        if registry is not None and not batch_size:
+            self.model = registry.fit_or_load(self.model, X_train, Y_train, session=session)
+        elif batch_size and solvers.is_incremental(self.model):
+            solvers.fit_in_batches(self.model, X_train, Y_train, batch_size=batch_size, n_epochs=n_epochs)
+        else:
+            self.model.fit(X_train, np.ravel(Y_train))
         return None
 
-    def predict_clf(self, x_test=None):
-        assert hasattr(self.trainset, "x_test")
-        if not x_test:
+    def predict_clf(self, x_test=None, store=None, **key):
+        """
+        Predict the test split and score it.
+
+        Args:
+            x_test (np.ndarray): optional, custom test features.
+            store (ScoreStore): optional, accumulate the score under ``key`` (e.g. animal,
+                date, fold) for a later report across folds and sessions. ``stage`` is set
+                to "train" and can't be part of ``key``.
+        """
+        _check_key(key)
+        assert "x_test" in self.trainset
+        if x_test is None:
             x_test = self.trainset["x_test"]
         y_pred = self.model.predict(x_test)
         self.trainset["y_pred"] = y_pred
         y_true = self.trainset["y_test"]
         _validate._full_predict(y_pred, y_true)
         self.scores_train = Scoring(y_pred, y_true, desc="train", mat=True)
+        if store is not None:
+            store.add(self.scores_train, stage="train", **key)
         return None
 
-    def evaluate_clf(self):
-        y_pred = self.model.predict(self.evaldata.data)
+    def evaluate_clf(self, store=None, **key):
+        """Score the eval data; with ``store``, as in predict_clf with stage "eval"."""
+        _check_key(key)
+        x_eval = self.evaldata.data
+        if self.features is not None:
+            x_eval = self.features.transform(x_eval)
+        # The model was fit on scaled training data, so eval data needs the same scaler.
+        y_pred = self.model.predict(self.scaler.transform(x_eval))
         y_true = self.evaldata.target
         self.trainset["eval_y_pred"] = y_pred
         self.trainset["eval_y_true"] = y_true
         _validate._full_predict(y_pred, y_true)
         self.scores_eval = Scoring(y_pred, y_true, desc="eval", mat=True)
+        if store is not None:
+            store.add(self.scores_eval, stage="eval", **key)
         return None
 
+    def null_distribution(self, n_permutations=1000, groups=None, **kwargs) -> permutation.NullDistribution:
+        """
+        Shuffled-label null for the training data, with permutation p-values.
+
+        Args:
+            n_permutations (int): label shuffles.
+            groups (np.ndarray): optional, trial of each sample; labels are shuffled per trial.
+            **kwargs (dict): passed to nn_utils.permutation.null_distribution (cv, n_jobs,
+                random_state, classifier params).
+
+        The model's ``features`` transformer, if any, is fit within each fold.
+        """
+        kwargs.setdefault("solver", self.solver)
+        kwargs.setdefault("features", self.features)
+        self.null = permutation.null_distribution(
+            self.traindata.data, self.traindata.target, groups=groups, n_permutations=n_permutations, **kwargs
+        )
+        return self.null
+
+    def nested_cv(self, groups=None, **kwargs) -> NestedCV:
+        """
+        Nested cross-validated accuracy of a tuned SVC on the training data.
+
+        Args:
+            groups (np.ndarray): optional, trial of each sample; outer and inner folds keep
+                every sample of a trial on one side (StratifiedGroupKFold by default).
+            **kwargs (dict): passed to nn_utils.nested.NestedCV (param_grid, inner_cv,
+                outer_cv, search, n_jobs, checkpoint_dir, SVC params).
+
+        The model's ``features`` transformer, if any, is fit within each outer fold.
+        """
+        kwargs.setdefault("features", self.features)
+        self.nested = NestedCV(**kwargs).fit(self.traindata.data, self.traindata.target, groups)
+        return self.nested
+
     def get_learning_curves(self, estimator, title: str = "Learning Curve"):
 
         import matplotlib.pyplot as plt
@@ -257,7 +409,7 @@ class SupportVectorMachine(_validate, _props):
             estimator, title, X, y, axes=axes[:, 0], ylim=(0, 1.01), cv=self.cv
         )
         kern = self.grid.best_params_["kernel"]
-        gam = self.grid.best_params_["gamma"]
+        gam = self.grid.best_params_.get("gamma", "n/a")
         C = self.grid.best_params_["C"]
         title = f"SVC - kernel = {kern}, gamma = {gam}, C = {C}"
         plot_learning_curve(
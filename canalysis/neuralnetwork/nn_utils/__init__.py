@@ -8,5 +8,12 @@ Created on Wed Jan 19 20:39:48 2022
 from . import _properties
 from . import _validate
 from . import datahandler
+from . import features
+from . import folds
 from . import funcs
+from . import nested
+from . import permutation
+from . import registry
 from . import scores
+from . import search
+from . import solvers
@@ -21,7 +21,9 @@ class _props:
 
     @evaldata.setter
     def evaldata(self, handlerargs):
-        data, target, stage = handlerargs
+        # (data, target) or (data, target, stage); stage is informational.
+        data, target = handlerargs[:2]
+        self._evaldata = DataHandler(data=data, target=target)
 
     @property
     def cv(self):
@@ -14,7 +14,8 @@ import numpy as np
 class _validate:
     @staticmethod
     def _full_predict(pred, true):
-        assert (np.unique(pred)) == (np.unique(true))
+        # Small (e.g. trial-level) test sets needn't have every class predicted.
+        assert np.isin(np.unique(pred), np.unique(true)).all()
 
     @staticmethod
     def _validate_shape(x, y):
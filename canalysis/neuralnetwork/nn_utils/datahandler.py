@@ -5,26 +5,58 @@
 
 Module (nn_utils): Class to handle data for import into SVM classifier.
 """
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
 import numpy as np
+import pandas as pd
+
+# Rows converted per step when filling a memory-mapped array.
+CHUNK_ROWS = 65_536
 
 
 class DataHandler:
-    def __init__(self, data, target):
+    def __init__(self, data, target, dtype=np.float32, memmap: Optional[str | Path] = None):
         """
         Check and index specific data to feed into SVM. Accepted as input to sklearn.GridSearchCV().
         Features are the data used for regression and margin vectorizations.
         Labels (or targets, synonymous) are what the classifier is being trained on.
 
+        Features are held once, as a C-contiguous ``dtype`` array; an input that already
+        matches is used as-is rather than copied. With ``memmap`` the array lives in a
+        ``.npy`` file instead, filled a chunk of rows at a time.
+
         Parameters
         ----------
         data : pd.DataFrame | np.ndarray
-            Features. 
+            Features.
         target : pd.Series | np.ndarray
             Labels/targets.
+        dtype : type
+            Feature dtype, float32 by default.
+        memmap : str | Path, optional
+            ``.npy`` file to hold the features, opened read/write as a memory map.
         """
         assert data.shape[0] == target.shape[0]
-        self.data = np.array(data)
-        self.target = np.array(target)
+        self.memmap = Path(memmap) if memmap else None
+        if self.memmap is not None:
+            self.data = self._to_memmap(data, dtype)
+        elif isinstance(data, pd.DataFrame):
+            self.data = data.to_numpy(dtype=dtype)
+        else:
+            self.data = np.ascontiguousarray(data, dtype=dtype)
+        self.target = np.asarray(target)
+
+    def _to_memmap(self, data, dtype) -> np.memmap:
+        self.memmap.parent.mkdir(parents=True, exist_ok=True)
+        out = np.lib.format.open_memmap(self.memmap, mode="w+", dtype=dtype, shape=data.shape)
+        rows = data.iloc if isinstance(data, pd.DataFrame) else data
+        for start in range(0, data.shape[0], CHUNK_ROWS):
+            out[start : start + CHUNK_ROWS] = np.asarray(rows[start : start + CHUNK_ROWS], dtype=dtype)
+        out.flush()
+        return out
 
     def __getitem__(self, idx: int):
         """
@@ -43,3 +75,26 @@ class DataHandler:
             Indexed targets.
         """
         return self.data[idx], self.target[idx]
+
+    def gather(self, *indices: np.ndarray) -> list[np.ndarray]:
+        """
+        Copy the rows of each index array into one new buffer, back to back.
+
+        Returns a view of the buffer per index array, so a train/test split costs a single
+        allocation the size of the rows it holds. The buffer is a memory map next to the
+        features when the handler is memory-mapped.
+        """
+        n_rows = sum(len(idx) for idx in indices)
+        shape = (n_rows,) + self.data.shape[1:]
+        if self.memmap is not None:
+            path = self.memmap.with_name(f"{self.memmap.stem}_split.npy")
+            buffer = np.lib.format.open_memmap(path, mode="w+", dtype=self.data.dtype, shape=shape)
+        else:
+            buffer = np.empty(shape, dtype=self.data.dtype)
+        views, start = [], 0
+        for idx in indices:
+            view = buffer[start : start + len(idx)]
+            np.take(self.data, idx, axis=0, out=view)
+            views.append(view)
+            start += len(idx)
+        return views
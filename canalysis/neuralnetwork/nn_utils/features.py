@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# features.py
+
+Module (nn_utils): Compact per-trial features from a trials x frames x cells tensor.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+from scipy.integrate import trapezoid
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.decomposition import PCA
+
+FEATURES = ("mean", "peak", "latency", "auc")
+
+
+class TrialFeatures(BaseEstimator, TransformerMixin):
+    def __init__(
+        self,
+        lags: np.ndarray,
+        windows: Iterable = ((0, 1), (1, 2), (2, 3), (3, 4)),
+        response: Optional[tuple] = None,
+        features: Iterable = FEATURES,
+        baseline: Optional[tuple] = None,
+        n_components: Optional[int] = None,
+    ):
+        """
+        Turn each trial into one feature vector for the SVM.
+
+        A trial contributes one row instead of one row per frame, so training sets shrink
+        by the number of frames per trial and correlated frames of a trial can no longer
+        straddle a train/test split. PCA is the only fitted step, on training trials only,
+        so the transformer can be fit inside each split.
+
+        Parameters
+        ----------
+        lags : np.ndarray
+            Seconds relative to delivery of each frame of the tensor.
+        windows : Iterable
+            [start, stop) pairs, in seconds, each giving one "mean" feature per cell.
+        response : tuple, optional
+            [start, stop) window for "peak", "latency" and "auc". Defaults to every lag >= 0.
+        features : Iterable
+            Any of "mean", "peak", "latency" (seconds to peak) and "auc" (units x seconds).
+        baseline : tuple, optional
+            [start, stop) window whose per-cell mean is subtracted from each trial first.
+        n_components : int, optional
+            Append this many PCA scores of the response window, fit on the training trials.
+        """
+        self.lags = lags
+        self.windows = windows
+        self.response = response
+        self.features = features
+        self.baseline = baseline
+        self.n_components = n_components
+
+    def _mask(self, window) -> np.ndarray:
+        lags = np.asarray(self.lags)
+        mask = (lags >= window[0]) & (lags < window[1])
+        if not mask.any():
+            raise ValueError(f"No frames in window {window}")
+        return mask
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 3:
+            raise ValueError(f"Expected trials x frames x cells, got shape {X.shape}")
+        if self.baseline is not None:
+            X = X - X[:, self._mask(self.baseline)].mean(axis=1, keepdims=True)
+        return X
+
+    def _response_mask(self) -> np.ndarray:
+        return self._mask((0, np.inf) if self.response is None else self.response)
+
+    def fit(self, X: np.ndarray, y=None) -> TrialFeatures:
+        X = self._prepare(X)
+        self.n_cells_ = X.shape[2]
+        if self.n_components:
+            response = X[:, self._response_mask()]
+            self.pca_ = PCA(self.n_components).fit(response.reshape(len(response), -1))
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Returns
+        -------
+        np.ndarray
+            Trials x features, float32, columns ordered as get_feature_names_out.
+        """
+        X = self._prepare(X)
+        mask = self._response_mask()
+        response, lags = X[:, mask], np.asarray(self.lags)[mask]
+        blocks = []
+        for feature in self.features:
+            if feature == "mean":
+                blocks.extend(X[:, self._mask(w)].mean(axis=1) for w in self.windows)
+            elif feature == "peak":
+                blocks.append(response.max(axis=1))
+            elif feature == "latency":
+                blocks.append(lags[response.argmax(axis=1)])
+            elif feature == "auc":
+                blocks.append(trapezoid(response, lags, axis=1))
+            else:
+                raise ValueError(f"Unknown feature: {feature}")
+        if self.n_components:
+            blocks.append(self.pca_.transform(response.reshape(len(response), -1)))
+        return np.hstack(blocks).astype(np.float32, copy=False)
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        cells = [f"C{i}" for i in range(self.n_cells_)] if input_features is None else list(input_features)
+        names = []
+        for feature in self.features:
+            if feature == "mean":
+                names.extend(f"mean[{a},{b})_{cell}" for a, b in self.windows for cell in cells)
+            else:
+                names.extend(f"{feature}_{cell}" for cell in cells)
+        if self.n_components:
+            names.extend(f"pc{i}" for i in range(self.n_components))
+        return np.asarray(names)
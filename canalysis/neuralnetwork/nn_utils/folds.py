@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# folds.py
+
+Module (nn_utils): Per-fold standardization shared by the cross-validated decoders.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+class FoldScaler:
+    def __init__(self, X: np.ndarray, splits: list, per_fold: bool = False):
+        """
+        Training-row mean and standard deviation of every fold, applied on demand.
+
+        Only the statistics are stored (folds x features), so the data is kept once and
+        each fit scales just the rows it reads, instead of holding a scaled copy of ``X``
+        per fold. Labels don't enter, so label permutations can share one instance.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Samples first; any further axes (e.g. bins x cells) get their own statistics.
+        splits : list
+            (train, test) indices of every fold.
+        per_fold : bool
+            ``X`` holds one array per fold (folds x samples x ...), e.g. features fit on
+            each fold's training samples; ``transform`` then reads the fold's own array.
+        """
+        self.per_fold = per_fold
+        shape = (len(splits),) + X.shape[2 if per_fold else 1 :]
+        self.mean = np.empty(shape, dtype=np.float32)
+        self.std = np.empty(shape, dtype=np.float32)
+        for fi, (train, _) in enumerate(splits):
+            rows = (X[fi] if per_fold else X)[train]
+            self.mean[fi] = rows.mean(axis=0)
+            self.std[fi] = rows.std(axis=0)
+        self.std[self.std == 0] = 1.0
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {len(self.mean)} folds"
+
+    def transform(self, X: np.ndarray, fold: int, rows: np.ndarray, *index) -> np.ndarray:
+        """
+        ``X[rows, *index]`` standardized with the statistics of ``fold``, as float32.
+
+        ``index`` selects along the axes after the first, e.g. one time bin.
+        """
+        X = X[fold] if self.per_fold else X
+        scaled = np.subtract(X[(rows, *index)], self.mean[fold][index], dtype=np.float32)
+        scaled /= self.std[fold][index]
+        return scaled
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# nested.py
+
+Module (nn_utils): Nested cross-validation with parallel, checkpointed outer folds.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import RepeatedStratifiedKFold, StratifiedGroupKFold, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from helpers.funcs import fingerprint
+from neuralnetwork.nn_utils.search import KernelSearch, kernel_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def _save(record: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(record, f, default=str)
+    os.replace(tmp, path)
+
+
+def _outer_fold(X, y, groups, train, test, fold_key, checkpoint_dir, features, searchargs, svcparams):
+    start = time.perf_counter()
+    X_train, X_test = X[train], X[test]
+    if features is not None:
+        # Fit on the outer training samples only, so the held-out fold never shapes the features.
+        features = clone(features).fit(X_train, y[train])
+        X_train, X_test = features.transform(X_train), features.transform(X_test)
+    scaler = StandardScaler().fit(X_train)
+    X_train = scaler.transform(X_train).astype(np.float64)
+    X_test = scaler.transform(X_test).astype(np.float64)
+    inner = None if checkpoint_dir is None else Path(checkpoint_dir) / f"inner_{fold_key}.jsonl"
+    search = KernelSearch(checkpoint=inner, verbose=False, **searchargs, **svcparams)
+    search.fit(X_train, y[train], None if groups is None else groups[train])
+
+    # Refit on the whole outer training set with the Gram matrix the search already built.
+    params = search.best_params_
+    clf = SVC(kernel="precomputed", C=params["C"], **svcparams)
+    clf.fit(search.gram(X_train, params), y[train])
+    y_pred = clf.predict(kernel_matrix(X_train, params, X_test))
+    record = {
+        "fold": fold_key,
+        "params": params,
+        "inner_score": float(search.best_score_),
+        "test_score": float(np.mean(y_pred == y[test])),
+        "n_train": int(len(train)),
+        "n_test": int(len(test)),
+        "fit_time": time.perf_counter() - start,
+    }
+    # Written by the worker, so each fold is on disk as soon as it finishes.
+    if checkpoint_dir is not None:
+        _save(record, Path(checkpoint_dir) / f"outer_{fold_key}.json")
+    return record
+
+
+class NestedCV:
+    def __init__(
+        self,
+        param_grid: Optional[dict] = None,
+        inner_cv=None,
+        outer_cv=None,
+        search: str = "grid",
+        n_iter: int = 10,
+        n_jobs: Optional[int] = -1,
+        checkpoint_dir: Optional[str | Path] = None,
+        random_state: Optional[int] = 0,
+        features=None,
+        **svcparams,
+    ):
+        """
+        Unbiased accuracy estimate of a tuned SVC.
+
+        Each outer fold fits ``features`` (if any) and the scaler on its training rows, runs
+        a KernelSearch on them (inner CV over cached Gram matrices), refits the best
+        candidate on the full outer training set reusing the search's Gram matrix, and
+        scores the held-out rows. Outer folds run in a joblib process pool.
+
+        Every finished outer fold is written to ``checkpoint_dir`` as one JSON file named
+        by a hash of the data, configuration and that fold's test rows; inner searches
+        checkpoint there too. Rerunning skips finished folds, and raising ``n_repeats``
+        of the default outer CV reuses the folds of the earlier repeats.
+
+        Parameters
+        ----------
+        param_grid : dict, optional
+            Passed to KernelSearch.
+        inner_cv : cross-validation generator, optional
+            Defaults to 5-fold StratifiedKFold, or StratifiedGroupKFold when ``fit`` gets groups.
+        outer_cv : cross-validation generator, optional
+            Defaults to RepeatedStratifiedKFold(5 folds x 1 repeat) seeded with ``random_state``,
+            or 5-fold StratifiedGroupKFold when ``fit`` gets groups.
+        search : str
+            "grid", "random" or "halving", see KernelSearch.
+        n_iter : int
+            Candidates sampled for "random".
+        n_jobs : int, optional
+            Outer folds run in parallel, joblib semantics.
+        checkpoint_dir : str | Path, optional
+            Directory for per-fold results.
+        random_state : int, optional
+            Seed for the default CVs and random search.
+        features : transformer, optional
+            Fit on each outer fold's training samples and applied to both sides, e.g.
+            nn_utils.features.TrialFeatures for a trials x frames x cells tensor. The inner
+            search runs on the outer fold's features.
+        **svcparams : dict
+            Fixed SVC parameters, e.g. class_weight.
+        """
+        self.param_grid = param_grid
+        self.inner_cv = inner_cv
+        self.outer_cv = outer_cv
+        self.search = search
+        self.n_iter = n_iter
+        self.n_jobs = n_jobs
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.random_state = random_state
+        self.features = features
+        self.svcparams = svcparams
+        self.results_: pd.DataFrame | None = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.search}"
+
+    def _path(self, fold_key: str) -> Path:
+        return self.checkpoint_dir / f"outer_{fold_key}.json"
+
+    def _cvs(self, grouped: bool) -> tuple:
+        """Inner and outer CV; grouped defaults keep every sample of a group on one side."""
+        seed = self.random_state
+        if grouped:
+            inner = StratifiedGroupKFold(5, shuffle=True, random_state=seed)
+            outer = StratifiedGroupKFold(5, shuffle=True, random_state=seed)
+        else:
+            inner = StratifiedKFold(5, shuffle=True, random_state=seed)
+            outer = RepeatedStratifiedKFold(n_splits=5, n_repeats=1, random_state=seed)
+        return self.inner_cv or inner, self.outer_cv or outer
+
+    def _load(self, fold_key: str) -> Optional[dict]:
+        if self.checkpoint_dir is None or not self._path(fold_key).is_file():
+            return None
+        with open(self._path(fold_key)) as f:
+            return json.load(f)
+
+    def fit(self, X: np.ndarray, y: np.ndarray, groups: Optional[np.ndarray] = None) -> NestedCV:
+        """
+        Parameters
+        ----------
+        X : np.ndarray
+            Samples x features, unscaled, or the input of ``features``.
+        y : np.ndarray
+            Labels.
+        groups : np.ndarray, optional
+            Group (trial) of each sample, passed to the outer and inner splits.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        y = np.ravel(y)
+        groups = None if groups is None else np.asarray(groups)
+        inner_cv, outer_cv = self._cvs(groups is not None)
+        searchargs = {
+            "param_grid": self.param_grid,
+            "cv": inner_cv,
+            "search": self.search,
+            "n_iter": self.n_iter,
+            "random_state": self.random_state,
+            "n_jobs": 1,
+        }
+        features = None if self.features is None else self.features.get_params()
+        config = fingerprint(X, y, searchargs=searchargs, svcparams=self.svcparams, features=features)
+        splits = list(outer_cv.split(X, y, groups))
+        keys = [fingerprint(test, config=config) for _, test in splits]
+
+        records = {key: self._load(key) for key in keys}
+        todo = [(key, train, test) for key, (train, test) in zip(keys, splits) if records[key] is None]
+        if len(todo) < len(keys):
+            logger.info(f"Resuming nested CV, {len(keys) - len(todo)} / {len(keys)} outer folds loaded")
+
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_outer_fold)(
+                X, y, groups, train, test, key, self.checkpoint_dir, self.features, searchargs, self.svcparams
+            )
+            for key, train, test in todo
+        )
+        for record in results:
+            records[record["fold"]] = record
+
+        self.results_ = pd.DataFrame([records[key] for key in keys])
+        self.results_.insert(0, "outer_fold", np.arange(len(keys)))
+        return self
+
+    @property
+    def score_(self) -> float:
+        """Mean outer-fold accuracy."""
+        return float(self.results_["test_score"].mean())
+
+    def summary(self) -> pd.Series:
+        scores = self.results_["test_score"]
+        return pd.Series(
+            {
+                "test_score": scores.mean(),
+                "std": scores.std(ddof=1),
+                "inner_score": self.results_["inner_score"].mean(),
+                "n_folds": len(scores),
+            }
+        )
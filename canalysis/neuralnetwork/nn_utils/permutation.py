@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# permutation.py
+
+Module (nn_utils): Shuffled-label null distributions and permutation p-values for decoders.
+"""
+from __future__ import annotations
+
+import logging
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedGroupKFold, StratifiedKFold
+
+from helpers.parallel import effective_n_jobs
+from neuralnetwork.nn_utils import solvers
+from neuralnetwork.nn_utils.folds import FoldScaler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NullDistribution:
+    """
+    Observed decoder scores against their shuffled-label null.
+
+    Attributes
+    ----------
+    accuracy : float
+        Observed cross-validated accuracy.
+    f1 : pd.Series
+        Observed F1 of each class.
+    null_accuracy : np.ndarray
+        Accuracy of each permutation.
+    null_f1 : pd.DataFrame
+        Permutations x classes F1.
+    """
+
+    accuracy: float
+    f1: pd.Series
+    null_accuracy: np.ndarray
+    null_f1: pd.DataFrame
+
+    @property
+    def n_permutations(self) -> int:
+        return self.null_accuracy.size
+
+    @property
+    def chance(self) -> float:
+        """Mean shuffled accuracy."""
+        return float(self.null_accuracy.mean())
+
+    @property
+    def p_accuracy(self) -> float:
+        return (1 + np.sum(self.null_accuracy >= self.accuracy)) / (1 + self.n_permutations)
+
+    @property
+    def p_f1(self) -> pd.Series:
+        return (1 + (self.null_f1 >= self.f1).sum(axis=0)) / (1 + self.n_permutations)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Observed score, null mean and p-value for accuracy and every class F1."""
+        return pd.DataFrame(
+            {
+                "observed": [self.accuracy, *self.f1],
+                "null_mean": [self.chance, *self.null_f1.mean(axis=0)],
+                "p_value": [self.p_accuracy, *self.p_f1],
+            },
+            index=["accuracy", *(f"f1_{c}" for c in self.f1.index)],
+        )
+
+
+def shuffle_labels(y: np.ndarray, groups: np.ndarray, index: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Permute the labels of ``index`` at the group level.
+
+    Every group keeps a single label, so all frames of a trial move together. Assumes a
+    group's rows share one label.
+    """
+    uniq, first, inverse = np.unique(groups[index], return_index=True, return_inverse=True)
+    group_labels = y[index][first]
+    return rng.permutation(group_labels)[inverse.ravel()]
+
+
+def _score(X, scaler, y, groups, splits, classes, solver, params, rng=None):
+    """Cross-validated accuracy and per-class F1, shuffling labels within each fold when ``rng`` is given."""
+    true, pred = [], []
+    for fi, (train, test) in enumerate(splits):
+        y_train, y_test = y[train], y[test]
+        if rng is not None:
+            y_train = shuffle_labels(y, groups, train, rng)
+            y_test = shuffle_labels(y, groups, test, rng)
+        clf = solvers.get_solver(solver, n_samples=train.size, **params)
+        clf.fit(scaler.transform(X, fi, train), y_train)
+        true.append(y_test)
+        pred.append(clf.predict(scaler.transform(X, fi, test)))
+    true, pred = np.concatenate(true), np.concatenate(pred)
+    return np.mean(true == pred), f1_score(true, pred, labels=classes, average=None, zero_division=0)
+
+
+def _null_batch(path, scaler, y, groups, splits, classes, solver, params, seeds):
+    # Memory-mapped read-only: every worker shares the page cache instead of a pickled copy.
+    X = joblib.load(path, mmap_mode="r")
+    return [_score(X, scaler, y, groups, splits, classes, solver, params, np.random.default_rng(s)) for s in seeds]
+
+
+def fold_features(X: np.ndarray, splits: list, features) -> np.ndarray:
+    """Fit a clone of ``features`` on each fold's training samples and transform every sample."""
+    return np.stack([clone(features).fit(X[train]).transform(X) for train, _ in splits]).astype(np.float32)
+
+
+def null_distribution(
+    X: np.ndarray,
+    y: np.ndarray,
+    groups: Optional[np.ndarray] = None,
+    n_permutations: int = 1000,
+    cv=None,
+    features=None,
+    solver: str = "auto",
+    n_jobs: Optional[int] = -1,
+    random_state: Optional[int] = None,
+    temp_folder: Optional[str | Path] = None,
+    **params,
+) -> NullDistribution:
+    """
+    Shuffled-label null distribution of cross-validated decoder accuracy and per-class F1.
+
+    Features are dumped once to a file that every worker opens with ``mmap_mode="r"``, so
+    the dataset is never pickled per job, and each fit standardizes only the rows it reads
+    with its fold's training statistics (nn_utils.folds.FoldScaler). Labels are permuted
+    inside each training and test fold, at the level of ``groups`` (e.g. trials), using one
+    independent stream per permutation spawned from a single SeedSequence. Results are
+    identical for any ``n_jobs``.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Samples x features, unscaled, or the input of ``features`` (e.g. trials x frames x cells).
+    y : np.ndarray
+        Labels.
+    groups : np.ndarray, optional
+        Group (trial) of each sample. Defaults to one group per sample.
+    n_permutations : int
+        Shuffles in the null.
+    cv : cross-validation generator, optional
+        Defaults to 5-fold StratifiedGroupKFold (StratifiedKFold without groups).
+    features : transformer, optional
+        Label-free transformer such as nn_utils.features.TrialFeatures, fit on the training
+        samples of each fold; the permutations reuse the per-fold features.
+    solver : str
+        Classifier engine, see nn_utils.solvers.
+    n_jobs : int, optional
+        Parallel workers, joblib semantics.
+    random_state : int, optional
+        Entropy for the root SeedSequence.
+    temp_folder : str | Path, optional
+        Where to write the features. Defaults to a temporary directory.
+    **params : dict
+        Passed to the classifier.
+
+    Returns
+    -------
+    NullDistribution
+    """
+    X = np.asarray(X, dtype=np.float32)
+    y = np.ravel(y)
+    if cv is None:
+        cv = (
+            StratifiedKFold(5, shuffle=True, random_state=random_state)
+            if groups is None
+            else StratifiedGroupKFold(5, shuffle=True, random_state=random_state)
+        )
+    splits = list(cv.split(X, y, groups))
+    groups = np.arange(y.size) if groups is None else np.asarray(groups)
+    classes = np.unique(y)
+
+    if features is not None:
+        X = fold_features(X, splits, features)
+    scaler = FoldScaler(X, splits, per_fold=features is not None)
+    accuracy, f1 = _score(X, scaler, y, groups, splits, classes, solver, params)
+
+    seeds = np.random.SeedSequence(random_state).spawn(n_permutations)
+    n_batches = min(effective_n_jobs(n_jobs) * 4, n_permutations)
+    batches = [b for b in np.array_split(np.arange(n_permutations), n_batches) if b.size]
+
+    folder = Path(tempfile.mkdtemp(dir=temp_folder))
+    try:
+        path = folder / "features.joblib"
+        joblib.dump(X, path)
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_null_batch)(path, scaler, y, groups, splits, classes, solver, params, [seeds[i] for i in batch])
+            for batch in batches
+        )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    results = [r for batch in results for r in batch]
+    null_accuracy = np.array([acc for acc, _ in results])
+    null_f1 = pd.DataFrame(np.stack([f for _, f in results]), columns=classes)
+    logger.info(f"Accuracy {accuracy:.3f}, null mean {null_accuracy.mean():.3f} over {n_permutations} shuffles")
+    return NullDistribution(
+        accuracy=float(accuracy),
+        f1=pd.Series(f1, index=classes),
+        null_accuracy=null_accuracy,
+        null_f1=null_f1,
+    )
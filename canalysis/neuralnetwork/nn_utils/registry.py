@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# registry.py
+
+Module (nn_utils): On-disk registry of fitted scalers, estimators, searches and score tables.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import joblib
+import numpy as np
+import sklearn
+
+from helpers.funcs import fingerprint
+
+logger = logging.getLogger(__name__)
+
+INDEX = "index.jsonl"
+
+
+def _versions() -> dict:
+    return {"sklearn": sklearn.__version__, "numpy": np.__version__}
+
+
+class ModelRegistry:
+    def __init__(self, directory: str | Path):
+        """
+        Versioned store of fitted objects with a metadata index.
+
+        Every object is written uncompressed with joblib, so its NumPy arrays (support
+        vectors, coefficients, score matrices) can be loaded memory-mapped instead of read
+        into memory. One JSON line per entry in ``index.jsonl`` records the kind, session,
+        params, data fingerprint and library versions; the index is read once, and lookups
+        are dictionary hits.
+
+        Parameters
+        ----------
+        directory : str | Path
+            Registry directory, created on first write.
+        """
+        self.directory = Path(directory)
+        self.index: dict[str, dict] = {}
+        self._read_index()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.directory}), {len(self)} entries"
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def _read_index(self) -> None:
+        path = self.directory / INDEX
+        if not path.is_file():
+            return
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("removed"):
+                    self.index.pop(record["key"], None)
+                else:
+                    self.index[record["key"]] = record
+
+    def _append_index(self, record: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / INDEX, "a") as f:
+            f.write(json.dumps(record, default=repr) + "\n")
+
+    @staticmethod
+    def make_key(kind: str, session: Optional[str] = None, params: Optional[dict] = None, data: str = "") -> str:
+        """Key of an entry: hash of its kind, session, params and data fingerprint."""
+        return fingerprint(kind=kind, session=session, params=params or {}, data=data)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.joblib"
+
+    def put(
+        self,
+        obj: Any,
+        kind: str,
+        session: Optional[str] = None,
+        params: Optional[dict] = None,
+        data: str = "",
+        **meta,
+    ) -> str:
+        """
+        Store ``obj`` and index it.
+
+        Parameters
+        ----------
+        obj : Any
+            Fitted scaler, estimator, search, ScoreStore, DataFrame...
+        kind : str
+            What the object is, e.g. "model", "scaler", "search", "scores".
+        session : str, optional
+            Session identifier, e.g. "Animal02-120221".
+        params : dict, optional
+            Parameters that produced the object.
+        data : str
+            Fingerprint of the training data (helpers.funcs.fingerprint).
+        **meta : dict
+            Extra JSON-serializable metadata to index.
+
+        Returns
+        -------
+        str
+            Entry key.
+        """
+        key = self.make_key(kind, session, params, data)
+        path = self.path(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        joblib.dump(obj, tmp)
+        os.replace(tmp, path)
+        record = {
+            "key": key,
+            "kind": kind,
+            "session": session,
+            "params": params or {},
+            "data": data,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "versions": _versions(),
+            **meta,
+        }
+        # Round-trip so in-memory records match what a fresh registry reads back.
+        record = json.loads(json.dumps(record, default=repr))
+        self._append_index(record)
+        self.index[key] = record
+        logger.info(f"Registered {kind} {key} for {session}")
+        return key
+
+    def get(self, key: str, mmap_mode: Optional[str] = "r") -> Any:
+        """
+        Load an entry; with ``mmap_mode="r"`` large arrays are mapped, not read.
+
+        A warning is logged when the entry was written with another sklearn version.
+        """
+        record = self.index[key]
+        saved = record["versions"]["sklearn"]
+        if saved != sklearn.__version__:
+            logger.warning(f"{key} was saved with sklearn {saved}, running {sklearn.__version__}")
+        return joblib.load(self.path(key), mmap_mode=mmap_mode)
+
+    def find(self, **query) -> list[dict]:
+        """Index records whose fields equal every ``query`` value, newest first."""
+        found = [r for r in self.index.values() if all(r.get(k) == v for k, v in query.items())]
+        return sorted(found, key=lambda r: r["created"], reverse=True)
+
+    def lookup(self, kind: str, session: Optional[str] = None, params: Optional[dict] = None, data: str = ""):
+        """Load the entry for exactly these inputs, or None if it was never stored."""
+        key = self.make_key(kind, session, params, data)
+        return self.get(key) if key in self else None
+
+    def remove(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+        self.index.pop(key, None)
+        self._append_index({"key": key, "removed": True})
+
+    @staticmethod
+    def describe(estimator, X: np.ndarray, y: np.ndarray) -> tuple[dict, str]:
+        """Params (class name included) and training-data fingerprint that key a fitted estimator."""
+        params = {"estimator": type(estimator).__name__, **estimator.get_params()}
+        return json.loads(json.dumps(params, default=repr)), fingerprint(X, y)
+
+    def fit_or_load(
+        self,
+        estimator,
+        X: np.ndarray,
+        y: np.ndarray,
+        session: Optional[str] = None,
+        kind: str = "model",
+        return_key: bool = False,
+    ):
+        """
+        Return a fitted estimator for (params, data), fitting and storing it only on a miss.
+
+        The key covers the estimator class and params and a fingerprint of X and y, so a
+        changed dataset or parameter always refits. With ``return_key``, returns
+        (estimator, key), the key being the entry the estimator was loaded from or stored under.
+        """
+        params, data = self.describe(estimator, X, y)
+        key = self.make_key(kind, session, params, data)
+        if key in self:
+            logger.info(f"Loaded fitted {params['estimator']} {key} from registry")
+            estimator = self.get(key)
+        else:
+            estimator.fit(X, np.ravel(y))
+            self.put(estimator, kind, session=session, params=params, data=data)
+        return (estimator, key) if return_key else estimator
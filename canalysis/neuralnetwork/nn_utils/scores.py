@@ -10,27 +10,34 @@ Module (neuralnetwork): Structures to score and keep scores for evaluated data.
 from __future__ import division
 
 import logging
-import pickle
 from dataclasses import dataclass
 from typing import Optional, Iterable, Any
 
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.metrics import classification_report
-
-from graphs.plot import Plot
+from sklearn.metrics import classification_report, confusion_matrix
 
 logger = logging.getLogger(__name__)
 
 
 def save(save_file_path, team):
-    with open(save_file_path, "wb") as f:
-        pickle.dump(team, f)
+    """Write scores with joblib, uncompressed so arrays can be memory-mapped on load."""
+    joblib.dump(team, save_file_path)
+
 
+def load(save_file_path, mmap_mode=None):
+    return joblib.load(save_file_path, mmap_mode=mmap_mode)
 
-def load(save_file_path):
-    with open(save_file_path, "rb") as f:
-        return pickle.load(f)
+
+def _metrics(counts: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-class precision, recall and F1 of a true x predicted confusion matrix."""
+    tp = np.diag(counts).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(tp / counts.sum(axis=0))
+        recall = np.nan_to_num(tp / counts.sum(axis=1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return precision, recall, f1
 
 
 @dataclass
@@ -45,6 +52,9 @@ class Scoring(object):
         """
         Class to manage scoring variables from fitted classifiers. 
 
+        Nothing is drawn here, so scoring is safe in batch runs; call render() to plot the
+        confusion matrix.
+
         Parameters
         ----------
         pred : ndarray
@@ -52,7 +62,7 @@ class Scoring(object):
         true : ndarray
             Descriptors of each predictable value.
         mat : bool, optional
-            Whether to output a Confusion Matrix. The default is False.
+            Whether to compute a Confusion Matrix. The default is False.
 
         Returns
         -------
@@ -61,7 +71,7 @@ class Scoring(object):
         # Input variables
         self.predicted: Iterable[Any] = pred
         self.true: Iterable[Any] = true
-        self.classes: list = list(np.unique(self.predicted))
+        self.classes: list = list(np.unique(np.concatenate([np.ravel(true), np.ravel(pred)])))
         self.descriptor: str = desc
         self.report: pd.DataFrame = self.get_report()
 
@@ -71,6 +81,10 @@ class Scoring(object):
             logging.info("No descriptor")
             pass
 
+    @property
+    def accuracy(self) -> float:
+        return float(np.mean(np.ravel(self.true) == np.ravel(self.predicted)))
+
     def get_report(self) -> pd.DataFrame:
         """ Get classification report"""
         if self.descriptor:
@@ -87,20 +101,88 @@ class Scoring(object):
         self.report = classification_report(
             self.true,
             self.predicted,
-            target_names=self.classes,
+            target_names=[str(c) for c in self.classes],
             labels=self.classes,
             output_dict=True,
+            zero_division=0,
         )
         report_df = pd.DataFrame(data=self.report).transpose()
         return report_df
 
-    def get_confusion_matrix(self, caption: Optional[str] = "") -> object:
-        """ Get confusion matrix"""
-        mat = Plot.confusion_matrix(
-            y_true=self.true,
-            y_pred=self.predicted,
-            labels=self.classes,
-            caption=caption,
+    def get_confusion_matrix(self) -> np.ndarray:
+        """ Get confusion matrix, rows are true and columns predicted classes."""
+        return confusion_matrix(self.true, self.predicted, labels=self.classes)
+
+    def render(self, caption: Optional[str] = "", show: bool = True):
+        """Plot the confusion matrix."""
+        from graphs import plot
+
+        mat = getattr(self, "mat", None)
+        mat = self.get_confusion_matrix() if mat is None else mat
+        return plot.confusion_matrix(mat=mat, labels=self.classes, caption=caption, show=show)
+
+
+class ScoreStore:
+    def __init__(self):
+        """
+        Confusion matrices accumulated across folds, sessions or stages.
+
+        Each added Scoring keeps only its class labels, confusion matrix and key (e.g.
+        animal, date, fold, stage); reports are derived from summed matrices on demand, so
+        the store stays small over thousands of fits.
+        """
+        self.keys: list[dict] = []
+        self.classes: list[list] = []
+        self.matrices: list[np.ndarray] = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {len(self)} scores"
+
+    def add(self, scoring: Scoring, **key) -> None:
+        """Store one Scoring under ``key``, e.g. add(score, animal="Animal02", fold=3)."""
+        mat = getattr(scoring, "mat", None)
+        self.keys.append(key)
+        self.classes.append(list(scoring.classes))
+        self.matrices.append(scoring.get_confusion_matrix() if mat is None else mat)
+
+    def _select(self, where: dict) -> list[int]:
+        return [i for i, key in enumerate(self.keys) if all(key.get(k) == v for k, v in where.items())]
+
+    def confusion(self, **where) -> pd.DataFrame:
+        """Summed true x predicted counts over every entry matching ``where``, on the union of classes."""
+        selected = self._select(where)
+        labels = sorted({c for i in selected for c in self.classes[i]})
+        pos = {c: j for j, c in enumerate(labels)}
+        total = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        for i in selected:
+            idx = [pos[c] for c in self.classes[i]]
+            total[np.ix_(idx, idx)] += self.matrices[i]
+        return pd.DataFrame(total, index=pd.Index(labels, name="true"), columns=pd.Index(labels, name="predicted"))
+
+    def report(self, **where) -> pd.DataFrame:
+        """Per-class precision, recall, F1 and support from the summed confusion matrix."""
+        mat = self.confusion(**where)
+        counts = mat.to_numpy()
+        precision, recall, f1 = _metrics(counts)
+        return pd.DataFrame(
+            {"precision": precision, "recall": recall, "f1-score": f1, "support": counts.sum(axis=1)},
+            index=mat.index,
         )
 
-        return mat
+    def to_frame(self) -> pd.DataFrame:
+        """One row per stored entry: its key, accuracy, macro F1 and sample count."""
+        rows = []
+        for key, mat in zip(self.keys, self.matrices):
+            f1 = _metrics(mat)[2]
+            rows.append({**key, "accuracy": np.trace(mat) / mat.sum(), "macro_f1": f1.mean(), "n": int(mat.sum())})
+        return pd.DataFrame(rows)
+
+    def render(self, caption: Optional[str] = "", show: bool = True, **where):
+        """Plot the summed confusion matrix of the entries matching ``where``."""
+        from graphs import plot
+
+        mat = self.confusion(**where)
+        return plot.confusion_matrix(mat=mat.to_numpy(), labels=list(mat.index), caption=caption, show=show)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# search.py
+
+Module (nn_utils): Parallel, resumable SVC hyperparameter search on precomputed kernel matrices.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics.pairwise import euclidean_distances, linear_kernel, polynomial_kernel, rbf_kernel
+from sklearn.model_selection import ParameterGrid, ParameterSampler, RepeatedStratifiedKFold
+from sklearn.svm import SVC
+
+from helpers.funcs import fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = {
+    "C": [0.1, 1, 10, 100, 150, 200, 500, 1000],
+    "gamma": ["scale", "auto"],
+    "kernel": ["linear", "rbf", "poly"],
+}
+
+
+def _resolve_gamma(gamma, X: np.ndarray) -> float:
+    if gamma == "scale":
+        var = X.var()
+        return 1.0 / (X.shape[1] * var) if var > 0 else 1.0
+    if gamma == "auto":
+        return 1.0 / X.shape[1]
+    return float(gamma)
+
+
+def _canonical(params: dict) -> dict:
+    """Drop parameters the kernel ignores, so e.g. linear candidates differing only in gamma collapse."""
+    params = dict(params)
+    if params.get("kernel", "rbf") == "linear":
+        params.pop("gamma", None)
+        params.pop("degree", None)
+    elif params.get("kernel", "rbf") == "rbf":
+        params.pop("degree", None)
+    return params
+
+
+def kernel_matrix(X: np.ndarray, params: dict, Y: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Kernel between the rows of ``Y`` (defaults to ``X``) and the training rows ``X``.
+
+    "scale" / "auto" gammas are resolved on ``X``, so a test-vs-train matrix matches the
+    Gram matrix the model was fit on.
+    """
+    Y = X if Y is None else Y
+    kernel = params.get("kernel", "rbf")
+    if kernel == "linear":
+        return linear_kernel(Y, X)
+    gamma = _resolve_gamma(params.get("gamma", "scale"), X)
+    if kernel == "rbf":
+        return rbf_kernel(Y, X, gamma=gamma)
+    if kernel == "poly":
+        return polynomial_kernel(Y, X, degree=params.get("degree", 3), gamma=gamma, coef0=params.get("coef0", 0.0))
+    raise ValueError(f"Kernel {kernel} can't be precomputed.")
+
+
+def _per_fold(params: dict) -> bool:
+    """Whether the kernel depends on the training rows' variance ("scale" gamma), so it differs per fold."""
+    return params.get("kernel", "rbf") in ("rbf", "poly") and params.get("gamma", "scale") == "scale"
+
+
+def _base_matrix(X: np.ndarray, params: dict) -> np.ndarray:
+    """Gamma-free part of a per-fold kernel: squared distances for rbf, inner products for poly."""
+    if params.get("kernel", "rbf") == "rbf":
+        return euclidean_distances(X, squared=True)
+    return linear_kernel(X)
+
+
+def _fold_kernel(base: np.ndarray, params: dict, gamma: float) -> np.ndarray:
+    if params.get("kernel", "rbf") == "rbf":
+        return np.exp(-gamma * base)
+    return (gamma * base + params.get("coef0", 0.0)) ** params.get("degree", 3)
+
+
+def _kernel_key(params: dict) -> tuple:
+    """Parameters that determine the kernel matrix, everything but C."""
+    return tuple(sorted((k, v) for k, v in params.items() if k != "C"))
+
+
+def _fit_fold(gram, y, train, test, params: dict, svcparams: dict, gamma: Optional[float] = None):
+    # With ``gamma``, ``gram`` is a _base_matrix and the fold's kernel is built from its slices.
+    start = time.perf_counter()
+    K_train, K_test = gram[np.ix_(train, train)], gram[np.ix_(test, train)]
+    if gamma is not None:
+        K_train, K_test = _fold_kernel(K_train, params, gamma), _fold_kernel(K_test, params, gamma)
+    clf = SVC(kernel="precomputed", C=params["C"], **svcparams)
+    clf.fit(K_train, y[train])
+    score = clf.score(K_test, y[test])
+    return score, time.perf_counter() - start
+
+
+class KernelSearch:
+    def __init__(
+        self,
+        param_grid: Optional[dict] = None,
+        cv=None,
+        search: str = "grid",
+        n_iter: int = 10,
+        factor: int = 3,
+        n_jobs: Optional[int] = None,
+        checkpoint: Optional[str | Path] = None,
+        random_state: Optional[int] = None,
+        verbose: bool = True,
+        **svcparams,
+    ):
+        """
+        Hyperparameter search for SVC that reuses one kernel matrix across every C value.
+
+        For each distinct (kernel, gamma, degree, coef0) the full training-set Gram matrix is
+        computed once; every candidate and fold then fits ``SVC(kernel="precomputed")`` on
+        slices of it. Folds run in parallel through joblib, which memory-maps the Gram
+        matrix into the workers instead of copying it per task.
+
+        A "scale" gamma depends on the variance of the training rows, so it is resolved on
+        each fold's training rows: the search caches the gamma-free squared distances (rbf)
+        or inner products (poly) instead and builds each fold's kernel from their slices,
+        which keeps the validation rows out of the kernel. Numeric and "auto" gammas don't
+        depend on the rows and are precomputed in full. The Gram matrix is n_samples ** 2
+        floats, so frame-level datasets should be reduced (or use a linear solver) first.
+
+        Parameters
+        ----------
+        param_grid : dict, optional
+            SVC parameters to search (C, kernel, gamma, degree, coef0). Defaults to DEFAULT_GRID.
+        cv : cross-validation generator, optional
+            Defaults to RepeatedStratifiedKFold (5 folds x 10 repeats) seeded with
+            ``random_state`` (0 if unset), so the folds, and with them the checkpoint, are
+            the same on every run.
+        search : str
+            "grid": every candidate on every fold.
+            "random": ``n_iter`` candidates sampled from the grid (or distributions).
+            "halving": successive halving with folds as the resource; each rung keeps the
+            best 1 / ``factor`` candidates and evaluates them on ``factor`` times more folds.
+        n_iter : int
+            Candidates sampled for "random".
+        factor : int
+            Reduction factor for "halving".
+        n_jobs : int, optional
+            Parallel workers, joblib semantics.
+        checkpoint : str | Path, optional
+            JSON-lines file to append each finished (candidate, fold) score to. An
+            interrupted search with the same data, folds and checkpoint resumes where it
+            stopped.
+        random_state : int, optional
+            Seed for "random" candidate sampling and the default CV.
+        **svcparams : dict
+            Fixed SVC parameters, e.g. class_weight.
+        """
+        self.param_grid = DEFAULT_GRID if param_grid is None else param_grid
+        if cv is None:
+            cv = RepeatedStratifiedKFold(random_state=0 if random_state is None else random_state)
+        self.cv = cv
+        self.search = search
+        self.n_iter = n_iter
+        self.factor = factor
+        self.n_jobs = n_jobs
+        self.checkpoint = Path(checkpoint) if checkpoint else None
+        self.random_state = random_state
+        self.verbose = verbose
+        self.svcparams = svcparams
+        self.best_params_: dict = {}
+        self.best_score_: float = np.nan
+        self.cv_results_: pd.DataFrame | None = None
+        self.grams_: dict = {}
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.search}"
+
+    def _candidates(self) -> list[dict]:
+        if self.search == "random":
+            sampled = ParameterSampler(self.param_grid, self.n_iter, random_state=self.random_state)
+        elif self.search in ("grid", "halving"):
+            sampled = ParameterGrid(self.param_grid)
+        else:
+            raise ValueError(f"Unknown search: {self.search}")
+        unique = {}
+        for params in sampled:
+            params = _canonical(params)
+            unique[json.dumps(params, sort_keys=True, default=str)] = params
+        return list(unique.values())
+
+    def _load_checkpoint(self, run_key: str) -> dict:
+        done = {}
+        if self.checkpoint is None or not self.checkpoint.is_file():
+            return done
+        with open(self.checkpoint) as f:
+            for line in f:
+                record = json.loads(line)
+                if record["run"] == run_key:
+                    done[(record["candidate"], record["fold"])] = record["score"]
+        if done:
+            logger.info(f"Resuming search, {len(done)} fold scores loaded from {self.checkpoint}")
+        return done
+
+    def _evaluate(self, X, y, splits, tasks, run_key, done, grams):
+        """Score every (candidate, fold) task not already in ``done``, appending to the checkpoint."""
+        todo = [(ci, params, fi) for ci, params, fi in tasks if (ci, fi) not in done]
+        if not todo:
+            return
+        for params in {_kernel_key(p): p for _, p, _ in todo}.values():
+            key = _kernel_key(params)
+            if key not in grams:
+                grams[key] = _base_matrix(X, params) if _per_fold(params) else kernel_matrix(X, params)
+        gammas = {fi: _resolve_gamma("scale", X[splits[fi][0]]) for _, params, fi in todo if _per_fold(params)}
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_fold)(
+                grams[_kernel_key(params)],
+                y,
+                *splits[fi],
+                params,
+                self.svcparams,
+                gamma=gammas[fi] if _per_fold(params) else None,
+            )
+            for _, params, fi in todo
+        )
+        records = []
+        for (ci, params, fi), (score, fit_time) in zip(todo, results):
+            done[(ci, fi)] = score
+            records.append({"run": run_key, "candidate": ci, "fold": fi, "score": score, "fit_time": fit_time})
+        if self.checkpoint is not None:
+            self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.checkpoint, "a") as f:
+                f.writelines(json.dumps(r) + "\n" for r in records)
+
+    def gram(self, X: np.ndarray, params: dict) -> np.ndarray:
+        """Training-set Gram matrix for ``params``, from the search's cache when available."""
+        key = _kernel_key(_canonical(params))
+        if key not in self.grams_:
+            self.grams_[key] = kernel_matrix(np.asarray(X, dtype=np.float64), params)
+        return self.grams_[key]
+
+    def fit(self, X: np.ndarray, y: np.ndarray, groups: Optional[np.ndarray] = None) -> KernelSearch:
+        """``groups`` is passed to the CV split, for grouped splitters such as StratifiedGroupKFold."""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.ravel(y)
+        splits = list(self.cv.split(X, y, groups))
+        candidates = self._candidates()
+        names = [json.dumps(p, sort_keys=True, default=str) for p in candidates]
+        # "gamma" versions the key: checkpoints from before "scale" was resolved per fold aren't reused.
+        run_key = fingerprint(X, y, *[test for _, test in splits], svcparams=self.svcparams, gamma="per-fold")
+        done = self._load_checkpoint(run_key)
+        grams: dict = {}
+
+        alive = list(range(len(candidates)))
+        if self.search == "halving":
+            n_rungs = max(math.ceil(math.log(len(candidates), self.factor)), 0)
+            n_folds = max(len(splits) // self.factor**n_rungs, 1)
+        else:
+            n_rungs, n_folds = 0, len(splits)
+
+        # Evaluate in rungs (a single rung unless halving) so finished folds hit the checkpoint early.
+        for rung in range(n_rungs + 1):
+            n_folds = len(splits) if rung == n_rungs else min(n_folds, len(splits))
+            tasks = [(names[ci], candidates[ci], fi) for ci in alive for fi in range(n_folds)]
+            for start in range(0, len(tasks), 64):
+                self._evaluate(X, y, splits, tasks[start : start + 64], run_key, done, grams)
+            if self.verbose:
+                logger.info(f"Rung {rung}: {len(alive)} candidates x {n_folds} folds")
+            if rung < n_rungs:
+                means = [np.mean([done[(names[ci], fi)] for fi in range(n_folds)]) for ci in alive]
+                keep = max(math.ceil(len(alive) / self.factor), 1)
+                alive = [alive[i] for i in np.argsort(means)[::-1][:keep]]
+                n_folds *= self.factor
+
+        rows = []
+        for ci, params in enumerate(candidates):
+            scores = [done[(names[ci], fi)] for fi in range(len(splits)) if (names[ci], fi) in done]
+            rows.append(
+                {
+                    "params": params,
+                    **{f"param_{k}": v for k, v in params.items()},
+                    "mean_test_score": np.mean(scores),
+                    "std_test_score": np.std(scores),
+                    "n_folds": len(scores),
+                }
+            )
+        results = pd.DataFrame(rows)
+        # Only candidates that reached every fold are eligible for best, which matters for halving.
+        full = results["n_folds"] == len(splits)
+        results["rank_test_score"] = (
+            results["mean_test_score"].where(full, -np.inf).rank(ascending=False, method="min").astype(int)
+        )
+        self.cv_results_ = results
+        # Kept so a refit on the full training set (see gram) needn't recompute the kernel.
+        self.grams_ = {key: gram for key, gram in grams.items() if not _per_fold(dict(key))}
+        best = results.loc[results["rank_test_score"].idxmin()]
+        self.best_params_: dict[str, Any] = best["params"]
+        self.best_score_ = best["mean_test_score"]
+        return self
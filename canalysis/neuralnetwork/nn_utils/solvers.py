@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# solvers.py
+
+Module (nn_utils): Classifier engines for SupportVectorMachine, from kernel SVC to mini-batch linear solvers.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.svm import SVC, LinearSVC
+from sklearn.utils.class_weight import compute_class_weight
+
+logger = logging.getLogger(__name__)
+
+# Sample counts where "auto" switches engine. Kernel SVC is O(n^2 - n^3) in samples.
+SVC_MAX_SAMPLES = 10_000
+LINEAR_SVC_MAX_SAMPLES = 200_000
+
+
+# Every engine balances class weights by default, so switching solver keeps the objective
+# the same on imbalanced tastant sets.
+def _svc(**params):
+    return SVC(**{"class_weight": "balanced", **params})
+
+
+def _linear_svc(**params):
+    return LinearSVC(**{"class_weight": "balanced", "dual": False, **params})
+
+
+def _sgd_hinge(**params):
+    return SGDClassifier(**{"loss": "hinge", "class_weight": "balanced", **params})
+
+
+def _logistic(**params):
+    return SGDClassifier(**{"loss": "log_loss", "class_weight": "balanced", **params})
+
+
+SOLVERS = {
+    "svc": _svc,
+    "linear_svc": _linear_svc,
+    "sgd_hinge": _sgd_hinge,
+    "logistic": _logistic,
+}
+
+
+def get_solver(name: str = "auto", n_samples: Optional[int] = None, **params):
+    """
+    Build an unfitted classifier.
+
+    Parameters
+    ----------
+    name : str
+        "svc" (kernel SVC), "linear_svc" (primal LinearSVC), "sgd_hinge" (linear SVM by SGD),
+        "logistic" (logistic regression by SGD), or "auto" to choose from ``n_samples``:
+        kernel SVC up to SVC_MAX_SAMPLES, LinearSVC up to LINEAR_SVC_MAX_SAMPLES, SGD hinge beyond.
+    n_samples : int, optional
+        Training-set size, required for "auto".
+    **params : dict
+        Passed to the estimator.
+    """
+    if name == "auto":
+        if n_samples is None:
+            raise ValueError("n_samples is required to choose a solver automatically.")
+        if n_samples <= SVC_MAX_SAMPLES:
+            name = "svc"
+        elif n_samples <= LINEAR_SVC_MAX_SAMPLES:
+            name = "linear_svc"
+        else:
+            name = "sgd_hinge"
+        logger.info(f"Solver chosen for {n_samples} samples: {name}")
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown solver {name}, choose from {list(SOLVERS)} or 'auto'.")
+    return SOLVERS[name](**params)
+
+
+def is_incremental(model) -> bool:
+    """True if the estimator can be trained in mini-batches with partial_fit."""
+    return hasattr(model, "partial_fit")
+
+
+def fit_in_batches(
+    model,
+    X: np.ndarray,
+    y: np.ndarray,
+    batch_size: int = 10_000,
+    n_epochs: int = 5,
+    random_state: Optional[int] = None,
+):
+    """
+    Train an incremental estimator with ``partial_fit`` over shuffled mini-batches.
+
+    Only one batch of rows is gathered at a time, so the training set never has to be
+    copied as a whole. A ``class_weight="balanced"`` model is trained with weights balanced
+    over the full ``y`` instead, since "balanced" isn't available to partial_fit; its
+    ``class_weight`` is set back to "balanced" afterwards, so a later fit on other labels
+    balances over those.
+
+    Parameters
+    ----------
+    model : estimator
+        Must implement partial_fit.
+    X : np.ndarray
+        Samples x features.
+    y : np.ndarray
+        Labels.
+    batch_size : int
+        Rows per partial_fit call.
+    n_epochs : int
+        Passes over the data.
+    random_state : int, optional
+        Seed for the per-epoch shuffle.
+    """
+    if not is_incremental(model):
+        raise TypeError(f"{model} does not support partial_fit.")
+    y = np.ravel(y)
+    classes = np.unique(y)
+    class_weight = model.get_params().get("class_weight")
+    if class_weight == "balanced":
+        weights = compute_class_weight("balanced", classes=classes, y=y)
+        model.set_params(class_weight=dict(zip(classes, weights)))
+    try:
+        rng = np.random.default_rng(random_state)
+        for _ in range(n_epochs):
+            order = rng.permutation(y.size)
+            for start in range(0, y.size, batch_size):
+                # Sorted indices keep the gather close to a sequential read.
+                batch = np.sort(order[start : start + batch_size])
+                model.partial_fit(X[batch], y[batch], classes=classes)
+    finally:
+        model.set_params(class_weight=class_weight)
+    return model
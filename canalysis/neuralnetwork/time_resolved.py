@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# time_resolved.py
+
+Module (neuralnetwork): Decode tastant identity in sliding peri-stimulus bins.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy import stats
+from sklearn.model_selection import RepeatedStratifiedKFold
+
+from neuralnetwork.nn_utils import solvers
+from neuralnetwork.nn_utils.folds import FoldScaler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TimeResolvedResult:
+    """
+    Accuracy of a time-resolved decoder.
+
+    Attributes
+    ----------
+    times : np.ndarray
+        Bin centers, seconds relative to delivery.
+    scores : np.ndarray
+        Folds x train bins x test bins accuracy. Test bins only span the diagonal unless
+        the decoder was run with ``generalize=True``.
+    accuracy : np.ndarray
+        Mean accuracy across folds for each bin (diagonal).
+    ci_low, ci_high : np.ndarray
+        t-distribution confidence interval of the fold mean.
+    chance : float
+        Accuracy of always predicting the most common class.
+    """
+
+    times: np.ndarray
+    scores: np.ndarray
+    accuracy: np.ndarray
+    ci_low: np.ndarray
+    ci_high: np.ndarray
+    chance: float
+
+    @property
+    def generalization(self) -> pd.DataFrame:
+        """Train bin x test bin mean accuracy."""
+        return pd.DataFrame(np.nanmean(self.scores, axis=0), index=self.times, columns=self.times)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"accuracy": self.accuracy, "ci_low": self.ci_low, "ci_high": self.ci_high},
+            index=pd.Index(self.times, name="time"),
+        )
+
+
+def bin_trials(tensor: np.ndarray, lags: np.ndarray, window: float, step: float, start=None, stop=None):
+    """
+    Average a trials x frames x cells tensor over sliding windows.
+
+    Windows are ``[center - window / 2, center + window / 2)`` for centers every ``step``
+    seconds, applied as one (bins, frames) averaging matrix so every bin is computed in a
+    single contraction.
+
+    Returns
+    -------
+    binned : np.ndarray
+        Trials x bins x cells.
+    centers : np.ndarray
+        Bin centers, in seconds.
+    """
+    start = lags[0] + window / 2 if start is None else start
+    stop = lags[-1] - window / 2 if stop is None else stop
+    centers = np.round(np.arange(start, stop + step / 2, step), 6)
+    weights = (lags >= centers[:, None] - window / 2) & (lags < centers[:, None] + window / 2)
+    weights = weights / weights.sum(axis=1, keepdims=True)
+    return np.einsum("bf,tfc->tbc", weights.astype(tensor.dtype), tensor), centers
+
+
+def _decode_bin(binned, scaler, labels, splits, train_bin, test_bins, solver, params):
+    """Fit at one bin for every fold and score at each test bin."""
+    scores = np.full((len(splits), binned.shape[1]), np.nan)
+    for fi, (train, test) in enumerate(splits):
+        clf = solvers.get_solver(solver, n_samples=train.size, **params)
+        clf.fit(scaler.transform(binned, fi, train, train_bin), labels[train])
+        for tb in test_bins:
+            scores[fi, tb] = clf.score(scaler.transform(binned, fi, test, tb), labels[test])
+    return scores
+
+
+class TimeResolvedDecoder:
+    def __init__(
+        self,
+        window: float = 0.5,
+        step: Optional[float] = None,
+        cv=None,
+        solver: str = "linear_svc",
+        generalize: bool = False,
+        ci: float = 95,
+        n_jobs: Optional[int] = -1,
+        **params,
+    ):
+        """
+        Train and test a classifier in every peri-stimulus bin.
+
+        Folds are drawn over trials, so every frame of a trial lands on the same side of the
+        split, and the same folds are shared by every bin. Each bin is standardized with the
+        statistics of its fold's training trials (nn_utils.folds.FoldScaler), computed once
+        and applied to the rows each fit and test reads. Bins run in parallel through
+        joblib, which memory-maps the binned array into the workers.
+
+        Parameters
+        ----------
+        window : float
+            Bin width, in seconds.
+        step : float, optional
+            Spacing between bin centers, in seconds. Defaults to ``window``.
+        cv : cross-validation generator, optional
+            Split over trials. Defaults to RepeatedStratifiedKFold (5 folds x 5 repeats).
+        solver : str
+            Classifier engine, see nn_utils.solvers.
+        generalize : bool
+            Also test every classifier at every other bin (temporal generalization).
+        ci : float
+            Confidence level, in percent.
+        n_jobs : int, optional
+            Parallel workers, joblib semantics.
+        **params : dict
+            Passed to the classifier.
+        """
+        self.window = window
+        self.step = window if step is None else step
+        self.cv = RepeatedStratifiedKFold(n_splits=5, n_repeats=5, random_state=0) if cv is None else cv
+        self.solver = solver
+        self.generalize = generalize
+        self.ci = ci
+        self.n_jobs = n_jobs
+        self.params = params
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.window}s"
+
+    def fit(self, tensor: np.ndarray, labels: np.ndarray, lags: np.ndarray) -> TimeResolvedResult:
+        """
+        Parameters
+        ----------
+        tensor : np.ndarray
+            Trials x frames x cells, e.g. from TasteData.get_trial_tensor.
+        labels : np.ndarray
+            Class of each trial.
+        lags : np.ndarray
+            Seconds relative to delivery of each frame.
+        """
+        labels = np.asarray(labels)
+        binned, times = bin_trials(tensor, lags, self.window, self.step)
+        splits = list(self.cv.split(binned[:, 0], labels))
+        scaler = FoldScaler(binned, splits)
+        n_bins = times.size
+
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_decode_bin)(
+                binned,
+                scaler,
+                labels,
+                splits,
+                tb,
+                range(n_bins) if self.generalize else [tb],
+                self.solver,
+                self.params,
+            )
+            for tb in range(n_bins)
+        )
+        scores = np.stack(results, axis=1)
+        diagonal = scores[:, np.arange(n_bins), np.arange(n_bins)]
+        accuracy = diagonal.mean(axis=0)
+        n = diagonal.shape[0]
+        half = stats.t.ppf(0.5 + self.ci / 200, n - 1) * diagonal.std(axis=0, ddof=1) / np.sqrt(n)
+        _, counts = np.unique(labels, return_counts=True)
+        return TimeResolvedResult(
+            times=times,
+            scores=scores,
+            accuracy=accuracy,
+            ci_low=accuracy - half,
+            ci_high=accuracy + half,
+            chance=counts.max() / labels.size,
+        )
+
+
+def decode_sessions(
+    alldata,
+    pre: float = 2.0,
+    post: float = 5.0,
+    events: Optional[list] = None,
+    **decoderargs,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Run a TimeResolvedDecoder on every session in AllData.
+
+    Bins are defined in seconds, so sessions with different cell counts share the same
+    time axis and can be averaged directly.
+
+    Parameters
+    ----------
+    alldata : AllData
+        Animal : {date : CalciumData}.
+    pre, post : float
+        Peri-stimulus window passed to TasteData.get_trial_tensor.
+    events : list, optional
+        Tastants to decode. Defaults to every tastant in each session.
+    **decoderargs : dict
+        Passed to TimeResolvedDecoder.
+
+    Returns
+    -------
+    sessions : pd.DataFrame
+        One row per (animal, date, time) with accuracy, ci_low, ci_high and chance.
+    summary : pd.DataFrame
+        Mean accuracy, SEM across sessions, and mean chance, per time.
+    """
+    decoder = TimeResolvedDecoder(**decoderargs)
+    frames = []
+    for animal, sessions in alldata.items():
+        for date, data in sessions.items():
+            tensor, labels, lags = data.tastedata.get_trial_tensor(pre=pre, post=post, events=events)
+            result = decoder.fit(tensor, labels, lags)
+            frame = result.to_frame().reset_index()
+            frame.insert(0, "date", date)
+            frame.insert(0, "animal", animal)
+            frame["chance"] = result.chance
+            frames.append(frame)
+            logger.info(f"{animal}-{date}: peak accuracy {result.accuracy.max():.2f}")
+    sessions = pd.concat(frames, ignore_index=True)
+    summary = sessions.groupby("time").agg(
+        accuracy=("accuracy", "mean"),
+        sem=("accuracy", "sem"),
+        chance=("chance", "mean"),
+        n_sessions=("accuracy", "size"),
+    )
+    return sessions, summary
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# transfer.py
+
+Module (neuralnetwork): Train on one session, test on every other session of the same animal.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.linalg import orthogonal_procrustes
+from sklearn.decomposition import PCA
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from helpers.funcs import fingerprint
+from helpers.parallel import effective_n_jobs
+from neuralnetwork.nn_utils import solvers
+from neuralnetwork.nn_utils.features import TrialFeatures
+from neuralnetwork.nn_utils.registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def _zscore(X: np.ndarray) -> np.ndarray:
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    return ((X - X.mean(axis=0)) / std).astype(np.float32)
+
+
+def _class_means(X: np.ndarray, y: np.ndarray, classes: np.ndarray) -> np.ndarray:
+    return np.stack([X[y == c].mean(axis=0) for c in classes])
+
+
+def align(X_fit: np.ndarray, y_fit: np.ndarray, X_train: np.ndarray, y_train: np.ndarray) -> np.ndarray:
+    """
+    Rotation from one session's PC scores onto another's.
+
+    PCA axes of two sessions are only defined up to rotation and sign, so scores are mapped
+    with the orthogonal Procrustes rotation that best matches the per-class mean responses
+    the two sessions share. ``X_fit`` must not include the trials the rotation is scored on,
+    or their labels leak into the prediction; see aligned_score.
+    """
+    classes = np.intersect1d(y_fit, y_train)
+    R, _ = orthogonal_procrustes(_class_means(X_fit, y_fit, classes), _class_means(X_train, y_train, classes))
+    return R
+
+
+def aligned_score(model, X_test, y_test, X_train, y_train, random_state: Optional[int] = 0) -> float:
+    """
+    Accuracy on a PCA-space test session without fitting the alignment on scored labels.
+
+    The test trials are split into two stratified halves; the rotation fit on one half's
+    labels is used to score the other, both ways round (cross-fitting).
+    """
+    correct = 0
+    halves = StratifiedKFold(2, shuffle=True, random_state=random_state).split(X_test, y_test)
+    for fit, held in halves:
+        R = align(X_test[fit], y_test[fit], X_train, y_train)
+        correct += int(np.sum(model.predict(X_test[held] @ R) == y_test[held]))
+    return correct / len(y_test)
+
+
+def _score_pair(path, registry, key, train, test, space, cv, solver, params):
+    # Memory-mapped: workers share the prepared arrays and fitted models on disk.
+    sessions = joblib.load(path, mmap_mode="r")
+    X_train, y_train = sessions[train]
+    X_test, y_test = sessions[test]
+    if train == test:
+        clf = solvers.get_solver(solver, n_samples=len(y_train), **params)
+        return float(np.mean(cross_val_score(clf, X_train, y_train, cv=cv))), len(y_train)
+    model = ModelRegistry(registry).get(key)
+    if space == "pca":
+        return aligned_score(model, X_test, y_test, X_train, y_train), len(y_test)
+    return float(model.score(X_test, y_test)), len(y_test)
+
+
+class TransferGrid:
+    def __init__(
+        self,
+        space: str = "pca",
+        n_components: int = 10,
+        cell_map: Optional[dict] = None,
+        pre: float = 2.0,
+        post: float = 5.0,
+        events: Optional[list] = None,
+        solver: str = "linear_svc",
+        cv=None,
+        n_jobs: Optional[int] = -1,
+        results: Optional[str | Path] = None,
+        registry: Optional[ModelRegistry] = None,
+        **params,
+    ):
+        """
+        Cross-session decoder transfer for the sessions of one animal.
+
+        Every session is reduced once to per-trial features (nn_utils.features.TrialFeatures)
+        and z-scored within the session. Sessions rarely record the same set of cells, so
+        the decoder works in a shared space:
+
+            "pca": the top ``n_components`` PCs of each session's features; test scores are
+            rotated onto the train session's PCs with ``align``, fit on the labels of the
+            other half of the test trials (aligned_score), so scored labels never leak.
+            "cells": features of the cells registered in every session, which needs an
+            explicit ``cell_map``; names like "C00" are assigned per session and don't
+            refer to the same cell across days.
+
+        One model per session is fit (or reused) through a ModelRegistry, the prepared
+        arrays are dumped once and memory-mapped by the workers, and the N x N grid of
+        (train, test) pairs runs in parallel. The diagonal is within-session
+        cross-validated accuracy.
+
+        Parameters
+        ----------
+        space : str
+            "pca" or "cells".
+        n_components : int
+            PCs kept for "pca", capped by each session's trial count.
+        cell_map : dict, optional
+            Session name : {cell name : registered cell id}, from cross-day registration.
+            Required for "cells".
+        pre, post : float
+            Peri-stimulus window passed to TasteData.get_trial_tensor.
+        events : list, optional
+            Tastants to decode. Defaults to every tastant.
+        solver : str
+            Classifier engine, see nn_utils.solvers.
+        cv : cross-validation generator, optional
+            For the diagonal. Defaults to 5-fold StratifiedKFold.
+        n_jobs : int, optional
+            Parallel workers, joblib semantics.
+        results : str | Path, optional
+            JSON-lines file each finished pair is appended to; pairs already there for the
+            same configuration are skipped, so an interrupted run resumes.
+        registry : ModelRegistry, optional
+            Where per-session models are kept. Defaults to a temporary registry.
+        **params : dict
+            Passed to the classifier.
+        """
+        if space not in ("cells", "pca"):
+            raise ValueError(f"Unknown space: {space}")
+        if space == "cells" and cell_map is None:
+            raise ValueError("space='cells' needs a cell_map from cross-day registration; cell names are per session.")
+        self.space = space
+        self.n_components = n_components
+        self.cell_map = cell_map
+        self.pre = pre
+        self.post = post
+        self.events = events
+        self.solver = solver
+        self.cv = StratifiedKFold(5, shuffle=True, random_state=0) if cv is None else cv
+        self.n_jobs = n_jobs
+        self.results = Path(results) if results else None
+        self.registry = registry
+        self.params = params
+
+    def __repr__(self):
+        return f"{type(self).__name__}, {self.space}"
+
+    def _config(self) -> str:
+        return fingerprint(
+            space=self.space,
+            n_components=self.n_components,
+            cell_map=self.cell_map,
+            pre=self.pre,
+            post=self.post,
+            events=self.events,
+            solver=self.solver,
+            params=self.params,
+        )
+
+    def prepare(self, sessions: dict) -> dict:
+        """Session name : (features, labels) in the shared space."""
+        cells = None
+        if self.space == "cells":
+            missing = [name for name in sessions if name not in self.cell_map]
+            if missing:
+                raise ValueError(f"No cell registration for sessions {missing}")
+            cells = sorted(set.intersection(*(set(self.cell_map[name].values()) for name in sessions)))
+            if not cells:
+                raise ValueError("No registered cell appears in every session, use space='pca'.")
+        prepared = {}
+        for name, data in sessions.items():
+            tensor, labels, lags = data.tastedata.get_trial_tensor(pre=self.pre, post=self.post, events=self.events)
+            if cells is not None:
+                local = {registered: cell for cell, registered in self.cell_map[name].items()}
+                tensor = tensor[:, :, [list(data.cells).index(local[c]) for c in cells]]
+            X = _zscore(TrialFeatures(lags).fit_transform(tensor))
+            if self.space == "pca":
+                X = PCA(min(self.n_components, *X.shape)).fit_transform(X).astype(np.float32)
+            prepared[name] = (X, labels)
+        if self.space == "pca":
+            # Sessions can have different trial counts; keep the smallest common dimension.
+            k = min(X.shape[1] for X, _ in prepared.values())
+            prepared = {name: (X[:, :k], y) for name, (X, y) in prepared.items()}
+        return prepared
+
+    def _load_results(self, run: str) -> dict:
+        done = {}
+        if self.results is None or not self.results.is_file():
+            return done
+        with open(self.results) as f:
+            for line in f:
+                record = json.loads(line)
+                if record["run"] == run:
+                    done[(record["train"], record["test"])] = record["accuracy"]
+        return done
+
+    def run(self, sessions: dict, animal: str = "") -> pd.DataFrame:
+        """
+        Parameters
+        ----------
+        sessions : dict
+            Session name (e.g. date) : CalciumData, all from one animal.
+        animal : str
+            Recorded with each result.
+
+        Returns
+        -------
+        pd.DataFrame
+            Train session x test session accuracy.
+        """
+        names = list(sessions)
+        prepared = self.prepare(sessions)
+        run = fingerprint(*[X for X, _ in prepared.values()], animal=animal, config=self._config())
+        done = self._load_results(run)
+
+        folder = Path(tempfile.mkdtemp())
+        registry = self.registry if self.registry is not None else ModelRegistry(folder / "models")
+        try:
+            models = {}
+            for name, (X, y) in prepared.items():
+                clf = solvers.get_solver(self.solver, n_samples=len(y), **self.params)
+                _, models[name] = registry.fit_or_load(clf, X, y, session=f"{animal}-{name}", return_key=True)
+            path = folder / "sessions.joblib"
+            joblib.dump(prepared, path)
+
+            todo = [(a, b) for a in names for b in names if (a, b) not in done]
+            batch = max(effective_n_jobs(self.n_jobs) * 4, 1)
+            for start in range(0, len(todo), batch):
+                pairs = todo[start : start + batch]
+                scores = Parallel(n_jobs=self.n_jobs)(
+                    delayed(_score_pair)(
+                        path, registry.directory, models[a], a, b, self.space, self.cv, self.solver, self.params
+                    )
+                    for a, b in pairs
+                )
+                records = [
+                    {"run": run, "animal": animal, "train": a, "test": b, "accuracy": acc, "n_test": n}
+                    for (a, b), (acc, n) in zip(pairs, scores)
+                ]
+                done.update({(r["train"], r["test"]): r["accuracy"] for r in records})
+                if self.results is not None:
+                    self.results.parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.results, "a") as f:
+                        f.writelines(json.dumps(r, default=str) + "\n" for r in records)
+                logger.info(f"{animal}: {len(done)} / {len(names) ** 2} pairs")
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        grid = pd.DataFrame(np.nan, index=pd.Index(names, name="train"), columns=pd.Index(names, name="test"))
+        for (a, b), acc in done.items():
+            grid.loc[a, b] = acc
+        return grid
+
+
+def transfer_alldata(alldata, min_sessions: int = 2, **gridargs) -> dict:
+    """
+    Run a TransferGrid for every animal in AllData with at least ``min_sessions`` sessions.
+
+    Parameters
+    ----------
+    alldata : AllData
+        Animal : {date : CalciumData}.
+    min_sessions : int
+        Animals with fewer sessions are skipped.
+    **gridargs : dict
+        Passed to TransferGrid.
+
+    Returns
+    -------
+    dict
+        Animal : train x test accuracy DataFrame.
+    """
+    grid = TransferGrid(**gridargs)
+    out = {}
+    for animal, sessions in alldata.items():
+        if len(sessions) < min_sessions:
+            logger.info(f"{animal}: {len(sessions)} session(s), skipped")
+            continue
+        out[animal] = grid.run(sessions, animal=animal)
+    return out
@@ -0,0 +1,15 @@
+"""Shared test setup: import paths and a headless matplotlib backend."""
+
+import sys
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+_ROOT = Path(__file__).resolve().parent.parent
+# Most modules import through ``canalysis.``; the neural network modules import ``neuralnetwork.``
+# and ``helpers.`` from inside the package directory.
+for _path in (_ROOT, _ROOT / "canalysis"):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
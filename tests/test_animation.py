@@ -0,0 +1,82 @@
+"""Test animation export through the Pillow fallback writer."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from canalysis.graphs import animation
+from canalysis.graphs.animation import PCATrajectory, PillowWriter, TracePlayback, open_writer
+
+
+class TestAnimation(unittest.TestCase):
+    """Test PillowWriter, open_writer and _Animation.save without ffmpeg."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        patcher = mock.patch.object(animation, "ffmpeg_path", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(plt.close, "all")
+
+    def test_open_writer(self):
+        """Without ffmpeg a .gif collects frames and other extensions write a PNG sequence."""
+        frame = np.zeros((10, 12, 4), dtype=np.uint8)
+        frame[..., 3] = 255
+        gif = open_writer(self.dir / "a.gif", (12, 10), fps=5)
+        self.assertIsInstance(gif, PillowWriter)
+        for value in (0, 255):
+            frame[..., :3] = value
+            gif.write(frame)
+        gif.close()
+        with Image.open(self.dir / "a.gif") as image:
+            self.assertEqual(image.size, (12, 10))
+            self.assertEqual(image.n_frames, 2)
+
+        seq = open_writer(self.dir / "b.mp4", (12, 10), fps=5)
+        seq.write(frame)
+        seq.close()
+        self.assertEqual(seq.output, str(self.dir / "b_frames"))
+        self.assertEqual([p.name for p in (self.dir / "b_frames").iterdir()], ["000000.png"])
+
+    def test_pca_trajectory(self):
+        """Every requested frame is written and the figure is left as it was."""
+        t = np.linspace(0, 4 * np.pi, 20)
+        pca_df = pd.DataFrame({"PC1": np.cos(t), "PC2": np.sin(t), "PC3": t})
+        anim = PCATrajectory(pca_df, dims=3, figsize=(3, 3))
+        canvas, dpi = anim.fig.canvas, anim.fig.dpi
+        times = anim.save(self.dir / "pca.gif", fps=10, dpi=40)
+        self.assertEqual(list(times.index), list(range(20)))
+        self.assertEqual(list(times.columns), ["update", "draw", "write"])
+        self.assertIs(anim.fig.canvas, canvas)
+        self.assertEqual(anim.fig.dpi, dpi)
+        self.assertFalse(anim.head.get_animated())
+        with Image.open(self.dir / "pca.gif") as image:
+            self.assertEqual(image.n_frames, 20)
+            self.assertEqual(image.size, (120, 120))
+        with self.assertRaises(ValueError):
+            PCATrajectory(pca_df[["PC1"]], dims=2)
+
+    def test_trace_playback(self):
+        """Frames advance by ``step`` samples and show at most ``window`` seconds."""
+        time = np.arange(50) * 0.5
+        signals = pd.DataFrame({"time": time, "C0": np.sin(time), "C1": np.cos(time)})
+        anim = TracePlayback(time, signals, window=5.0, step=10, figsize=(3, 2))
+        self.assertEqual(anim.n_frames, 5)
+        anim.update(3)
+        segments = anim.lines.get_segments()
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(segments[0][-1, 0], 0)
+        self.assertEqual(segments[0][0, 0], -5.0)
+        self.assertEqual(anim.clock.get_text(), "15.0 s")
+        times = anim.save(self.dir / "traces.gif", frames=[0, 4], dpi=30)
+        self.assertEqual(list(times.index), [0, 4])
+        with Image.open(self.dir / "traces.gif") as image:
+            self.assertEqual(image.n_frames, 2)
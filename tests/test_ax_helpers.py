@@ -0,0 +1,61 @@
+"""Test batched span shading."""
+
+import unittest
+from types import SimpleNamespace
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from canalysis.graphs.graph_utils.ax_helpers import shade_handles, shade_spans, span_verts
+from canalysis.graphs.graph_utils.Mixins import CalPlots
+
+
+class TestShading(unittest.TestCase):
+    """Test span_verts and shade_spans."""
+
+    def test_span_verts(self):
+        """Widths or explicit stops give one rectangle per span, filtered by start."""
+        verts = span_verts([1.0, 5.0, 9.0], 0.5, window=(0, 6))
+        self.assertEqual(verts.shape, (2, 4, 2))
+        np.testing.assert_array_equal(verts[1, :, 0], [5.0, 5.0, 5.5, 5.5])
+        np.testing.assert_array_equal(verts[0, :, 1], [0, 1, 1, 0])
+        np.testing.assert_array_equal(span_verts([1.0], [3.0])[0, :, 0], [1.0, 1.0, 3.0, 3.0])
+        self.assertEqual(span_verts([], 1.0).shape, (0, 4, 2))
+
+    def test_shade_spans(self):
+        """All spans become one collection spanning the axes height, leaving data limits alone."""
+        fig, ax = plt.subplots()
+        try:
+            ax.plot([0, 10], [2, 3])
+            ylim = ax.get_ylim()
+            coll = shade_spans(ax, span_verts(np.arange(0, 10, 2), 0.5), "red")
+            self.assertEqual(len(ax.collections), 1)
+            self.assertEqual(len(coll.get_paths()), 5)
+            self.assertEqual(ax.get_ylim(), ylim)
+            self.assertEqual(coll.get_label(), "_nolegend_")
+            self.assertEqual([h.get_label() for h in shade_handles({"Lick": "red"})], ["Lick"])
+        finally:
+            plt.close(fig)
+
+
+class TestSessionLegend(unittest.TestCase):
+    """Test that plot_session labels the shading once, in a figure legend."""
+
+    def test_one_legend(self):
+        time = np.arange(500) * 0.1
+        signals = pd.DataFrame(np.random.default_rng(0).normal(size=(500, 4)), columns=["C0", "C1", "C2", "C3"])
+        session = CalPlots()
+        session.tracedata = SimpleNamespace(time=time, signals=signals, cells=signals.columns)
+        session.eventdata = SimpleNamespace(timestamps={"Lick": np.arange(1.0, 40.0, 3.0)})
+        session.doevents, session.doeating = True, False
+        plt.close("all")
+        session.plot_session()
+        fig = plt.gcf()
+        try:
+            self.assertEqual(len(fig.legends), 1)
+            self.assertEqual([t.get_text() for t in fig.legends[0].get_texts()], ["Licking"])
+            labels = [c.get_label() for ax in fig.axes for c in ax.collections]
+            self.assertEqual(labels, ["_nolegend_"] * 4)
+        finally:
+            plt.close(fig)
@@ -0,0 +1,64 @@
+"""Test headless batch rendering."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from canalysis.graphs import batch
+from canalysis.graphs.batch import FigureJob
+from canalysis.graphs.graph_utils.ax_helpers import span_verts
+from canalysis.graphs.graph_utils.Mixins import CalPlots, cell_figure
+
+
+def _trials(offset: float = 0.0) -> list:
+    time = np.linspace(-2, 4, 60)
+    return [(time, np.sin(time + k) + offset, {"Lick": span_verts([0.0, 1.0], 0.15)}) for k in range(3)]
+
+
+class TestBatch(unittest.TestCase):
+    """Test render's manifest, error handling and cache."""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.out = Path(self.folder.name)
+        colors = {"Lick": "gray"}
+        self.jobs = [FigureJob(f"C0{i}_Lick", cell_figure, (_trials(i), colors, f"C0{i}")) for i in range(3)]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_render_and_cache(self):
+        """Every job is written once; an unchanged rerun is cached, a changed job replaced in place."""
+        first = batch.render(self.jobs, self.out, n_jobs=2, dpi=40)
+        self.assertEqual(first["error"].isna().tolist(), [True] * 3)
+        self.assertFalse(first["cached"].any())
+        self.assertEqual(json.loads((self.out / "manifest.json").read_text())[0]["path"], "C00_Lick.png")
+
+        second = batch.render(self.jobs, self.out, n_jobs=1, dpi=40)
+        self.assertTrue(second["cached"].all())
+
+        self.jobs[1] = FigureJob("C01_Lick", cell_figure, (_trials(5), {"Lick": "gray"}, "C01"))
+        third = batch.render(self.jobs, self.out, n_jobs=1, dpi=40)
+        self.assertEqual(third["cached"].tolist(), [True, False, True])
+        self.assertEqual(sorted(p.name for p in self.out.glob("*.png")), [f"C0{i}_Lick.png" for i in range(3)])
+
+    def test_failed_job(self):
+        """A job that raises is recorded and the rest still render."""
+        jobs = self.jobs[:1] + [FigureJob("broken", cell_figure, ([], {}, ""))]
+        manifest = batch.render(jobs, self.out, n_jobs=1, cache=False, dpi=40)
+        self.assertEqual(manifest["error"].isna().tolist(), [True, False])
+        self.assertTrue((self.out / "C00_Lick.png").is_file())
+        self.assertFalse((self.out / "broken.png").exists())
+
+    def test_show_closes_figures(self):
+        """Without save_dir, plot_stim and plot_cells close each figure after showing it."""
+        plt.close("all")
+        for method, jobs in (("plot_stim", "stim_jobs"), ("plot_cells", "cell_jobs")):
+            with mock.patch.object(batch, jobs, return_value=self.jobs):
+                self.assertIsNone(getattr(CalPlots, method)(object()))
+            self.assertEqual(plt.get_fignums(), [])
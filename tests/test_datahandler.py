@@ -0,0 +1,42 @@
+"""Test the SVM data handler."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from neuralnetwork.nn_utils import datahandler
+from neuralnetwork.nn_utils.datahandler import DataHandler
+
+
+class TestDataHandler(unittest.TestCase):
+    """Test DataHandler storage and gather."""
+
+    def setUp(self):
+        self.frame = pd.DataFrame(np.arange(30, dtype=np.float64).reshape(10, 3), columns=["C0", "C1", "C2"])
+        self.target = pd.Series(list("ababababab"))
+
+    def test_no_copy(self):
+        """A matching C-contiguous float32 array is held as-is; a DataFrame is converted."""
+        arr = np.ones((4, 2), dtype=np.float32)
+        self.assertIs(DataHandler(arr, np.zeros(4)).data, arr)
+        handler = DataHandler(self.frame, self.target)
+        self.assertEqual(handler.data.dtype, np.float32)
+        X, y = handler[[1, 2]]
+        np.testing.assert_array_equal(X, self.frame.to_numpy()[[1, 2]])
+        self.assertEqual(list(y), ["b", "a"])
+
+    def test_memmap(self):
+        """A memory-mapped handler fills the file in chunks and gathers into a mapped buffer."""
+        with tempfile.TemporaryDirectory() as folder, mock.patch.object(datahandler, "CHUNK_ROWS", 3):
+            path = Path(folder) / "features.npy"
+            handler = DataHandler(self.frame, self.target, memmap=path)
+            np.testing.assert_array_equal(np.load(path), self.frame.to_numpy(dtype=np.float32))
+            train, test = handler.gather(np.array([0, 2, 4]), np.array([9]))
+            np.testing.assert_array_equal(train, handler.data[[0, 2, 4]])
+            np.testing.assert_array_equal(test, handler.data[[9]])
+            self.assertIs(train.base, test.base)
+            self.assertTrue((Path(folder) / "features_split.npy").is_file())
@@ -0,0 +1,56 @@
+"""Test trace decimation for drawing."""
+
+import unittest
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from canalysis.graphs.graph_utils.decimate import decimate, pixel_bins
+
+
+class TestDecimate(unittest.TestCase):
+    """Test decimate's min/max envelope and LTTB against brute force."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.time = np.arange(1003) * 0.1
+        self.signals = pd.DataFrame(rng.normal(0, 1, (1003, 3)), columns=["C0", "C1", "C2"])
+
+    def test_minmax_envelope(self):
+        """Each bin keeps its minimum and maximum in time order; the last bin takes the remainder."""
+        x, y = decimate(self.time, self.signals, 10)
+        self.assertEqual(y.shape, (3, 20))
+        data = self.signals.to_numpy().T
+        bounds = [i * 100 for i in range(10)] + [1003]
+        for b in range(10):
+            block = data[:, bounds[b] : bounds[b + 1]]
+            expected = np.column_stack([block.min(axis=1), block.max(axis=1)])
+            np.testing.assert_array_equal(np.sort(y[:, 2 * b : 2 * b + 2], axis=1), expected)
+        self.assertTrue(np.all(np.diff(x, axis=1) >= 0))
+
+    def test_lttb(self):
+        """LTTB returns n points per cell, keeps both ends and picks real samples."""
+        x, y = decimate(self.time, self.signals, 50, method="lttb")
+        self.assertEqual(y.shape, (3, 50))
+        np.testing.assert_array_equal(x[:, [0, -1]], [[0.0, self.time[-1]]] * 3)
+        idx = np.rint(x / 0.1).astype(int)
+        np.testing.assert_array_equal(y, np.take_along_axis(self.signals.to_numpy().T, idx, axis=1))
+
+    def test_window_and_passthrough(self):
+        """Windows keep one sample of margin, short traces are returned unchanged."""
+        x, y = decimate(self.time, self.signals, 1000, window=(10.0, 20.0))
+        self.assertAlmostEqual(x[0, 0], 9.9)
+        self.assertAlmostEqual(x[0, -1], 20.1)
+        np.testing.assert_array_equal(y, self.signals.to_numpy()[99:202].T)
+        with self.assertRaises(ValueError):
+            decimate(self.time, self.signals, 10, method="mean")
+
+    def test_pixel_bins(self):
+        """Bins follow the figure (or axes) width at the render dpi."""
+        fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+        try:
+            self.assertEqual(pixel_bins(fig, dpi=200), 800)
+            self.assertEqual(pixel_bins(fig, ax=ax), int(400 * ax.get_position().width))
+        finally:
+            plt.close(fig)
@@ -0,0 +1,59 @@
+"""Test OASIS AR(1) deconvolution and the per-cell process pool."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from canalysis.analysis.deconvolution import deconvolve, estimate_ar1, oasis_ar1
+from canalysis.helpers.parallel import effective_n_jobs, map_cells
+
+
+def _ar1(spikes: np.ndarray, g: float) -> np.ndarray:
+    c = np.zeros(spikes.size)
+    for t, s in enumerate(spikes):
+        c[t] = (g * c[t - 1] if t else 0.0) + s
+    return c
+
+
+class TestDeconvolution(unittest.TestCase):
+    """Test oasis_ar1, estimate_ar1 and deconvolve."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.g = 0.9
+        self.spikes = np.where(rng.random(2000) < 0.02, rng.uniform(1, 3, 2000), 0.0)
+        self.calcium = _ar1(self.spikes, self.g)
+        self.noisy = self.calcium + rng.normal(0, 0.1, self.calcium.size)
+
+    def test_noise_free_recovery(self):
+        """A noise-free AR(1) trace is reproduced exactly, spikes included."""
+        c, s = oasis_ar1(self.calcium, self.g)
+        np.testing.assert_allclose(c, self.calcium, atol=1e-9)
+        np.testing.assert_allclose(s, self.spikes, atol=1e-9)
+
+    def test_constraints(self):
+        """On noisy data spikes stay non-negative and follow the AR(1) model of c."""
+        c, s = oasis_ar1(self.noisy, self.g, lam=0.1)
+        self.assertTrue(np.all(s >= 0))
+        np.testing.assert_allclose(s[1:], np.where(s[1:] > 0, c[1:] - self.g * c[:-1], 0.0), atol=1e-9)
+
+    def test_estimate_ar1(self):
+        """The decay is recovered from a noisy trace."""
+        self.assertAlmostEqual(estimate_ar1(self.noisy), self.g, delta=0.03)
+
+    def test_deconvolve_parallel(self):
+        """Every cell is deconvolved, with the same result in-process and in a pool."""
+        signals = pd.DataFrame({"time": np.arange(2000) * 0.1, "C00": self.noisy, "C01": self.noisy[::-1] + 1})
+        serial = deconvolve(signals, n_jobs=1)
+        pooled = deconvolve(signals, n_jobs=2)
+        self.assertEqual(list(serial.spikes.columns), ["C00", "C01"])
+        pd.testing.assert_frame_equal(serial.spikes, pooled.spikes)
+        self.assertAlmostEqual(serial.g["C00"], self.g, delta=0.03)
+
+    def test_effective_n_jobs(self):
+        """joblib semantics, and map_cells keeps row order."""
+        self.assertEqual(effective_n_jobs(None), 1)
+        self.assertEqual(effective_n_jobs(3), 3)
+        self.assertGreaterEqual(effective_n_jobs(-1), 1)
+        self.assertEqual(map_cells(np.sum, np.arange(6).reshape(3, 2), n_jobs=1), [1, 5, 9])
@@ -0,0 +1,54 @@
+"""Test sliding-window baselines and DF/F."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from canalysis.analysis.dff import get_baseline, get_dff, running_percentile
+
+
+def _brute_percentile(x: np.ndarray, window: int, q: float) -> np.ndarray:
+    half = window // 2
+    out = np.empty(x.size)
+    for t in range(x.size):
+        values = np.sort(x[max(t - half, 0) : t + half + 1])
+        out[t] = values[int(q / 100 * (values.size - 1))]
+    return out
+
+
+class TestDff(unittest.TestCase):
+    """Test running_percentile, get_baseline and get_dff."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.trace = rng.normal(10, 1, 500)
+        # Ties exercise the lazy deletion of equal values.
+        self.trace[100:140] = 10.0
+
+    def test_running_percentile_exact(self):
+        """The two-heap percentile equals sorting every (edge-truncated) window."""
+        for window, q in [(31, 8), (30, 50), (7, 0), (7, 100), (1000, 20)]:
+            np.testing.assert_array_equal(
+                running_percentile(self.trace, window, q), _brute_percentile(self.trace, window, q)
+            )
+
+    def test_methods_agree(self):
+        """The approximate baseline tracks the exact one on a slowly varying trace."""
+        signals = np.column_stack([self.trace + np.linspace(0, 5, 500), self.trace])
+        exact = get_baseline(signals, 51, 20, n_jobs=1)
+        approx = get_baseline(signals, 51, 20, method="approx", step=5)
+        self.assertEqual(exact.shape, (500, 2))
+        self.assertLess(np.abs(exact - approx)[30:-30].mean(), 0.2)
+        self.assertTrue(np.all(get_baseline(signals, 51, method="minimum") <= signals.max(axis=0)))
+        with self.assertRaises(ValueError):
+            get_baseline(signals, 51, method="median")
+
+    def test_get_dff(self):
+        """DF/F is (F - F0) / F0 per cell, keeping index and columns, in the requested dtype."""
+        signals = pd.DataFrame({"time": np.arange(500) * 0.1, "C00": self.trace})
+        dff = get_dff(signals, fs=10, window=3.1, percentile=8, dtype=np.float32, n_jobs=1)
+        f0 = _brute_percentile(self.trace.astype(np.float32).astype(float), 31, 8)
+        self.assertEqual(list(dff.columns), ["C00"])
+        self.assertEqual(dff["C00"].dtype, np.float32)
+        np.testing.assert_allclose(dff["C00"], (self.trace - f0) / f0, rtol=1e-4, atol=1e-6)
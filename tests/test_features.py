@@ -0,0 +1,49 @@
+"""Test per-trial feature extraction."""
+
+import unittest
+
+import numpy as np
+from sklearn.base import clone
+
+from neuralnetwork.nn_utils.features import TrialFeatures
+
+
+class TestTrialFeatures(unittest.TestCase):
+    """Test TrialFeatures on a tensor with a known response."""
+
+    def setUp(self):
+        self.lags = np.round(np.arange(-1.0, 4.0, 0.5), 6)
+        self.tensor = np.ones((3, self.lags.size, 2), dtype=np.float32)
+        # Cell 1 of every trial peaks at 1.5 s.
+        self.tensor[:, self.lags == 1.5, 1] = 5.0
+
+    def test_features(self):
+        """Window means, peak, latency and area per cell, named in column order."""
+        features = TrialFeatures(self.lags, windows=((0, 1), (1, 2)), baseline=(-1, 0)).fit(self.tensor)
+        out = features.transform(self.tensor)
+        names = list(features.get_feature_names_out())
+        self.assertEqual(out.shape, (3, len(names)))
+        self.assertEqual(out.dtype, np.float32)
+        row = dict(zip(names, out[0]))
+        self.assertEqual(row["mean[1,2)_C1"], 2.0)
+        self.assertEqual(row["mean[0,1)_C0"], 0.0)
+        self.assertEqual(row["peak_C1"], 4.0)
+        self.assertEqual(row["latency_C1"], 1.5)
+        self.assertAlmostEqual(row["auc_C1"], 2.0)
+
+    def test_pca_and_clone(self):
+        """PCA scores are appended, and the transformer clones for fitting inside a split."""
+        rng = np.random.default_rng(0)
+        tensor = rng.normal(0, 1, (20, self.lags.size, 2))
+        features = clone(TrialFeatures(self.lags, features=("peak",), n_components=2)).fit(tensor[:10])
+        self.assertEqual(features.transform(tensor[10:]).shape, (10, 2 + 2))
+        self.assertEqual(list(features.get_feature_names_out(["x", "y"])), ["peak_x", "peak_y", "pc0", "pc1"])
+
+    def test_errors(self):
+        """Bad shapes, empty windows and unknown features are rejected."""
+        with self.assertRaises(ValueError):
+            TrialFeatures(self.lags).fit(self.tensor[0])
+        with self.assertRaises(ValueError):
+            TrialFeatures(self.lags, windows=((10, 11),)).fit_transform(self.tensor)
+        with self.assertRaises(ValueError):
+            TrialFeatures(self.lags, features=("median",)).fit_transform(self.tensor)
@@ -0,0 +1,80 @@
+"""Test incremental figure output."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from canalysis.graphs.graph_utils.figure_cache import FigureCache, content_key
+from canalysis.graphs.graph_utils.save_queue import SaveQueue
+
+
+_calls = []
+
+
+def _draw(y, color="k"):
+    _calls.append(y)
+    fig, ax = plt.subplots(figsize=(2, 2), dpi=30)
+    ax.plot(y, color=color)
+    return fig
+
+
+class TestContentKey(unittest.TestCase):
+    """Test content_key hashing."""
+
+    def test_by_value(self):
+        """Nested arrays and frames hash by value; any change gives a new key."""
+        frame = pd.DataFrame({"a": [1.0, 2.0]})
+        key = content_key(_draw, {"trials": [np.arange(3), frame]}, color="k")
+        self.assertEqual(key, content_key(_draw, {"trials": [np.arange(3), frame.copy()]}, color="k"))
+        self.assertNotEqual(key, content_key(_draw, {"trials": [np.arange(4), frame]}, color="k"))
+        self.assertNotEqual(key, content_key(_draw, {"trials": [np.arange(3), frame * 2]}, color="k"))
+        self.assertNotEqual(key, content_key(_draw, {"trials": [np.arange(3), frame]}, color="r"))
+
+
+class TestFigureCache(unittest.TestCase):
+    """Test FigureCache hits, in-place replacement and cleanup."""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.out = Path(self.folder.name)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_hit_and_replace(self):
+        """Unchanged inputs skip drawing, changed inputs overwrite the same file."""
+        cache = FigureCache(self.out)
+        path = cache.render("a", _draw, np.arange(3))
+        n_calls = len(_calls)
+        self.assertEqual(FigureCache(self.out).render("a", _draw, np.arange(3)), path)
+        self.assertEqual(len(_calls), n_calls)
+        cache = FigureCache(self.out)
+        self.assertEqual(cache.render("a", _draw, np.arange(4)), path)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(sorted(p.name for p in self.out.glob("*.png")), ["a.png"])
+
+    def test_queue_replaces_in_place(self):
+        """A unique SaveQueue still writes the indexed name, so the next lookup is a true hit."""
+        for y in (np.arange(3), np.arange(4)):
+            with SaveQueue() as queue:
+                FigureCache(self.out).render("a", _draw, y, queue=queue)
+        self.assertEqual(sorted(p.name for p in self.out.glob("*.png")), ["a.png"])
+        cache = FigureCache(self.out)
+        self.assertIsNone(cache.lookup("a", content_key(_draw, np.arange(3), savefig={})))
+        self.assertIsNotNone(cache.lookup("a", content_key(_draw, np.arange(4), savefig={})))
+
+    def test_clean(self):
+        """Figures not produced by the current run are removed, other files are kept."""
+        cache = FigureCache(self.out)
+        cache.render("a", _draw, np.arange(3))
+        cache.render("b", _draw, np.arange(3))
+        (self.out / "notes.png").write_bytes(b"")
+        cache = FigureCache(self.out)
+        cache.render("a", _draw, np.arange(3))
+        self.assertEqual([p.name for p in cache.clean(dry_run=True)], ["b.png"])
+        cache.clean()
+        self.assertEqual(sorted(p.name for p in self.out.glob("*.png")), ["a.png", "notes.png"])
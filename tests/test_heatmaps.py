@@ -0,0 +1,50 @@
+"""Test the raster and seaborn heatmap paths."""
+
+import unittest
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.collections import QuadMesh
+from matplotlib.image import AxesImage
+
+from canalysis.graphs.heatmaps import TASTE_TICKS, EatingHeatmap
+
+
+class TestEatingHeatmap(unittest.TestCase):
+    """Test EatingHeatmap.default_heatmap."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame(rng.random((4, 90)), index=[f"C{i}" for i in range(4)])
+        # Premasked eating heatmaps pad with NaN.
+        self.data.iloc[1, -10:] = np.nan
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_raster_matches_seaborn_layout(self):
+        """Both paths label the same rows and place markers at the same columns."""
+        original = self.data.copy()
+        raster = EatingHeatmap(self.data, save_dir=None)
+        raster.default_heatmap(1.0, 0.5, 3.0)
+        seaborn = EatingHeatmap(self.data, save_dir=None)
+        seaborn.default_heatmap(1.0, 0.5, 3.0, method="seaborn")
+        pd.testing.assert_frame_equal(self.data, original)
+
+        self.assertEqual(len([a for a in raster.ax.get_children() if isinstance(a, AxesImage)]), 1)
+        self.assertEqual(len([a for a in seaborn.ax.get_children() if isinstance(a, QuadMesh)]), 1)
+        for heatmap in (raster, seaborn):
+            self.assertEqual([t.get_text() for t in heatmap.ax.get_yticklabels()], ["C0", "C1", "C2", "C3"])
+            lines = [line.get_xdata()[0] for line in heatmap.ax.get_lines() if line.get_visible()]
+            self.assertEqual(lines, [5.0, 20.0])
+        self.assertEqual(raster.ax.get_xlim(), seaborn.ax.get_xlim())
+        self.assertEqual(raster.ax.get_ylim(), seaborn.ax.get_ylim())
+
+    def test_taste_and_errors(self):
+        """Taste maps use the fixed ticks; unknown methods are rejected."""
+        heatmap = EatingHeatmap(self.data, save_dir=None)
+        heatmap.default_heatmap(maptype="taste")
+        np.testing.assert_array_equal(heatmap.ax.get_xticks(), TASTE_TICKS[0])
+        with self.assertRaises(ValueError):
+            EatingHeatmap(self.data, save_dir=None).default_heatmap(method="pcolor")
@@ -0,0 +1,60 @@
+"""Test nested cross-validation."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from sklearn.datasets import make_classification
+
+from neuralnetwork.SVM import SupportVectorMachine
+from neuralnetwork.nn_utils.features import TrialFeatures
+from neuralnetwork.nn_utils.nested import NestedCV
+
+GRID = {"C": [0.1, 1], "kernel": ["linear"]}
+
+
+class TestNestedCV(unittest.TestCase):
+    """Test NestedCV scores, checkpoints, features and groups."""
+
+    def test_checkpoint_resume(self):
+        """Finished outer folds are written once and reloaded on a rerun."""
+        X, y = make_classification(100, 6, n_informative=4, random_state=0)
+        with tempfile.TemporaryDirectory() as folder:
+            first = NestedCV(GRID, checkpoint_dir=folder, n_jobs=1).fit(X, y)
+            stamps = {p: p.stat().st_mtime_ns for p in Path(folder).glob("outer_*.json")}
+            second = NestedCV(GRID, checkpoint_dir=folder, n_jobs=1).fit(X, y)
+            self.assertEqual(len(stamps), 5)
+            self.assertEqual(stamps, {p: p.stat().st_mtime_ns for p in Path(folder).glob("outer_*.json")})
+            self.assertEqual(first.score_, second.score_)
+            self.assertGreater(first.score_, 0.7)
+            self.assertEqual(first.summary()["n_folds"], 5)
+
+    def test_trial_features(self):
+        """A trials x frames x cells tensor is reduced per outer fold by ``features``."""
+        rng = np.random.default_rng(0)
+        lags = np.round(np.arange(-1.0, 2.0, 0.25), 6)
+        y = np.repeat([0, 1], 20)
+        tensor = rng.normal(0, 1, (40, lags.size, 3))
+        tensor[np.ix_(y == 1, lags >= 0, [0])] += 2.0
+        nested = NestedCV(GRID, features=TrialFeatures(lags, windows=((0, 1),)), n_jobs=1).fit(tensor, y)
+        self.assertGreater(nested.score_, 0.8)
+
+        # A trial-level model passes its own features to the nested CV and the null.
+        model = SupportVectorMachine(tensor, y, "train", features=TrialFeatures(lags, windows=((0, 1),)))
+        self.assertGreater(model.nested_cv(param_grid=GRID, n_jobs=1).score_, 0.8)
+        null = model.null_distribution(n_permutations=5, n_jobs=1, random_state=0)
+        self.assertGreater(null.accuracy, 0.8)
+
+    def test_groups(self):
+        """With groups, no group is split across train and test, so label-free trials stay at chance."""
+        rng = np.random.default_rng(0)
+        groups = np.repeat(np.arange(30), 8)
+        # Each trial has its own offset and a random label, shared by all of its frames.
+        y = np.repeat(rng.integers(0, 2, 30), 8)
+        X = np.repeat(rng.normal(0, 3, (30, 4)), 8, axis=0) + rng.normal(0, 0.1, (240, 4))
+        grid = {"C": [1], "kernel": ["rbf"], "gamma": [1.0]}
+        grouped = NestedCV(grid, n_jobs=1).fit(X, y, groups)
+        leaky = NestedCV(grid, n_jobs=1).fit(X, y)
+        self.assertLess(grouped.score_, 0.75)
+        self.assertGreater(leaky.score_, 0.9)
@@ -0,0 +1,55 @@
+"""Test shuffled-label null distributions and the per-fold scaler."""
+
+import unittest
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from neuralnetwork.nn_utils.folds import FoldScaler
+from neuralnetwork.nn_utils.permutation import null_distribution, shuffle_labels
+
+
+class TestFoldScaler(unittest.TestCase):
+    """Test FoldScaler against a StandardScaler fit per fold."""
+
+    def test_matches_standard_scaler(self):
+        """Rows are scaled with their fold's training statistics, per bin for 3-d input."""
+        rng = np.random.default_rng(0)
+        X = rng.normal(3, 2, (40, 5, 3)).astype(np.float32)
+        y = np.repeat([0, 1], 20)
+        splits = list(StratifiedKFold(4).split(X[:, 0], y))
+        scaler = FoldScaler(X, splits)
+        for fi, (train, test) in enumerate(splits):
+            reference = StandardScaler().fit(X[train, 2])
+            np.testing.assert_allclose(scaler.transform(X, fi, test, 2), reference.transform(X[test, 2]), rtol=1e-4)
+            self.assertEqual(scaler.transform(X, fi, test).shape, (test.size, 5, 3))
+
+
+class TestPermutation(unittest.TestCase):
+    """Test null_distribution on separable and unrelated labels."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.groups = np.repeat(np.arange(40), 5)
+        self.y = np.repeat(np.tile(["a", "b"], 20), 5)
+        self.X = rng.normal(0, 1, (200, 6))
+        self.X[self.y == "b", 0] += 2.0
+
+    def test_shuffle_labels_by_group(self):
+        """Every group keeps a single label and label counts are unchanged."""
+        index = np.arange(100)
+        shuffled = shuffle_labels(self.y, self.groups, index, np.random.default_rng(1))
+        self.assertTrue(all(len(set(shuffled[g * 5 : g * 5 + 5])) == 1 for g in range(20)))
+        self.assertEqual(sorted(shuffled), sorted(self.y[index]))
+
+    def test_null(self):
+        """Separable labels beat the null; results don't depend on n_jobs."""
+        kwargs = dict(groups=self.groups, n_permutations=20, solver="linear_svc", random_state=0)
+        serial = null_distribution(self.X, self.y, n_jobs=1, **kwargs)
+        pooled = null_distribution(self.X, self.y, n_jobs=2, **kwargs)
+        self.assertGreater(serial.accuracy, 0.8)
+        self.assertLess(abs(serial.chance - 0.5), 0.1)
+        self.assertAlmostEqual(serial.p_accuracy, 1 / 21)
+        np.testing.assert_array_equal(serial.null_accuracy, pooled.null_accuracy)
+        self.assertEqual(list(serial.to_frame().index), ["accuracy", "f1_a", "f1_b"])
@@ -0,0 +1,56 @@
+"""Test the single-axes stacked trace plot."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection, PolyCollection
+
+from canalysis.graphs.graph_utils.Mixins import CalPlots
+from canalysis.graphs.graph_utils.save_queue import SaveQueue
+
+
+class _Session(CalPlots):
+    def __init__(self, n_cells: int):
+        rng = np.random.default_rng(0)
+        time = np.arange(5000) * 0.1
+        signals = pd.DataFrame(rng.normal(0, 1, (5000, n_cells)), columns=[f"C{i:02}" for i in range(n_cells)])
+        self.tracedata = SimpleNamespace(time=time, signals=signals)
+        self.eventdata = SimpleNamespace(timestamps={"Lick": np.arange(10, 400, 7.0), "Rinse": np.array([50.0])})
+        self.color_dict = {"Lick": "darkgray", "Rinse": "lightsteelblue"}
+        self.doevents = True
+
+
+class TestPlotStacked(unittest.TestCase):
+    """Test plot_stacked's artists and saving."""
+
+    def test_one_collection_per_kind(self):
+        """Traces are one decimated LineCollection, shading one collection per event type."""
+        fig = _Session(100).plot_stacked(window=(0, 200), max_labels=20)
+        try:
+            ax = fig.axes[0]
+            lines = [c for c in ax.collections if isinstance(c, LineCollection)]
+            shading = [c for c in ax.collections if isinstance(c, PolyCollection)]
+            self.assertEqual(len(fig.axes), 1)
+            self.assertEqual(len(lines), 1)
+            self.assertEqual(len(lines[0].get_segments()), 100)
+            # 2000 samples in the window, decimated to two points per pixel column of the axes.
+            self.assertLess(len(lines[0].get_segments()[0]), 1600)
+            self.assertEqual(len(shading), 1)
+            self.assertEqual(len(ax.get_yticks()), 20)
+            self.assertEqual(ax.get_yticklabels()[0].get_text(), "C00")
+        finally:
+            plt.close(fig)
+
+    def test_save_through_queue(self):
+        """savename writes the figure, through a SaveQueue when given."""
+        with tempfile.TemporaryDirectory() as folder, SaveQueue() as queue:
+            path = Path(folder) / "stacked.png"
+            fig = _Session(5).plot_stacked(savename=str(path), dpi=50, queue=queue)
+            plt.close(fig)
+            queue.flush()
+            self.assertGreater(path.stat().st_size, 0)
@@ -0,0 +1,49 @@
+"""Test the min/max trace pyramid."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from canalysis.analysis.pyramid import TracePyramid, build_pyramid, level_sizes
+
+
+class TestPyramid(unittest.TestCase):
+    """Test build_pyramid and TracePyramid.query against brute force."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.time = np.arange(1001) * 0.1
+        self.signals = pd.DataFrame(rng.normal(0, 1, (1001, 3)), columns=["C0", "C1", "C2"])
+        self.signals.iloc[10:14, 1] = np.nan
+
+    def test_levels(self):
+        """Level k holds the min and max of each run of 2 ** k samples, ignoring NaN."""
+        levels = build_pyramid(self.signals)
+        sizes = level_sizes(1001)
+        self.assertEqual(sizes[:3], [501, 251, 126])
+        self.assertEqual(sizes[-1], 1)
+        self.assertEqual(levels.shape, (sum(sizes), 2, 3))
+        data = self.signals.to_numpy(dtype=np.float32)
+        offset = sizes[0] + sizes[1]
+        for b in (0, 2, 125):
+            block = data[b * 8 : b * 8 + 8]
+            np.testing.assert_array_equal(levels[offset + b, 0], np.nanmin(block, axis=0))
+            np.testing.assert_array_equal(levels[offset + b, 1], np.nanmax(block, axis=0))
+        np.testing.assert_array_equal(levels[-1, 1], np.nanmax(data, axis=0))
+
+    def test_query(self):
+        """Queries read one to two bins per pixel, or raw samples when zoomed in."""
+        pyramid = TracePyramid(build_pyramid(self.signals), self.time, self.signals)
+        x, y = pyramid.query(100)
+        self.assertEqual(y.shape[0], 3)
+        self.assertTrue(200 <= y.shape[1] <= 400)
+        np.testing.assert_allclose(y.max(axis=1), np.nanmax(self.signals.to_numpy(np.float32), axis=0))
+        self.assertTrue(np.all(np.diff(x[0]) >= 0))
+
+        x, y = pyramid.query(100, window=(20.0, 30.0), cells=["C2", "C0"])
+        np.testing.assert_array_equal(y, self.signals[["C2", "C0"]].to_numpy()[199:302].T)
+        with self.assertRaises(KeyError):
+            pyramid.query(100, cells=["C9"])
+        with self.assertRaises(ValueError):
+            TracePyramid(build_pyramid(self.signals[:-1]), self.time, self.signals)
@@ -0,0 +1,51 @@
+"""Test the on-disk model registry."""
+
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.svm import LinearSVC
+
+from neuralnetwork.nn_utils.registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    """Test ModelRegistry storage, lookup and reuse."""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.X, self.y = make_classification(80, 5, random_state=0)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_put_get_find(self):
+        """Entries persist across instances and removals are replayed from the index."""
+        registry = ModelRegistry(self.folder.name)
+        key = registry.put(np.arange(5.0), "scores", session="Animal02-120221", params={"fold": 1})
+        other = registry.put(np.ones(3), "scores", session="Animal02-120221", params={"fold": 2})
+        reopened = ModelRegistry(self.folder.name)
+        self.assertEqual(len(reopened), 2)
+        self.assertIsInstance(reopened.get(key), np.memmap)
+        np.testing.assert_array_equal(reopened.lookup("scores", "Animal02-120221", {"fold": 1}), np.arange(5.0))
+        self.assertIsNone(reopened.lookup("scores", "Animal02-120221", {"fold": 3}))
+        self.assertEqual(len(reopened.find(kind="scores", session="Animal02-120221")), 2)
+        reopened.remove(other)
+        self.assertNotIn(other, ModelRegistry(self.folder.name))
+
+    def test_fit_or_load(self):
+        """A fitted estimator is reused for the same params and data, and refit otherwise."""
+        registry = ModelRegistry(self.folder.name)
+        first = registry.fit_or_load(LinearSVC(C=1.0), self.X, self.y, session="s")
+        with mock.patch.object(LinearSVC, "fit") as fit:
+            again = registry.fit_or_load(LinearSVC(C=1.0), self.X, self.y, session="s")
+            fit.assert_not_called()
+        np.testing.assert_array_equal(first.coef_, again.coef_)
+        loaded, key = registry.fit_or_load(LinearSVC(C=1.0), self.X, self.y, session="s", return_key=True)
+        self.assertEqual(registry.find(session="s")[0]["key"], key)
+        np.testing.assert_array_equal(registry.get(key).coef_, loaded.coef_)
+        registry.fit_or_load(LinearSVC(C=0.5), self.X, self.y, session="s")
+        registry.fit_or_load(LinearSVC(C=1.0), self.X[:-1], self.y[:-1], session="s")
+        self.assertEqual(len(registry), 3)
@@ -0,0 +1,83 @@
+"""Test background figure saving."""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+
+from canalysis.graphs.graph_utils.save_queue import SaveQueue, render_rgba
+from canalysis.graphs.graph_utils.templates import TraceTemplate
+from canalysis.helpers.funcs import reserve_unique_path
+
+
+class TestSaveQueue(unittest.TestCase):
+    """Test that SaveQueue writes what savefig would."""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.out = Path(self.folder.name)
+        # Long names push the horizontal y labels past the left edge of the figure.
+        self.template = TraceTemplate([f"Animal02_cell_{i:02}" for i in range(5)])
+        rng = np.random.default_rng(0)
+        self.fig = self.template.update(np.linspace(0, 5, 50), rng.random((50, 5)), {})
+
+    def tearDown(self):
+        plt.close("all")
+        self.folder.cleanup()
+
+    def test_tight_bbox_matches_savefig(self):
+        """A tight crop grows past the figure like savefig, to the same pixels."""
+        savefig = {"bbox_inches": "tight", "dpi": 100, "facecolor": "white"}
+        self.fig.savefig(self.out / "reference.png", **savefig)
+        canvas = self.fig.canvas
+        with SaveQueue() as queue:
+            queue.submit(self.fig, self.out / "queued.png", **savefig)
+        reference = np.asarray(Image.open(self.out / "reference.png"))
+        queued = np.asarray(Image.open(self.out / "queued.png"))
+        self.assertLess(self.fig.get_tightbbox().x0, 0)
+        np.testing.assert_array_equal(queued, reference)
+        self.assertIs(self.fig.canvas, canvas)
+
+    def test_render_restores_figure(self):
+        """transparent and facecolor apply to the render only."""
+        color = self.fig.patch.get_facecolor()
+        rgba = render_rgba(self.fig, dpi=50, transparent=True)
+        self.assertEqual(rgba[0, 0, 3], 0)
+        self.assertEqual(self.fig.patch.get_facecolor(), color)
+        self.assertEqual(rgba.shape[:2], (round(self.fig.get_figheight() * 50), round(self.fig.get_figwidth() * 50)))
+
+    def test_pdf_stays_vector(self):
+        """PDFs are written by matplotlib's PDF backend, not as an embedded raster."""
+        with SaveQueue() as queue:
+            queue.submit(self.fig, self.out / "trace.pdf", bbox_inches="tight")
+        content = (self.out / "trace.pdf").read_bytes()
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertNotIn(b"/Subtype /Image", content)
+        with self.assertRaises(ValueError):
+            SaveQueue().submit(self.fig, self.out / "trace.svg")
+
+    def test_unique(self):
+        """Taken names get a number unless uniqueness is turned off for the call."""
+        (self.out / "trace.png").write_bytes(b"")
+        with SaveQueue() as queue:
+            numbered = queue.submit(self.fig, self.out / "trace.png", dpi=20)
+            replaced = queue.submit(self.fig, self.out / "trace.png", dpi=20, unique=False)
+        self.assertEqual(Path(numbered).name, "trace1.png")
+        self.assertEqual(Path(replaced).name, "trace.png")
+        self.assertGreater((self.out / "trace.png").stat().st_size, 0)
+
+    def test_reserve_unique_path_race(self):
+        """Concurrent reservations of one name never collide."""
+        paths = []
+        threads = [
+            threading.Thread(target=lambda: paths.append(reserve_unique_path(self.out / "race.png"))) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(paths)), 8)
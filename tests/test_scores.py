@@ -0,0 +1,62 @@
+"""Test scoring and the confusion-matrix store."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import precision_recall_fscore_support
+
+from neuralnetwork.SVM import SupportVectorMachine
+from neuralnetwork.nn_utils import scores
+from neuralnetwork.nn_utils.scores import ScoreStore, Scoring
+
+
+class TestScoreStore(unittest.TestCase):
+    """Test ScoreStore against metrics on the pooled predictions."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.folds = []
+        for fold, classes in enumerate([["a", "b", "c"], ["a", "b", "c"], ["a", "b"]]):
+            true = rng.choice(classes, 50)
+            pred = np.where(rng.random(50) < 0.7, true, rng.choice(classes, 50))
+            self.folds.append((fold, true, pred))
+        self.store = ScoreStore()
+        for fold, true, pred in self.folds:
+            self.store.add(Scoring(pred, true, "test", mat=fold == 0), animal="Animal02", fold=fold)
+
+    def test_pooled_report(self):
+        """Summed matrices give the same per-class metrics as the pooled predictions."""
+        true = np.concatenate([t for _, t, _ in self.folds])
+        pred = np.concatenate([p for _, _, p in self.folds])
+        report = self.store.report(animal="Animal02")
+        precision, recall, f1, support = precision_recall_fscore_support(true, pred, labels=["a", "b", "c"])
+        np.testing.assert_allclose(report["precision"], precision)
+        np.testing.assert_allclose(report["recall"], recall)
+        np.testing.assert_allclose(report["f1-score"], f1)
+        np.testing.assert_array_equal(report["support"], support)
+
+    def test_select_and_frame(self):
+        """Entries are selected by key, and to_frame has one row per entry."""
+        self.assertEqual(list(self.store.confusion(fold=2).index), ["a", "b"])
+        self.assertEqual(self.store.confusion(fold=5).size, 0)
+        frame = self.store.to_frame()
+        self.assertEqual(len(frame), 3)
+        _, true, pred = self.folds[1]
+        self.assertAlmostEqual(frame.loc[1, "accuracy"], np.mean(true == pred))
+
+    def test_save_load(self):
+        """The store round-trips through joblib."""
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder) / "scores.joblib"
+            scores.save(path, self.store)
+            loaded = scores.load(path, mmap_mode="r")
+            self.assertEqual(len(loaded), 3)
+            np.testing.assert_array_equal(loaded.confusion(), self.store.confusion())
+
+    def test_reserved_stage(self):
+        """predict_clf and evaluate_clf reject a key that would clash with the stage they set."""
+        for method in (SupportVectorMachine.predict_clf, SupportVectorMachine.evaluate_clf):
+            with self.assertRaisesRegex(ValueError, "stage"):
+                method(object(), store=self.store, stage="test", animal="Animal02")
@@ -0,0 +1,72 @@
+"""Test the precomputed-kernel SVC search."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.svm import SVC
+
+from neuralnetwork.nn_utils.search import KernelSearch, kernel_matrix
+
+GRID = {"C": [0.1, 1, 10], "kernel": ["linear", "rbf"], "gamma": ["scale", 0.05]}
+
+
+class TestKernelSearch(unittest.TestCase):
+    """Test KernelSearch scores, checkpointing and defaults."""
+
+    def setUp(self):
+        self.X, self.y = make_classification(120, 8, n_informative=4, random_state=0)
+
+    def test_matches_sklearn(self):
+        """Fold scores equal GridSearchCV on the same precomputed kernels."""
+        cv = StratifiedKFold(4, shuffle=True, random_state=0)
+        search = KernelSearch({"C": [0.1, 1, 10], "kernel": ["rbf"], "gamma": [0.05]}, cv=cv, verbose=False)
+        search.fit(self.X, self.y)
+        reference = GridSearchCV(SVC(gamma=0.05), {"C": [0.1, 1, 10]}, cv=cv).fit(self.X, self.y)
+        np.testing.assert_allclose(
+            search.cv_results_["mean_test_score"], reference.cv_results_["mean_test_score"], atol=1e-12
+        )
+        self.assertEqual(search.best_params_["C"], reference.best_params_["C"])
+        gram = search.gram(self.X, search.best_params_)
+        np.testing.assert_allclose(gram, kernel_matrix(self.X, search.best_params_))
+
+    def test_scale_gamma_per_fold(self):
+        """A "scale" gamma is resolved on each fold's training rows, as SVC(gamma="scale") does."""
+        cv = StratifiedKFold(4, shuffle=True, random_state=0)
+        X = self.X * np.linspace(1, 5, self.X.shape[1])
+        for kernel in ("rbf", "poly"):
+            search = KernelSearch({"C": [0.1, 10], "kernel": [kernel], "gamma": ["scale"]}, cv=cv, verbose=False)
+            search.fit(X, self.y)
+            reference = GridSearchCV(SVC(kernel=kernel), {"C": [0.1, 10]}, cv=cv).fit(X, self.y)
+            np.testing.assert_allclose(
+                search.cv_results_["mean_test_score"], reference.cv_results_["mean_test_score"], atol=1e-12
+            )
+        np.testing.assert_allclose(search.gram(X, search.best_params_), kernel_matrix(X, search.best_params_))
+
+    def test_linear_candidates_collapse(self):
+        """Linear candidates differing only in gamma are evaluated once."""
+        search = KernelSearch(GRID, cv=StratifiedKFold(3), verbose=False).fit(self.X, self.y)
+        self.assertEqual(len(search.cv_results_), 3 + 6)
+
+    def test_checkpoint_resume(self):
+        """A rerun with the default CV loads every fold score instead of refitting."""
+        with tempfile.TemporaryDirectory() as folder:
+            checkpoint = Path(folder) / "search.jsonl"
+            first = KernelSearch(GRID, checkpoint=checkpoint, verbose=False).fit(self.X, self.y)
+            n_lines = len(checkpoint.read_text().splitlines())
+            second = KernelSearch(GRID, checkpoint=checkpoint, verbose=False).fit(self.X, self.y)
+            self.assertEqual(len(checkpoint.read_text().splitlines()), n_lines)
+            self.assertEqual(n_lines, 9 * 50)
+            self.assertEqual(first.best_params_, second.best_params_)
+            self.assertEqual(len({json.loads(line)["run"] for line in checkpoint.open()}), 1)
+
+    def test_halving(self):
+        """Halving ranks only candidates that reached every fold."""
+        search = KernelSearch(GRID, cv=StratifiedKFold(9), search="halving", verbose=False).fit(self.X, self.y)
+        full = search.cv_results_["n_folds"] == 9
+        self.assertLess(full.sum(), len(search.cv_results_))
+        self.assertTrue(full[search.cv_results_["rank_test_score"].idxmin()])
@@ -0,0 +1,48 @@
+"""Test the classifier engines."""
+
+import unittest
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.linear_model import SGDClassifier
+from sklearn.svm import SVC, LinearSVC
+from sklearn.utils.class_weight import compute_class_weight
+
+from neuralnetwork.nn_utils.solvers import SOLVERS, fit_in_batches, get_solver
+
+
+class TestSolvers(unittest.TestCase):
+    """Test get_solver and fit_in_batches."""
+
+    def test_auto(self):
+        """The "auto" solver is chosen from the sample count, which it requires."""
+        self.assertIsInstance(get_solver("auto", n_samples=100), SVC)
+        self.assertIsInstance(get_solver("auto", n_samples=50_000), LinearSVC)
+        self.assertIsInstance(get_solver("auto", n_samples=1_000_000), SGDClassifier)
+        with self.assertRaises(ValueError):
+            get_solver("auto")
+        with self.assertRaises(ValueError):
+            get_solver("forest")
+
+    def test_balanced_by_default(self):
+        """Every engine balances class weights unless told otherwise."""
+        for name in SOLVERS:
+            self.assertEqual(get_solver(name).get_params()["class_weight"], "balanced", name)
+        self.assertIsNone(get_solver("logistic", class_weight=None).get_params()["class_weight"])
+        self.assertEqual(get_solver("sgd_hinge", alpha=0.01).get_params()["loss"], "hinge")
+
+    def test_fit_in_batches(self):
+        """Balanced weights are computed over the full labels of each fit, and the model learns."""
+        model = get_solver("sgd_hinge", random_state=0)
+        reference = get_solver("sgd_hinge", random_state=0)
+        for weights in ([0.8, 0.2], [0.3, 0.7]):
+            X, y = make_classification(3000, 10, weights=weights, random_state=0)
+            fit_in_batches(model, X, y, batch_size=256, random_state=0)
+            self.assertEqual(model.get_params()["class_weight"], "balanced")
+            balanced = compute_class_weight("balanced", classes=np.array([0, 1]), y=y)
+            reference.set_params(class_weight=dict(zip([0, 1], balanced)))
+            fit_in_batches(reference, X, y, batch_size=256, random_state=0)
+            np.testing.assert_array_equal(model.coef_, reference.coef_)
+            self.assertGreater(model.score(X, y), 0.8)
+        with self.assertRaises(TypeError):
+            fit_in_batches(get_solver("svc"), X, y)
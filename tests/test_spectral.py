@@ -0,0 +1,57 @@
+"""Test the batched Welch power spectral density."""
+
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from scipy.signal import welch
+
+from canalysis.analysis.spectral import get_psd
+from canalysis.data.containers.trace_data import TraceData
+
+
+class TestSpectral(unittest.TestCase):
+    """Test get_psd and Spectrum against scipy."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.fs = 10.0
+        t = np.arange(3000) / self.fs
+        self.signals = pd.DataFrame(
+            {
+                "time": t,
+                "C00": np.sin(2 * np.pi * 1.0 * t) + rng.normal(0, 0.1, t.size),
+                "C01": rng.normal(0, 1, t.size),
+            }
+        )
+
+    def test_matches_welch(self):
+        """Each cell's spectrum equals scipy.signal.welch with the same segments."""
+        spectrum = get_psd(self.signals, self.fs, nperseg=256, chunk_size=3)
+        for i, cell in enumerate(["C00", "C01"]):
+            freqs, power = welch(self.signals[cell].to_numpy(), self.fs, nperseg=256)
+            np.testing.assert_allclose(spectrum.freqs, freqs)
+            np.testing.assert_allclose(spectrum.power[i], power, rtol=1e-4, atol=1e-9)
+        self.assertEqual(list(spectrum.cells), ["C00", "C01"])
+
+    def test_band_power(self):
+        """Power concentrates in the band holding the sine, and narrow bands are rejected."""
+        bands = {"sine": (0.8, 1.2), "other": (2.0, 4.0)}
+        power = get_psd(self.signals, self.fs, nperseg=256).band_power(bands)
+        self.assertEqual(list(power.columns), list(bands))
+        self.assertGreater(power.loc["C00", "sine"], 10 * power.loc["C00", "other"])
+        with self.assertRaises(ValueError):
+            get_psd(self.signals, self.fs, nperseg=256).band_power({"narrow": (1.0, 1.01)})
+
+
+class TestSamplingRate(unittest.TestCase):
+    """Test that TraceData reads its sampling rate from the recorded timestamps."""
+
+    def test_from_timestamps(self):
+        time = np.arange(400) * 0.05
+        rows = [[" Time(s)/Cell Status", " undecided", " undecided"]]
+        rows += [[t, np.sin(t), np.cos(t)] for t in time]
+        raw = pd.DataFrame(rows, columns=[" ", " C0", " C1"])
+        traces = TraceData(SimpleNamespace(get_tracedata=lambda: raw))
+        self.assertAlmostEqual(traces.sampling_rate, 20.0)
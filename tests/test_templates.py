@@ -0,0 +1,66 @@
+"""Test figure templates updated in place."""
+
+import io
+import unittest
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from canalysis.graphs.graph_utils.ax_helpers import span_verts
+from canalysis.graphs.graph_utils.templates import HeatmapTemplate, TraceTemplate
+
+
+def _png(fig) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=40)
+    return buffer.getvalue()
+
+
+class TestTraceTemplate(unittest.TestCase):
+    """Test that a reused TraceTemplate draws the same figure as a fresh one."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.time = np.linspace(0, 5, 50)
+        self.trials = [rng.normal(0, 1, (50, 3)) for _ in range(2)]
+        self.shading = [
+            {"Lick": (span_verts([1.0, 2.0], 0.2), "gray"), "NaCl": (span_verts([0.5], 0.2), "red")},
+            {"Lick": (span_verts([3.0], 0.2), "gray")},
+        ]
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_reuse_matches_fresh(self):
+        """After drawing one trial, the next renders exactly like a new template would."""
+        reused = TraceTemplate(["C0", "C1", "C2"])
+        reused.update(self.time, self.trials[0], self.shading[0])
+        fig = reused.update(self.time, self.trials[1], self.shading[1])
+        fresh = TraceTemplate(["C0", "C1", "C2"]).update(self.time, self.trials[1], self.shading[1])
+        self.assertEqual(_png(fig), _png(fresh))
+        # The unused second slot is emptied, not removed.
+        self.assertEqual(len(reused.shades), 2)
+        self.assertEqual(len(reused.shades[1][0].get_paths()), 0)
+
+
+class TestHeatmapTemplate(unittest.TestCase):
+    """Test HeatmapTemplate updates."""
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_update(self):
+        """Image data, row labels, markers and title are swapped per update; NaN stays masked."""
+        template = HeatmapTemplate((3, 20), n_lines=1)
+        data = pd.DataFrame(np.arange(60.0).reshape(3, 20), index=["C0", "C1", "C2"])
+        data.iloc[0, -2:] = np.nan
+        template.update(data, title="Trial 1", lines=(5,))
+        image = template.image.get_array()
+        self.assertTrue(image.mask[0, -1])
+        self.assertEqual(image[2, 0], 40.0)
+        self.assertEqual([t.get_text() for t in template.ax.get_yticklabels()], ["C0", "C1", "C2"])
+        self.assertEqual(template.title.get_text(), "Trial 1")
+        self.assertEqual(template.lines[0].get_xdata()[0], 5)
+        template.update(np.zeros((3, 20)), lines=())
+        self.assertFalse(template.lines[0].get_visible())
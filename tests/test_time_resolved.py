@@ -0,0 +1,50 @@
+"""Test the time-resolved decoder."""
+
+import unittest
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from neuralnetwork.time_resolved import TimeResolvedDecoder, bin_trials
+
+
+class TestTimeResolved(unittest.TestCase):
+    """Test bin_trials and TimeResolvedDecoder on trials that differ only after delivery."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.lags = np.round(np.arange(-2.0, 3.0, 0.1), 6)
+        self.labels = np.repeat(["a", "b"], 30)
+        self.tensor = rng.normal(0, 1, (60, self.lags.size, 4)).astype(np.float32)
+        self.tensor[30:, self.lags >= 0.5, 0] += 3.0
+
+    def test_bin_trials(self):
+        """Each bin is the mean of the frames inside its half-open window."""
+        binned, centers = bin_trials(self.tensor, self.lags, window=0.5, step=0.5)
+        np.testing.assert_allclose(centers[[0, -1]], [-1.75, 2.75])
+        mask = (self.lags >= -2.0) & (self.lags < -1.5)
+        np.testing.assert_allclose(binned[:, 0], self.tensor[:, mask].mean(axis=1), atol=1e-6)
+
+    def test_decodes_after_delivery(self):
+        """Accuracy is at chance before delivery and high once the classes separate."""
+        decoder = TimeResolvedDecoder(window=0.5, cv=StratifiedKFold(5, shuffle=True, random_state=0), n_jobs=1)
+        result = decoder.fit(self.tensor, self.labels, self.lags)
+        frame = result.to_frame()
+        self.assertEqual(result.scores.shape, (5, result.times.size, result.times.size))
+        self.assertAlmostEqual(result.chance, 0.5)
+        self.assertLess(frame.loc[frame.index < 0, "accuracy"].mean(), 0.75)
+        self.assertGreater(frame.loc[frame.index > 1, "accuracy"].min(), 0.9)
+        self.assertTrue(np.all(result.ci_low <= result.accuracy))
+
+    def test_generalization(self):
+        """With generalize, every train bin is scored at every test bin, in parallel or not."""
+        cv = StratifiedKFold(3, shuffle=True, random_state=0)
+        serial, pooled = (
+            TimeResolvedDecoder(window=1.0, cv=cv, generalize=True, n_jobs=n_jobs).fit(
+                self.tensor, self.labels, self.lags
+            )
+            for n_jobs in (1, 2)
+        )
+        self.assertFalse(np.isnan(serial.scores).any())
+        np.testing.assert_array_equal(serial.scores, pooled.scores)
+        self.assertEqual(serial.generalization.shape, (serial.times.size,) * 2)
@@ -0,0 +1,55 @@
+"""Test cross-session alignment and the transfer grid."""
+
+import unittest
+
+import numpy as np
+from scipy.stats import special_ortho_group
+from sklearn.svm import LinearSVC
+
+from neuralnetwork.transfer import TransferGrid, align, aligned_score
+
+
+class TestTransfer(unittest.TestCase):
+    """Test align and aligned_score on sessions related by a rotation."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.means = rng.normal(0, 3, (3, 6))
+        self.y_train = np.repeat([0, 1, 2], 40)
+        self.X_train = self.means[self.y_train] + rng.normal(0, 1, (120, 6))
+        self.rotation = special_ortho_group.rvs(6, random_state=0)
+        self.y_test = np.repeat([0, 1, 2], 30)
+        self.X_test = (self.means[self.y_test] + rng.normal(0, 1, (90, 6))) @ self.rotation.T
+        self.model = LinearSVC().fit(self.X_train, self.y_train)
+
+    def test_align_recovers_rotation(self):
+        """Procrustes on class means undoes the rotation between sessions."""
+        R = align(self.X_test, self.y_test, self.X_train, self.y_train)
+        self.assertGreater(self.model.score(self.X_test @ R, self.y_test), 0.9)
+        self.assertLess(self.model.score(self.X_test, self.y_test), 0.9)
+
+    def test_aligned_score(self):
+        """Cross-fit alignment transfers real labels; on noise it stays at chance, unlike a leaky fit."""
+        self.assertGreater(aligned_score(self.model, self.X_test, self.y_test, self.X_train, self.y_train), 0.9)
+        # Few trials in many dimensions: a rotation fit on the scored labels memorizes them.
+        rng = np.random.default_rng(1)
+        means = rng.normal(0, 3, (3, 20))
+        X_train = means[self.y_train] + rng.normal(0, 1, (120, 20))
+        model = LinearSVC().fit(X_train, self.y_train)
+        labels = np.repeat([0, 1, 2], 10)
+        leaky, crossfit = [], []
+        for seed in range(20):
+            noise = np.random.default_rng(seed + 2).normal(0, 1, (30, 20))
+            leaky.append(model.score(noise @ align(noise, labels, X_train, self.y_train), labels))
+            crossfit.append(aligned_score(model, noise, labels, X_train, self.y_train, random_state=seed))
+        self.assertGreater(np.mean(leaky), 0.55)
+        self.assertLess(np.mean(crossfit), 0.45)
+
+    def test_space(self):
+        """The cells space needs a registration map, and unknown spaces are rejected."""
+        self.assertEqual(TransferGrid().space, "pca")
+        with self.assertRaises(ValueError):
+            TransferGrid(space="cells")
+        with self.assertRaises(ValueError):
+            TransferGrid(space="frames")
+        TransferGrid(space="cells", cell_map={"120221": {"C00": 0}})
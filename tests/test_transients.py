@@ -0,0 +1,76 @@
+"""Test transient detection, event rates and the session cache."""
+
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from canalysis.analysis.transients import detect_transients, event_rates
+from canalysis.data.data_utils.session_cache import SessionCache
+
+
+class TestTransients(unittest.TestCase):
+    """Test detect_transients and event_rates on hand-built traces."""
+
+    def setUp(self):
+        self.signals = np.zeros((20, 2), dtype=np.float32)
+        # Cell 0: one transient reaching high, one run that never does.
+        self.signals[2:6, 0] = [1.0, 3.0, 4.0, 1.0]
+        self.signals[10:12, 0] = [1.0, 2.0]
+        # Cell 1: a transient running to the last frame.
+        self.signals[16:, 1] = [0.6, 5.0, 5.0, 1.0]
+
+    def test_detect(self):
+        """Onset, exclusive offset, first peak frame, amplitude and area of each run."""
+        events = detect_transients(self.signals, binsize=0.5, high=2.5, low=0.5)
+        self.assertEqual(events["cell"].tolist(), [0, 1])
+        self.assertEqual(events["onset"].tolist(), [2, 16])
+        self.assertEqual(events["offset"].tolist(), [6, 20])
+        self.assertEqual(events["peak"].tolist(), [4, 17])
+        np.testing.assert_allclose(events["amplitude"], [4.0, 5.0])
+        np.testing.assert_allclose(events["duration"], [2.0, 2.0])
+        np.testing.assert_allclose(events["auc"], [4.5, 5.8], rtol=1e-6)
+
+    def test_min_duration_and_empty(self):
+        """Short runs are dropped, and a flat trace gives an empty table."""
+        events = detect_transients(self.signals, binsize=0.5, min_duration=2.5)
+        self.assertEqual(events.size, 0)
+        self.assertEqual(detect_transients(np.zeros((5, 3)), binsize=1.0).size, 0)
+
+    def test_event_rates(self):
+        """Onsets are counted per cell within each set of intervals."""
+        events = detect_transients(self.signals, binsize=1.0)
+        time = np.arange(20, dtype=float)
+        rates = event_rates(events, time, {"early": [[0, 10]], "late": [[10, 15], [15, 19]]}, cells=["a", "b"])
+        self.assertEqual(list(rates.index), ["a", "b"])
+        np.testing.assert_allclose(rates["early"], [0.1, 0.0])
+        np.testing.assert_allclose(rates["late"], [0.0, 1 / 9])
+
+    def test_event_rates_without_events(self):
+        """Cells taken from the signals get zero rates when nothing was detected."""
+        events = detect_transients(np.zeros((20, 3)), binsize=1.0)
+        time = np.arange(20, dtype=float)
+        signals = pd.DataFrame(np.zeros((20, 4)), columns=["time", "a", "b", "c"])
+        rates = event_rates(events, time, {"all": [[0, 20]]}, cells=signals)
+        self.assertEqual(list(rates.index), ["a", "b", "c"])
+        np.testing.assert_array_equal(rates["all"], 0.0)
+        np.testing.assert_array_equal(event_rates(events, time, {"all": [[0, 20]]}, cells=3).index, [0, 1, 2])
+        self.assertEqual(event_rates(events, time, {"all": [[0, 20]]}).shape, (0, 1))
+
+
+class TestSessionCache(unittest.TestCase):
+    """Test SessionCache round trips and invalidation."""
+
+    def test_round_trip(self):
+        """Arrays load back by name and key, other keys miss, and clear removes them."""
+        with tempfile.TemporaryDirectory() as folder:
+            cache = SessionCache(folder)
+            arr = np.arange(6, dtype=np.float32).reshape(2, 3)
+            self.assertIsNone(cache.load("events", "abc"))
+            cache.save(arr, "events", "abc")
+            self.assertIn(("events", "abc"), cache)
+            np.testing.assert_array_equal(cache.load("events", "abc", mmap_mode="r"), arr)
+            self.assertIsNone(cache.load("events", "def"))
+            cache.clear("events")
+            self.assertNotIn(("events", "abc"), cache)